@@ -0,0 +1,211 @@
+from StoryMaker import StoryMaker, resolve_api_key
+from ClientPool import ClientPool
+
+class AsyncStoryMaker(StoryMaker):
+    """
+    An asyncio-native counterpart to StoryMaker.
+
+    Shares StoryMaker's configuration and conversation history semantics, but
+    talks to OpenRouter through the async OpenAI client. generate() and update()
+    are coroutines and stream_generate() is an async generator, so a single
+    event loop can drive many generations concurrently instead of needing one
+    thread per request.
+
+    Can be used as an async context manager to ensure the HTTP client is
+    returned to ClientPool after use:
+
+        async with AsyncStoryMaker() as story:
+            async for chunk in story.stream_generate(prompt):
+                ...
+
+    The base URL can be pointed at a local stand-in endpoint for testing by
+    setting the url attribute before the first generation.
+
+    The response cache, call metrics, hedging, the stall watchdog and the
+    rate limiter are only supported by the synchronous StoryMaker; their
+    setters raise NotImplementedError here, and values assigned to them on
+    StoryMaker itself (to share them between instances) do not apply here.
+    History policies are supported.
+    """
+
+    # Sync-only policies, pinned off so that values shared through StoryMaker's
+    # class attributes are not half-applied (e.g. asking for stream usage that
+    # nothing records).
+    response_cache = None
+    hedge_delay = None
+    hedge_adaptive = False
+    stall_timeout = None
+    stream_deadline = None
+    metrics = None
+    rate_limiter = None
+
+    @staticmethod
+    def __sync_only(feature: str, enabled: bool):
+        """Refuses to enable a feature that only the synchronous StoryMaker implements."""
+        if enabled:
+            raise NotImplementedError(f"{feature} is only supported by the synchronous StoryMaker.")
+
+
+    def set_response_cache(self, cache):
+        """Not supported by AsyncStoryMaker. Passing None is allowed and does nothing."""
+        self.__sync_only("The response cache", cache is not None)
+
+
+    def set_metrics(self, registry):
+        """Not supported by AsyncStoryMaker. Passing None is allowed and does nothing."""
+        self.__sync_only("Call metrics", registry is not None)
+
+
+    def set_hedging(self, delay: float | None = 1.0, adaptive: bool = False):
+        """Not supported by AsyncStoryMaker. Passing None is allowed and does nothing."""
+        self.__sync_only("Hedging", delay is not None)
+
+
+    def set_stall_watchdog(self, chunk_timeout: float | None = 20.0, deadline: float | None = 300.0):
+        """Not supported by AsyncStoryMaker. Passing None for both is allowed and does nothing."""
+        self.__sync_only("The stall watchdog", chunk_timeout is not None or deadline is not None)
+
+
+    def set_rate_limiter(self, scheduler):
+        """Not supported by AsyncStoryMaker. Passing None is allowed and does nothing."""
+        self.__sync_only("The rate limiter", scheduler is not None)
+
+
+    def __create_client(self):
+        """Borrows the shared async OpenAI HTTP client from ClientPool. Called lazily by generate()."""
+        self.client = ClientPool.acquire_async(self.url, resolve_api_key(self.api_key))
+
+
+    def _summarizer(self):
+        """
+        History policies cannot call the async client synchronously, so they
+        fall back to their local summary.
+        """
+        return None
+
+
+    async def __chat(self):
+        """
+        Sends the current conversation to the model and appends the response to history.
+
+        Handles the non-streaming mode.
+
+        Returns:
+            str: The complete response text from the model.
+        """
+        response = await self.client.chat.completions.create(**self._request_params(False))
+
+        self._add_response(response.choices[0].message.content, response.model)
+        return response.choices[0].message.content
+
+
+    async def __stream_chat(self):
+        """
+        Async generator version of __chat() for streaming output.
+
+        Yields each text chunk as it arrives. After all chunks have been
+        yielded, the complete response is appended to conversation history
+        exactly like __chat() does, keeping the history consistent.
+
+        Yields:
+            str: Individual text chunks from the model as they arrive.
+        """
+        response = await self.client.chat.completions.create(**self._request_params(True))
+
+        complete_response = ""
+        model = None
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                content = chunk.choices[0].delta.content
+                model = chunk.model
+                complete_response += content
+                yield content
+
+        # Append the full assembled response to history once streaming is done
+        self._add_response(complete_response, model)
+
+
+    async def stream_generate(self, prompt: str = ""):
+        """
+        Async generator version of generate() that yields text chunks for streaming.
+
+        Args:
+            prompt (str): The story prompt to send to the model. If empty, the
+                default basic_prompt is used.
+
+        Yields:
+            str: Individual text chunks from the model as they arrive.
+        """
+        if not hasattr(self, 'client'):
+            self.__create_client()
+
+        self._add_prompt(prompt)
+
+        async for content in self.__stream_chat():
+            yield content
+
+
+    async def generate(self, prompt: str = ""):
+        """
+        Generates a story from the model using a user-provided or default prompt.
+
+        Args:
+            prompt (str): The story prompt to send to the model. If empty, the
+                default basic_prompt is used.
+
+        Returns:
+            str: The generated story text.
+        """
+        if not hasattr(self, 'client'):
+            self.__create_client()
+
+        self._add_prompt(prompt)
+        return await self.__chat()
+
+
+    async def update(self, **kwargs):
+        """
+        Sends a follow-up request to update the previously generated story.
+
+        Must be awaited after generate(). See StoryMaker.update().
+
+        Args:
+            **kwargs: Arbitrary keyword arguments describing the desired updates.
+
+        Returns:
+            str: The updated story text from the model.
+
+        Raises:
+            ValueError: If generate() has not been called first.
+        """
+        self._add_update(**kwargs)
+        return await self.__chat()
+
+
+    async def close(self):
+        """Returns the async HTTP client to ClientPool and clears the preserved conversation.
+
+        Does nothing to the client if it was never created.
+        """
+        self._release_client()
+        self._clear_history()
+
+
+    def __enter__(self):
+        """AsyncStoryMaker must be used with `async with`."""
+        raise TypeError("AsyncStoryMaker must be used with `async with`, not `with`.")
+
+
+    def __exit__(self, _exc_type, _exc_val, _exc_tb):
+        """AsyncStoryMaker must be used with `async with`."""
+        raise TypeError("AsyncStoryMaker must be used with `async with`, not `with`.")
+
+
+    async def __aenter__(self):
+        """Enables use as an async context manager. Returns the AsyncStoryMaker instance."""
+        return self
+
+
+    async def __aexit__(self, _exc_type, _exc_val, _exc_tb):
+        """Releases the async HTTP client when exiting an `async with` block."""
+        await self.close()
@@ -0,0 +1,424 @@
+"""
+SQLite storage for large story catalogs.
+
+StoryHelper normally loads story_types.json into an in-memory StoryCatalog,
+which reads and indexes every story type at start-up. SQLiteCatalog serves
+the same interface from an indexed SQLite file instead: opening it costs the
+same whatever the catalog size, and story types are read only when a lookup
+or page asks for them. Use it through StoryHelper.set_catalog().
+
+Build the database from the JSON files with import_json_catalog(), or:
+    python CatalogStore.py --db story_inputs/catalog.sqlite3
+"""
+from StoryHelper import StoryRecord, to_story_record
+from collections import OrderedDict
+from pathlib import Path
+import argparse
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE stories (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL UNIQUE,
+    protagonist TEXT NOT NULL,
+    description TEXT NOT NULL,
+    setting TEXT NOT NULL,
+    plot TEXT NOT NULL,
+    conflict TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    point_of_view TEXT NOT NULL
+);
+CREATE INDEX stories_setting ON stories (setting, position);
+CREATE INDEX stories_conflict ON stories (conflict, position);
+CREATE INDEX stories_theme ON stories (theme, position);
+CREATE INDEX stories_point_of_view ON stories (point_of_view, position);
+
+CREATE TABLE prompts (
+    prompt_id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE prompt_stories (
+    prompt_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    story_id INTEGER NOT NULL,
+    PRIMARY KEY (prompt_id, rank)
+);
+CREATE INDEX prompt_stories_story ON prompt_stories (prompt_id, story_id);
+"""
+
+# Columns of the stories table, in StoryRecord order.
+STORY_COLUMNS = ", ".join(StoryRecord._fields)
+
+
+def import_json_catalog(db_path: str, story_types_path: str = "story_inputs/story_types.json",
+                        prompts_path: str = "story_inputs/story_system_prompts.json") -> int:
+    """
+    Builds (or rebuilds) a catalog database from the JSON files.
+
+    The database is written to a temporary file first and then moved into
+    place, so readers never see a half-built catalog.
+
+    Args:
+        db_path (str): Where to write the database.
+        story_types_path (str): The story types JSON file.
+        prompts_path (str): The system prompts JSON file.
+
+    Returns:
+        int: The number of story types imported.
+
+    Raises:
+        ValueError: If two stories or two prompts share an id.
+    """
+    with open(story_types_path, encoding="utf-8") as file:
+        stories = json.load(file)
+    with open(prompts_path, encoding="utf-8") as file:
+        prompts = json.load(file)
+
+    db_path = Path(db_path)
+    temp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    temp_path.unlink(missing_ok=True)
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            f"INSERT INTO stories (position, {STORY_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((position, *to_story_record(story)) for position, story in enumerate(stories)),
+        )
+        connection.executemany(
+            "INSERT INTO prompts (prompt_id, position, data) VALUES (?, ?, ?)",
+            ((prompt["prompt_id"], position, json.dumps(prompt, ensure_ascii=False))
+             for position, prompt in enumerate(prompts)),
+        )
+        connection.executemany(
+            "INSERT INTO prompt_stories (prompt_id, rank, story_id) VALUES (?, ?, ?)",
+            ((prompt["prompt_id"], rank, story_id)
+             for prompt in prompts for rank, story_id in enumerate(prompt["story_ids"])),
+        )
+        connection.commit()
+    except sqlite3.IntegrityError as error:
+        connection.close()
+        temp_path.unlink(missing_ok=True)
+        raise ValueError(f"Cannot import the catalog: {error}") from error
+    connection.close()
+    temp_path.replace(db_path)
+    return len(stories)
+
+
+class SQLiteCatalog:
+    """
+    A read-only story catalog backed by a SQLite database.
+
+    Implements the same interface as StoryCatalog (get(), get_prompt(),
+    prompts(), stories_for_prompt(), missing_story_ids(), values(), query(),
+    count(), len(), in and iteration), so StoryHelper and the app can use
+    either. Story types are fetched by id or by page with indexed queries,
+    and the most recently used ones are kept in a small LRU cache, so
+    resident memory does not grow with the catalog.
+
+    Pages are read with keyset pagination (WHERE position > ?) rather than
+    OFFSET, which would step over every earlier row: query() remembers where
+    each page of a filter ended, so the next page starts from there. Counts
+    are cached per filter too. Both caches, and the story cache, are
+    dropped when the database is changed by another connection.
+
+    Thread-safe; one instance can be shared by every session.
+    """
+
+    # StoryRecord fields with an index, as in StoryCatalog.
+    indexed_fields = ('setting', 'conflict', 'theme', 'point_of_view')
+
+    # How many filter combinations keep their count and page positions.
+    filter_cache_size = 256
+
+    def __init__(self, db_path: str, cache_size: int = 1024):
+        """
+        Opens a database built by import_json_catalog().
+
+        Args:
+            db_path (str): The database file.
+            cache_size (int): How many story types are kept in memory.
+
+        Raises:
+            FileNotFoundError: If the database does not exist.
+        """
+        if not Path(db_path).exists():
+            raise FileNotFoundError(f"No catalog database at {db_path}. Build one with import_json_catalog().")
+        self.cache_size = cache_size
+        self.__connection = sqlite3.connect(f"file:{Path(db_path).as_posix()}?mode=ro", uri=True,
+                                            check_same_thread=False)
+        self.__lock = threading.Lock()
+        self.__cache = OrderedDict()
+        # filter key -> {"count": int | None, "ends": {offset: position}}, where
+        # ends maps the offset of a page to the position of the row before it.
+        self.__filter_cache = OrderedDict()
+        self.__data_version = self.__connection.execute("PRAGMA data_version").fetchone()[0]
+
+
+    def __fetch(self, sql: str, parameters=()) -> list:
+        with self.__lock:
+            return self.__connection.execute(sql, parameters).fetchall()
+
+
+    def __filter_state(self, key) -> dict:
+        """
+        Returns the cached count and page positions of a filter, creating them if needed.
+
+        Drops every cache first if the database changed since the last call.
+        Caller holds the lock.
+        """
+        data_version = self.__connection.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self.__data_version:
+            self.__data_version = data_version
+            self.__cache.clear()
+            self.__filter_cache.clear()
+        state = self.__filter_cache.get(key)
+        if state is None:
+            state = self.__filter_cache[key] = {"count": None, "ends": {}}
+            if len(self.__filter_cache) > self.filter_cache_size:
+                self.__filter_cache.popitem(last=False)
+        else:
+            self.__filter_cache.move_to_end(key)
+        return state
+
+
+    @staticmethod
+    def __filter_key(prompt_id, filters: dict) -> tuple:
+        """Returns a hashable key for a filter combination, as StoryCatalog does."""
+        return (prompt_id, tuple(sorted(
+            (field, frozenset(wanted) if isinstance(wanted, (list, tuple, set, frozenset)) else wanted)
+            for field, wanted in filters.items() if wanted is not None
+        )))
+
+
+    def __len__(self) -> int:
+        return self.__fetch("SELECT COUNT(*) FROM stories")[0][0]
+
+
+    def __iter__(self):
+        # Pages through the catalog, so only one page is in memory at a time.
+        position = -1
+        while True:
+            rows = self.__fetch(
+                f"SELECT position, {STORY_COLUMNS} FROM stories WHERE position > ? ORDER BY position LIMIT 500",
+                (position,),
+            )
+            yield from (StoryRecord(*row[1:]) for row in rows)
+            if len(rows) < 500:
+                return
+            position = rows[-1][0]
+
+
+    def __contains__(self, story_id) -> bool:
+        return self.get(story_id) is not None
+
+
+    def __getitem__(self, story_id: int) -> StoryRecord:
+        """Returns the StoryRecord with this id. Raises KeyError if there is none."""
+        story = self.get(story_id)
+        if story is None:
+            raise KeyError(story_id)
+        return story
+
+
+    def get(self, story_id: int, default=None):
+        """
+        Returns the StoryRecord with this id.
+
+        Args:
+            story_id (int): The story's id.
+            default: Returned if no story has this id.
+
+        Returns:
+            StoryRecord: The story, or default.
+        """
+        with self.__lock:
+            story = self.__cache.get(story_id)
+            if story is not None:
+                self.__cache.move_to_end(story_id)
+                return story
+        rows = self.__fetch(f"SELECT {STORY_COLUMNS} FROM stories WHERE id = ?", (story_id,))
+        if not rows:
+            return default
+        story = StoryRecord(*rows[0])
+        with self.__lock:
+            self.__cache[story_id] = story
+            if len(self.__cache) > self.cache_size:
+                self.__cache.popitem(last=False)
+        return story
+
+
+    def get_prompt(self, prompt_id: int, default=None):
+        """
+        Returns the system prompt dict with this id.
+
+        Args:
+            prompt_id (int): The prompt's id.
+            default: Returned if no prompt has this id.
+
+        Returns:
+            dict: The prompt, or default.
+        """
+        rows = self.__fetch("SELECT data FROM prompts WHERE prompt_id = ?", (prompt_id,))
+        return json.loads(rows[0][0]) if rows else default
+
+
+    def prompts(self) -> list:
+        """Returns every system prompt dict, in load order."""
+        return [json.loads(data) for data, in self.__fetch("SELECT data FROM prompts ORDER BY position")]
+
+
+    def stories_for_prompt(self, prompt_id: int) -> list:
+        """
+        Returns the stories linked to a system prompt, in its story_ids order.
+
+        Args:
+            prompt_id (int): The prompt's id.
+
+        Returns:
+            list[StoryRecord]: The linked stories that exist in the catalog.
+        """
+        rows = self.__fetch(
+            f"SELECT {', '.join('s.' + column for column in StoryRecord._fields)} "
+            "FROM prompt_stories p JOIN stories s ON s.id = p.story_id "
+            "WHERE p.prompt_id = ? ORDER BY p.rank",
+            (prompt_id,),
+        )
+        return [StoryRecord(*row) for row in rows]
+
+
+    def missing_story_ids(self, prompt_id: int) -> list:
+        """Returns the story_ids of a prompt that have no story in the catalog."""
+        rows = self.__fetch(
+            "SELECT p.story_id FROM prompt_stories p LEFT JOIN stories s ON s.id = p.story_id "
+            "WHERE p.prompt_id = ? AND s.id IS NULL ORDER BY p.rank",
+            (prompt_id,),
+        )
+        return [story_id for story_id, in rows]
+
+
+    def __check_field(self, field: str):
+        if field not in self.indexed_fields:
+            raise ValueError(f"{field} is not an indexed field. Choose from {', '.join(self.indexed_fields)}.")
+
+
+    def values(self, field: str) -> list:
+        """
+        Returns the distinct values of an indexed field, sorted.
+
+        Raises:
+            ValueError: If field is not indexed.
+        """
+        self.__check_field(field)
+        return [value for value, in self.__fetch(f"SELECT DISTINCT {field} FROM stories ORDER BY {field}")]
+
+
+    def __where(self, prompt_id=None, **filters) -> tuple:
+        """Builds the conditions and parameters shared by query() and count()."""
+        clauses = []
+        parameters = []
+        if prompt_id is not None:
+            clauses.append("id IN (SELECT story_id FROM prompt_stories WHERE prompt_id = ?)")
+            parameters.append(prompt_id)
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            # Field names are checked against indexed_fields before use in SQL.
+            self.__check_field(field)
+            if isinstance(wanted, (list, tuple, set, frozenset)):
+                wanted = list(wanted)
+                if not wanted:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{field} IN ({', '.join('?' * len(wanted))})")
+                parameters.extend(wanted)
+            else:
+                clauses.append(f"{field} = ?")
+                parameters.append(wanted)
+        return clauses, parameters
+
+
+    def query(self, prompt_id: int | None = None, limit: int | None = None, offset: int = 0, **filters) -> list:
+        """
+        Returns the stories matching every given filter, in catalog order.
+
+        A page that starts where an earlier query() of the same filters ended
+        (e.g. the next page) is read from the index without skipping rows;
+        other offsets fall back to OFFSET once.
+
+        Args:
+            prompt_id (int | None): Only stories linked to this system prompt.
+            limit (int | None): Maximum number of stories returned. None means all.
+            offset (int): Number of matching stories to skip, for paging.
+            **filters: Any of indexed_fields, mapped to an exact value or a
+                list of values (any of which may match). None ignores the field.
+
+        Returns:
+            list[StoryRecord]: One page of matches.
+
+        Raises:
+            ValueError: If a filter names a field that is not indexed, or
+                offset is negative.
+        """
+        if offset < 0:
+            raise ValueError("offset must not be negative.")
+        clauses, parameters = self.__where(prompt_id, **filters)
+        key = self.__filter_key(prompt_id, filters)
+        with self.__lock:
+            state = self.__filter_state(key)
+            start = -1 if offset == 0 else state["ends"].get(offset)
+            if start is not None:
+                clauses = [*clauses, "position > ?"]
+                parameters = [*parameters, start]
+                skip = 0
+            else:
+                skip = offset
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = self.__connection.execute(
+                f"SELECT position, {STORY_COLUMNS} FROM stories {where} ORDER BY position LIMIT ? OFFSET ?",
+                (*parameters, -1 if limit is None else limit, skip),
+            ).fetchall()
+            if rows:
+                state["ends"][offset + len(rows)] = rows[-1][0]
+        return [StoryRecord(*row[1:]) for row in rows]
+
+
+    def count(self, prompt_id: int | None = None, **filters) -> int:
+        """
+        Returns how many stories query() would match without a limit.
+
+        The count is cached per filter until the database changes.
+        """
+        clauses, parameters = self.__where(prompt_id, **filters)
+        key = self.__filter_key(prompt_id, filters)
+        with self.__lock:
+            state = self.__filter_state(key)
+            if state["count"] is None:
+                where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+                state["count"] = self.__connection.execute(f"SELECT COUNT(*) FROM stories {where}",
+                                                           parameters).fetchone()[0]
+            return state["count"]
+
+
+    def close(self):
+        """Closes the database connection."""
+        with self.__lock:
+            self.__connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the JSON story catalog into a SQLite database.")
+    parser.add_argument("--db", default="story_inputs/catalog.sqlite3", help="database to write")
+    parser.add_argument("--stories", default="story_inputs/story_types.json", help="story types JSON")
+    parser.add_argument("--prompts", default="story_inputs/story_system_prompts.json", help="system prompts JSON")
+    args = parser.parse_args()
+
+    count = import_json_catalog(args.db, args.stories, args.prompts)
+    print(f"Imported {count} story types into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import atexit
+import importlib.util
+import threading
+import warnings
+
+class ClientPool:
+    """
+    A process-wide registry of shared OpenAI clients.
+
+    Creating an OpenAI client per StoryMaker means every new story pays a fresh
+    TCP + TLS handshake. Instead, StoryMaker borrows a client from this registry
+    with acquire() and gives it back with release(). Clients are keyed by base
+    URL and API key, so every StoryMaker talking to the same endpoint shares one
+    HTTP connection pool, and released clients stay alive with their keep-alive
+    connections for the next generation.
+
+    Async clients are bound to the event loop that created them, so they are
+    additionally keyed by the running loop (see acquire_async()).
+
+    Pool settings apply to clients created after configure() is called. The
+    openai and httpx packages are only imported when the first client is
+    created, so importing StoryMaker does not pay for them.
+
+    Attributes:
+        max_connections (int): Maximum open connections per client.
+        max_keepalive_connections (int): Maximum idle connections kept open per client.
+        keepalive_expiry (float): Seconds an idle connection is kept open.
+        http2 (bool): Whether to negotiate HTTP/2. Requires the h2 package
+            (pip install "httpx[http2]"); falls back to HTTP/1.1 without it.
+    """
+
+    max_connections = 100
+    max_keepalive_connections = 20
+    keepalive_expiry = 30.0
+    http2 = False
+
+    # key -> [client, number of StoryMakers currently borrowing it, event loop or None]
+    __clients = {}
+    __lock = threading.Lock()
+
+
+    @classmethod
+    def configure(cls, max_connections: int | None = None, max_keepalive_connections: int | None = None,
+                  keepalive_expiry: float | None = None, http2: bool | None = None):
+        """
+        Changes the connection pool settings for clients created from now on.
+
+        Args:
+            max_connections (int | None): Maximum open connections per client.
+            max_keepalive_connections (int | None): Maximum idle connections kept per client.
+            keepalive_expiry (float | None): Seconds an idle connection is kept open.
+            http2 (bool | None): Whether to negotiate HTTP/2.
+        """
+        if max_connections is not None:
+            cls.max_connections = max_connections
+        if max_keepalive_connections is not None:
+            cls.max_keepalive_connections = max_keepalive_connections
+        if keepalive_expiry is not None:
+            cls.keepalive_expiry = keepalive_expiry
+        if http2 is not None:
+            cls.http2 = http2
+
+
+    @classmethod
+    def __http_settings(cls) -> dict:
+        """Returns the httpx keyword arguments for a new client."""
+        import httpx
+
+        http2 = cls.http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            warnings.warn("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1.")
+            http2 = False
+        return {
+            "limits": httpx.Limits(
+                max_connections=cls.max_connections,
+                max_keepalive_connections=cls.max_keepalive_connections,
+                keepalive_expiry=cls.keepalive_expiry,
+            ),
+            "http2": http2,
+        }
+
+
+    @classmethod
+    def acquire(cls, base_url: str, api_key: str) -> "OpenAI":
+        """
+        Borrows the shared client for an endpoint, creating it on first use.
+
+        Every acquire() must be matched by a release() of the same client.
+
+        Args:
+            base_url (str): The API base URL.
+            api_key (str): The API key.
+
+        Returns:
+            OpenAI: The shared client.
+        """
+        from openai import OpenAI, DefaultHttpxClient
+
+        return cls.__acquire((base_url, api_key), None, lambda: OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            http_client=DefaultHttpxClient(**cls.__http_settings()),
+        ))
+
+
+    @classmethod
+    def acquire_async(cls, base_url: str, api_key: str) -> "AsyncOpenAI":
+        """
+        Borrows the shared async client for an endpoint and the running event loop.
+
+        Must be called from inside a running event loop. Every acquire_async()
+        must be matched by a release() of the same client.
+
+        Args:
+            base_url (str): The API base URL.
+            api_key (str): The API key.
+
+        Returns:
+            AsyncOpenAI: The shared async client.
+        """
+        import asyncio
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        loop = asyncio.get_running_loop()
+        return cls.__acquire((base_url, api_key, loop), loop, lambda: AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            http_client=DefaultAsyncHttpxClient(**cls.__http_settings()),
+        ))
+
+
+    @classmethod
+    def __acquire(cls, key: tuple, loop, factory):
+        with cls.__lock:
+            # Forget async clients whose event loop has finished.
+            for old_key, (_, _, old_loop) in list(cls.__clients.items()):
+                if old_loop is not None and old_loop.is_closed():
+                    del cls.__clients[old_key]
+
+            entry = cls.__clients.get(key)
+            if entry is None or entry[0].is_closed():
+                entry = [factory(), 0, loop]
+                cls.__clients[key] = entry
+            entry[1] += 1
+            return entry[0]
+
+
+    @classmethod
+    def release(cls, client):
+        """
+        Returns a borrowed client to the pool.
+
+        The client is not closed: its idle connections stay open for the next
+        borrower until keepalive_expiry passes. Releasing a client that did not
+        come from the pool does nothing.
+
+        Args:
+            client (OpenAI | AsyncOpenAI): A client from acquire() or acquire_async().
+        """
+        with cls.__lock:
+            for entry in cls.__clients.values():
+                if entry[0] is client:
+                    entry[1] = max(entry[1] - 1, 0)
+                    return
+
+
+    @classmethod
+    def close_all(cls):
+        """Closes every pooled synchronous client and forgets all pooled clients.
+
+        Async clients are dropped without being closed, since that requires
+        their event loop; their connections close with the loop.
+        """
+        with cls.__lock:
+            entries = list(cls.__clients.values())
+            cls.__clients.clear()
+        for client, _, loop in entries:
+            if loop is None:
+                client.close()
+
+
+    @classmethod
+    def get_stats(cls) -> list:
+        """
+        Returns one summary per pooled client.
+
+        Returns:
+            list[dict]: base_url, async and borrowers for each client.
+        """
+        with cls.__lock:
+            return [
+                {
+                    "base_url": key[0],
+                    "async": loop is not None,
+                    "borrowers": borrowers,
+                }
+                for key, (_, borrowers, loop) in cls.__clients.items()
+            ]
+
+
+# Close pooled connections cleanly when the interpreter exits.
+atexit.register(ClientPool.close_all)
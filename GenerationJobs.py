@@ -0,0 +1,145 @@
+from ModelStreams import CancelScope
+import threading
+
+class GenerationJob:
+    """
+    One story generation running on a JobRunner worker thread.
+
+    The worker appends chunks as they arrive; any other thread (e.g. a
+    Streamlit script run) can read the text so far, check the status, or ask
+    for the job to be cancelled. Every method is thread-safe.
+
+    Attributes:
+        status (str): "queued", "running", "done", "failed" or "cancelled".
+        error (BaseException | None): The exception that failed the job, if any.
+    """
+
+    # Statuses after which the job no longer changes.
+    finished_statuses = ("done", "failed", "cancelled")
+
+    def __init__(self, open_stream):
+        """
+        Args:
+            open_stream (callable): Takes no arguments and returns an iterator of
+                str chunks, e.g. lambda: helper.generate_story(...).
+        """
+        self.__open_stream = open_stream
+        self.__lock = threading.Lock()
+        self.__chunks = []
+        self.__cancelled = threading.Event()
+        # Cancelling the scope closes the response the stream is reading.
+        self.__scope = CancelScope()
+        self.status = "queued"
+        self.error = None
+
+
+    def run(self):
+        """Consumes the stream. Called on the worker thread by JobRunner."""
+        with self.__lock:
+            if self.__cancelled.is_set():
+                self.status = "cancelled"
+                return
+            self.status = "running"
+
+        stream = None
+        try:
+            with self.__scope:
+                stream = iter(self.__open_stream())
+                for chunk in stream:
+                    with self.__lock:
+                        self.__chunks.append(chunk)
+                    if self.__cancelled.is_set():
+                        break
+        except Exception as error:
+            with self.__lock:
+                if self.__cancelled.is_set():
+                    # The read was interrupted by cancel().
+                    self.status = "cancelled"
+                else:
+                    self.status = "failed"
+                    self.error = error
+            return
+        finally:
+            # Closing the generator stops the upstream stream and returns any
+            # pooled conversation it leased.
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+        with self.__lock:
+            self.status = "cancelled" if self.__cancelled.is_set() else "done"
+
+
+    def cancel(self):
+        """
+        Stops the job.
+
+        A queued job never starts. A running one stops at once, even while it
+        waits for a chunk: cancelling closes the response it is reading, so a
+        slow or stalled model does not keep the worker (or its connection) busy.
+        """
+        with self.__lock:
+            self.__cancelled.set()
+            if self.status == "queued":
+                self.status = "cancelled"
+        self.__scope.cancel()
+
+
+    def text(self) -> str:
+        """Returns the story text generated so far."""
+        with self.__lock:
+            return "".join(self.__chunks)
+
+
+    def is_finished(self) -> bool:
+        """Returns True once the job is done, failed or cancelled."""
+        with self.__lock:
+            return self.status in self.finished_statuses
+
+
+class JobRunner:
+    """
+    A small worker pool that runs GenerationJobs in the background.
+
+    Lets the Streamlit app start several generations without blocking its
+    script run: submit() returns immediately, and the page polls each job's
+    text and status on later reruns. At most max_workers jobs stream at once;
+    the rest wait in the queue.
+
+    Thread-safe; one runner is meant to be shared by every session.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        """
+        Args:
+            max_workers (int): Maximum number of jobs running at once.
+
+        Raises:
+            ValueError: If max_workers is less than 1.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        # Imported here, as in StoryMaker._generate_batch(), so importing stays cheap.
+        from concurrent.futures import ThreadPoolExecutor
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="story-job")
+
+
+    def submit(self, open_stream) -> GenerationJob:
+        """
+        Queues a generation and returns its job right away.
+
+        Args:
+            open_stream (callable): Takes no arguments and returns an iterator
+                of str chunks.
+
+        Returns:
+            GenerationJob: The queued job.
+        """
+        job = GenerationJob(open_stream)
+        self.__executor.submit(job.run)
+        return job
+
+
+    def shutdown(self):
+        """Stops accepting jobs and drops the queued ones. Running jobs finish in the background."""
+        self.__executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,204 @@
+from collections import namedtuple, OrderedDict
+import threading
+
+# Per-request token accounting for StoryMaker.get_turn_stats(). full_tokens is
+# the estimated size of the whole conversation, sent_tokens the size of what
+# the history policy actually sent, and saved_tokens the difference.
+TurnStats = namedtuple('TurnStats', ['full_tokens', 'sent_tokens', 'saved_tokens'])
+
+# Rough per-message overhead of the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in a piece of text without a tokenizer.
+
+    Uses the common rule of thumb of about four characters per token for
+    English prose. It is fast and dependency-free, and close enough to decide
+    when a conversation has outgrown its budget.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return (len(text) + 3) // 4
+
+
+def estimate_messages_tokens(messages: list) -> int:
+    """
+    Estimates the number of prompt tokens a list of chat messages will use.
+
+    Args:
+        messages (list[dict]): Chat messages with "role" and "content" keys.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return sum(estimate_tokens(message["content"] or "") + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def split_history(messages: list) -> tuple:
+    """
+    Splits a conversation into its leading system messages and the rest.
+
+    Args:
+        messages (list[dict]): The full conversation.
+
+    Returns:
+        tuple[list, list]: (system messages, remaining messages).
+    """
+    start = 0
+    while start < len(messages) and messages[start]["role"] == "system":
+        start += 1
+    return messages[:start], messages[start:]
+
+
+class HistoryPolicy:
+    """
+    Decides which part of a StoryMaker conversation is sent with each request.
+
+    StoryMaker always keeps the full history (see get_convo_history()); a
+    policy only trims what goes over the wire. The last message passed to
+    apply() is always the new user prompt or update instruction, and every
+    policy keeps it.
+
+    The base class keeps the whole conversation, which is StoryMaker's
+    behavior when no policy is set. Subclasses override apply().
+    """
+
+    def apply(self, messages: list, summarize=None) -> list:
+        """
+        Returns the messages to send for the next request.
+
+        Args:
+            messages (list[dict]): The full conversation, ending with the new
+                user message.
+            summarize (callable | None): A function that turns a list of
+                messages into a short summary string, usually by asking the
+                model. None if no model summarizer is available.
+
+        Returns:
+            list[dict]: The messages to send.
+        """
+        return messages
+
+
+class LastTurns(HistoryPolicy):
+    """Keeps the system prompt plus the last N prompt/response turns."""
+
+    def __init__(self, turns: int = 2):
+        """
+        Args:
+            turns (int): How many earlier user/assistant exchanges to keep in
+                addition to the new user message.
+        """
+        if turns < 0:
+            raise ValueError("turns cannot be negative.")
+        self.turns = turns
+
+
+    def apply(self, messages: list, summarize=None) -> list:
+        system, rest = split_history(messages)
+        return system + rest[-(2 * self.turns + 1):]
+
+
+class LatestStory(HistoryPolicy):
+    """
+    Keeps only the system prompt, the latest story and the new instructions.
+
+    Suited to update() sessions, where each update only needs the current
+    version of the story rather than every earlier draft.
+    """
+
+    def apply(self, messages: list, summarize=None) -> list:
+        system, rest = split_history(messages)
+        for index in range(len(rest) - 1, -1, -1):
+            if rest[index]["role"] == "assistant":
+                return system + [rest[index], rest[-1]]
+        return messages
+
+
+class SummarizeOverBudget(HistoryPolicy):
+    """
+    Sends the full conversation until it exceeds a token budget, then replaces
+    older turns with a summary.
+
+    The most recent keep_turns exchanges are always sent verbatim. Everything
+    older is condensed into one system message, using the model summarizer
+    StoryMaker provides or, if none is available, a cheap extractive summary
+    made of the start of each message. Summaries are cached and extended
+    incrementally, so each older turn is only summarized once.
+
+    Thread-safe; one policy can be shared by every StoryMaker (see
+    StoryMaker.set_history_policy()). The summarizer itself runs outside the
+    lock, so two requests that miss the same summary at once both make it.
+    """
+
+    # The extractive fallback keeps this many characters of each message.
+    extract_chars = 240
+
+    def __init__(self, max_tokens: int = 4000, keep_turns: int = 1, max_cached: int = 64):
+        """
+        Args:
+            max_tokens (int): Token budget for the messages sent per request.
+            keep_turns (int): How many recent user/assistant exchanges are
+                always sent verbatim.
+            max_cached (int): How many summaries to remember.
+        """
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.max_cached = max_cached
+        self.__lock = threading.Lock()
+        self.__summaries = OrderedDict()
+
+
+    def apply(self, messages: list, summarize=None) -> list:
+        if estimate_messages_tokens(messages) <= self.max_tokens:
+            return messages
+
+        system, rest = split_history(messages)
+        keep = 2 * self.keep_turns + 1
+        older, recent = rest[:-keep], rest[-keep:]
+        if not older:
+            return messages
+
+        summary = self.__summarize(older, summarize)
+        return system + [{
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{summary}",
+        }] + recent
+
+
+    def __summarize(self, older: list, summarize) -> str:
+        """Summarizes older messages, reusing the summary of the longest cached prefix."""
+        key = tuple(message["content"] for message in older)
+        with self.__lock:
+            if key in self.__summaries:
+                self.__summaries.move_to_end(key)
+                return self.__summaries[key]
+
+            # Only the turns that fell out since the last summary need summarizing.
+            to_summarize = older
+            for end in range(len(older) - 1, 0, -1):
+                previous = self.__summaries.get(key[:end])
+                if previous is not None:
+                    to_summarize = [{"role": "system", "content": previous}] + older[end:]
+                    break
+
+        if summarize is not None:
+            summary = summarize(to_summarize)
+        else:
+            summary = "\n".join(
+                f"{message['role']}: {(message['content'] or '')[:self.extract_chars]}"
+                for message in to_summarize
+            )
+
+        with self.__lock:
+            self.__summaries[key] = summary
+            self.__summaries.move_to_end(key)
+            while len(self.__summaries) > self.max_cached:
+                self.__summaries.popitem(last=False)
+        return summary
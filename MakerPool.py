@@ -0,0 +1,141 @@
+from StoryMaker import StoryMaker
+from contextlib import contextmanager
+import threading
+import time
+
+class MakerPool:
+    """
+    A bounded pool of StoryMaker conversations for concurrent users.
+
+    A StoryMaker holds one conversation, so an instance shared between users
+    (like the Streamlit app's StoryHelper) cannot generate for two of them at
+    once. lease() instead hands each generation a StoryMaker of its own, with a
+    fresh conversation, and takes it back afterwards. At most max_size
+    conversations are leased at a time; further callers wait for one to be
+    returned. Returned StoryMakers are kept and reused, so they keep the HTTP
+    client they borrowed from ClientPool and every lease shares its connections.
+
+    Thread-safe; one pool is meant to be shared by every session in the
+    process (see StoryHelper.set_maker_pool()).
+
+    Attributes:
+        temperature (float): Temperature applied to every leased StoryMaker.
+        max_tokens (int): Token limit applied to every leased StoryMaker.
+    """
+
+    def __init__(self, max_size: int = 8, timeout: float | None = None, api_key: str | None = None,
+                 temperature: float = 1, max_tokens: int = 5000):
+        """
+        Args:
+            max_size (int): Maximum number of conversations leased at once.
+            timeout (float | None): Seconds lease() waits for a free conversation
+                before giving up. None waits indefinitely.
+            api_key (str | None): Passed to every StoryMaker; None resolves it lazily.
+            temperature (float): Temperature for every leased StoryMaker.
+            max_tokens (int): Token limit for every leased StoryMaker.
+
+        Raises:
+            ValueError: If max_size is less than 1.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self.max_size = max_size
+        self.timeout = timeout
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.__api_key = api_key
+        self.__slots = threading.BoundedSemaphore(max_size)
+        self.__lock = threading.Lock()
+        self.__idle = []
+        self.__leased = 0
+        self.__created = 0
+        self.__waits = 0
+        self.__wait_max = 0.0
+
+
+    @contextmanager
+    def lease(self, system_prompt: str = "", policies: dict | None = None):
+        """
+        Leases a StoryMaker with a fresh conversation for the duration of a with block.
+
+        Example:
+            with pool.lease(system_prompt) as maker:
+                story = maker.generate(prompt)
+
+        Args:
+            system_prompt (str): The conversation's system prompt. If empty,
+                StoryMaker's default storytelling prompt is used.
+            policies (dict | None): Policies for the lease, from another
+                StoryMaker's _policy_state() (e.g. the caller's cache, metrics
+                and rate limiter). None leaves StoryMaker's class-level defaults.
+
+        Yields:
+            StoryMaker: A StoryMaker no one else is using until the block exits.
+
+        Raises:
+            TimeoutError: If no conversation became free within timeout seconds.
+        """
+        start = time.monotonic()
+        if not self.__slots.acquire(blocking=False):
+            if not self.__slots.acquire(timeout=self.timeout):
+                raise TimeoutError(f"No StoryMaker became free within {self.timeout} seconds.")
+            waited = time.monotonic() - start
+            with self.__lock:
+                self.__waits += 1
+                self.__wait_max = max(self.__wait_max, waited)
+
+        try:
+            with self.__lock:
+                maker = self.__idle.pop() if self.__idle else None
+                self.__leased += 1
+                if maker is None:
+                    self.__created += 1
+
+            if maker is None:
+                maker = StoryMaker(system_prompt, self.__api_key)
+            else:
+                # Re-initializing resets the conversation but keeps the borrowed client.
+                maker.__init__(system_prompt, self.__api_key)
+            maker.temp = self.temperature
+            maker.max_tokens = self.max_tokens
+            # Also clears whatever the previous lease's policies were.
+            maker._apply_policy_state(policies)
+
+            try:
+                yield maker
+            finally:
+                # Drop the conversation now rather than holding it until the next lease.
+                maker._clear_history()
+                with self.__lock:
+                    self.__leased -= 1
+                    self.__idle.append(maker)
+        finally:
+            self.__slots.release()
+
+
+    def close(self):
+        """Returns the idle StoryMakers' HTTP clients to ClientPool. Leased ones are unaffected."""
+        with self.__lock:
+            idle, self.__idle = self.__idle, []
+        for maker in idle:
+            maker.close()
+
+
+    def get_stats(self) -> dict:
+        """
+        Returns the pool's counters.
+
+        Returns:
+            dict: max_size, leased (conversations in use), idle (kept for reuse),
+                created (StoryMakers ever built), waits (leases that had to wait
+                for a free conversation) and max_wait in seconds.
+        """
+        with self.__lock:
+            return {
+                "max_size": self.max_size,
+                "leased": self.__leased,
+                "idle": len(self.__idle),
+                "created": self.__created,
+                "waits": self.__waits,
+                "max_wait": self.__wait_max,
+            }
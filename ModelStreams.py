@@ -0,0 +1,336 @@
+from collections import deque
+import socket
+import threading
+import time
+
+class StreamStalledError(TimeoutError):
+    """
+    Raised when a model stream stops producing chunks in time.
+
+    Attributes:
+        partial (str): The text produced before the stream gave up.
+    """
+
+    def __init__(self, message: str, partial: str = ""):
+        super().__init__(message)
+        self.partial = partial
+
+
+class StreamCancelledError(RuntimeError):
+    """Raised in a stream whose CancelScope was cancelled."""
+
+
+class CancelScope:
+    """
+    Lets one thread stop the model streams that another thread is reading.
+
+    The reading thread enters the scope with `with scope:`. While it is
+    active there, StoryMaker reads every stream through a StreamPump and
+    registers it with the scope, and SingleFlight registers every caller
+    that waits on a shared stream. cancel(), from any thread, closes those
+    streams and makes the waiting reads raise StreamCancelledError at once,
+    instead of when the next chunk arrives (which, on a stalled connection,
+    may be never).
+
+    A cancelled scope stays cancelled; use a new one per generation.
+    """
+
+    __local = threading.local()
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__callbacks = []
+        self.__cancelled = False
+        self.__previous = None
+
+
+    @classmethod
+    def current(cls) -> "CancelScope | None":
+        """Returns the scope active on the calling thread, or None."""
+        return getattr(cls.__local, "scope", None)
+
+
+    def __enter__(self):
+        self.__previous = CancelScope.current()
+        CancelScope.__local.scope = self
+        return self
+
+
+    def __exit__(self, _exc_type, _exc_val, _exc_tb):
+        CancelScope.__local.scope = self.__previous
+
+
+    def add(self, callback):
+        """
+        Registers a function that cancel() calls. Calls it at once if the scope is already cancelled.
+
+        Args:
+            callback (callable): Takes no arguments. Exceptions it raises are ignored.
+        """
+        with self.__lock:
+            if not self.__cancelled:
+                self.__callbacks.append(callback)
+                return
+        self.__call(callback)
+
+
+    def cancel(self):
+        """Closes every registered stream. Safe to call more than once and from any thread."""
+        with self.__lock:
+            if self.__cancelled:
+                return
+            self.__cancelled = True
+            callbacks, self.__callbacks = self.__callbacks, []
+        for callback in callbacks:
+            self.__call(callback)
+
+
+    def is_cancelled(self) -> bool:
+        """Returns True once cancel() has been called."""
+        with self.__lock:
+            return self.__cancelled
+
+
+    @staticmethod
+    def __call(callback):
+        try:
+            callback()
+        except Exception:
+            pass
+
+
+def close_response(response):
+    """
+    Closes a streaming response, waking any thread blocked reading it.
+
+    Closing a response only closes its socket, which does not wake a thread
+    already waiting in a read on it; that thread would wait for the server's
+    next bytes. The socket is shut down first, so the read fails at once.
+
+    Args:
+        response (openai.Stream | httpx.Response): The response to close.
+    """
+    raw = getattr(response, "response", response)
+    network_stream = getattr(raw, "extensions", {}).get("network_stream")
+    if network_stream is not None:
+        try:
+            network_socket = network_stream.get_extra_info("socket")
+            if network_socket is not None:
+                network_socket.shutdown(socket.SHUT_RDWR)
+        except (OSError, AttributeError):
+            pass
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
+class StreamPump:
+    """
+    Reads one model stream on a background thread and forwards it to a queue.
+
+    Lets StoryMaker race several streams against each other (hedging) and
+    wait on a stream with a timeout (the stall watchdog) without blocking on
+    any single connection. Every event is put on the shared queue as a
+    (pump_id, kind, value) tuple, where kind is one of:
+
+        "chunk"  value is (model, text) for a piece of content
+        "done"   value is None; the stream finished normally
+        "error"  value is the exception that stopped the stream
+
+    A cancelled pump stops reading, closes its response and emits nothing more.
+
+    Attributes:
+        first_token_at (float | None): time.monotonic() value at which the
+            first piece of content arrived, or None if none has yet.
+    """
+
+    def __init__(self, pump_id, open_stream, events, observer=None):
+        """
+        Starts reading immediately.
+
+        Args:
+            pump_id: Identifies this pump's events on the queue.
+            open_stream (callable): Opens the stream; called on the background
+                thread so connecting does not block the caller.
+            events (queue.Queue): Where events are put.
+            observer (CallTimer | None): Told when the response opens and
+                about token usage, from the background thread.
+        """
+        self.pump_id = pump_id
+        self.first_token_at = None
+        self.__open_stream = open_stream
+        self.__events = events
+        self.__observer = observer
+        self.__cancelled = threading.Event()
+        self.__response = None
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+
+    def __run(self):
+        try:
+            self.__response = self.__open_stream()
+            if self.__cancelled.is_set():
+                return
+            if self.__observer is not None:
+                self.__observer.opened()
+            for chunk in self.__response:
+                if self.__cancelled.is_set():
+                    return
+                if self.__observer is not None and getattr(chunk, "usage", None) is not None:
+                    self.__observer.usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if self.first_token_at is None:
+                        self.first_token_at = time.monotonic()
+                    self.__events.put((self.pump_id, "chunk", (chunk.model, chunk.choices[0].delta.content)))
+            self.__events.put((self.pump_id, "done", None))
+        except Exception as error:
+            if not self.__cancelled.is_set():
+                self.__events.put((self.pump_id, "error", error))
+        finally:
+            if self.__cancelled.is_set():
+                self.__close()
+
+
+    def __close(self):
+        response = self.__response
+        if response is not None:
+            close_response(response)
+
+
+    def cancel(self):
+        """Stops the stream and releases its connection. Safe to call more than once."""
+        self.__cancelled.set()
+        self.__close()
+
+
+class LatencyTracker:
+    """
+    Remembers recent time-to-first-token samples per model.
+
+    Thread-safe. Used by StoryMaker's hedging mode to derive the hedge delay
+    from the observed 95th percentile instead of a fixed value.
+
+    A hedged stream that is cancelled before its first token only tells us
+    that the model was slower than the time it ran for. Such samples are
+    recorded as censored and percentile() uses the Kaplan-Meier estimator,
+    so the slow tail is not dropped from the estimate just because hedging
+    cut it short.
+    """
+
+    def __init__(self, max_samples: int = 200, min_samples: int = 20):
+        """
+        Args:
+            max_samples (int): How many recent samples are kept per model.
+            min_samples (int): How many samples are needed before percentile()
+                returns a value.
+        """
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self.__samples = {}
+        self.__lock = threading.Lock()
+
+
+    def record(self, model: str, seconds: float, censored: bool = False):
+        """
+        Adds a time-to-first-token sample.
+
+        Args:
+            model (str): The model that was called.
+            seconds (float): Seconds from sending the request to the first token.
+            censored (bool): True if the stream was cancelled before its first
+                token, so seconds is only a lower bound.
+        """
+        with self.__lock:
+            samples = self.__samples.setdefault(model, deque(maxlen=self.max_samples))
+            samples.append((seconds, censored))
+
+
+    def percentile(self, model: str, fraction: float = 0.95) -> float | None:
+        """
+        Returns a percentile of the recent samples for a model.
+
+        Args:
+            model (str): The model to look up.
+            fraction (float): The percentile as a fraction, e.g. 0.95 for p95.
+
+        Returns:
+            float | None: The percentile in seconds, or None if there are fewer
+                than min_samples samples. If censored samples hide the
+                percentile, the largest sample is returned as a lower bound.
+        """
+        with self.__lock:
+            samples = sorted(self.__samples.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        # Kaplan-Meier: at equal times, observed samples sort before censored ones.
+        at_risk = len(samples)
+        survival = 1.0
+        for seconds, censored in samples:
+            if not censored:
+                survival *= 1 - 1 / at_risk
+                if 1 - survival > fraction + 1e-9:
+                    return seconds
+            at_risk -= 1
+        return samples[-1][0]
+
+
+def coalesce_chunks(chunks, interval: float | None = 0.1, max_chars: int | None = 1024):
+    """
+    Merges a stream of small text chunks into fewer, larger ones.
+
+    Models stream a delta every token or two, and a renderer that redraws on
+    every delta does thousands of updates per story. This passes the first
+    chunk through at once, so the time to first token is unchanged, then
+    buffers the following ones and yields the buffer when interval seconds
+    have passed since the last yield or it holds max_chars characters. The
+    rest is yielded when the stream ends. Nothing is dropped or reordered:
+    the joined output equals the joined input.
+
+    No thread is involved, so the buffer is checked when a chunk arrives: if
+    the stream pauses, the buffered text waits for the next chunk (or the
+    end of the stream).
+
+    Closing the returned generator closes chunks too.
+
+    Args:
+        chunks (iterable[str]): The stream to merge, e.g. generate_story().
+        interval (float | None): Seconds between yields. None flushes on
+            max_chars only.
+        max_chars (int | None): Buffer size that forces a yield. None flushes
+            on interval only.
+
+    Yields:
+        str: The merged chunks.
+
+    Raises:
+        ValueError: If both interval and max_chars are None.
+    """
+    if interval is None and max_chars is None:
+        raise ValueError("Set interval, max_chars or both.")
+    chunks = iter(chunks)
+    buffer = []
+    size = 0
+    last_flush = None
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer.append(chunk)
+            size += len(chunk)
+            now = time.monotonic()
+            if (last_flush is None
+                    or (interval is not None and now - last_flush >= interval)
+                    or (max_chars is not None and size >= max_chars)):
+                text = "".join(buffer)
+                buffer.clear()
+                size = 0
+                last_flush = now
+                yield text
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,235 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import re
+import threading
+
+class PosterCache:
+    """
+    Display-sized poster thumbnails, cached on disk and in memory.
+
+    The posters in story_inputs/posters are full-size JPEGs, far larger than
+    a card shows them. get() scales a poster down once, writes the thumbnail
+    to the cache directory, and from then on returns its encoded JPEG bytes:
+    from a bounded in-memory LRU if possible, otherwise from disk. Neither
+    path decodes an image, and the bytes can go straight to st.image().
+
+    Thumbnails are keyed on the poster's name, modification time and the
+    thumbnail size, so editing a poster produces a new thumbnail, and the
+    stale one is deleted when it is replaced.
+
+    publish() goes one step further for Streamlit's static file serving: it
+    copies the thumbnail into the app's static folder under a content-hashed
+    name and returns its URL. The browser then fetches and caches the image
+    itself, and the server does no image work on later reruns.
+
+    Thread-safe; one cache can be shared by every session
+    (see StoryHelper.set_poster_cache()).
+    """
+
+    def __init__(self, directory: str = "outputs/cache/posters", max_size: tuple = (400, 600),
+                 quality: int = 85, max_entries: int = 64,
+                 static_directory: str = "static/posters", static_url: str = "app/static/posters"):
+        """
+        Args:
+            directory (str): Where thumbnails are stored.
+            max_size (tuple[int, int]): Bounding box (width, height) of a
+                thumbnail. The aspect ratio is kept.
+            quality (int): JPEG quality of the thumbnails.
+            max_entries (int): How many thumbnails are kept in memory.
+            static_directory (str): Where publish() puts thumbnails. Streamlit
+                serves the "static" folder next to the app when
+                server.enableStaticServing is on.
+            static_url (str): The URL path static_directory is served under.
+        """
+        self.__directory = Path(directory)
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = tuple(max_size)
+        self.quality = quality
+        self.max_entries = max_entries
+        self.__lock = threading.Lock()
+        # (source path, mtime, size) -> JPEG bytes, least recently used first.
+        self.__memory = OrderedDict()
+        self.__memory_bytes = 0
+        self.__memory_hits = 0
+        self.__disk_hits = 0
+        self.__generated = 0
+        self.__static_directory = Path(static_directory)
+        self.__static_url = static_url.rstrip("/")
+        # (source path, mtime, size) -> URL of the published thumbnail.
+        self.__published = {}
+
+
+    def __thumbnail_path(self, source: Path, mtime_ns: int) -> Path:
+        width, height = self.max_size
+        return self.__directory / f"{source.stem}_{mtime_ns}_{width}x{height}.jpg"
+
+
+    def get(self, source, mtime_ns: int | None = None) -> bytes:
+        """
+        Returns the thumbnail of a poster as JPEG bytes, creating it if needed.
+
+        Args:
+            source (str | Path): The full-size poster file.
+            mtime_ns (int | None): The poster's modification time, if the caller
+                already knows it. None reads it from the file.
+
+        Returns:
+            bytes: The encoded thumbnail.
+
+        Raises:
+            FileNotFoundError: If the poster does not exist.
+            OSError: If the poster cannot be read as an image.
+        """
+        source = Path(source)
+        if mtime_ns is None:
+            mtime_ns = source.stat().st_mtime_ns
+        key = (str(source), mtime_ns, self.max_size)
+
+        with self.__lock:
+            data = self.__memory.get(key)
+            if data is not None:
+                self.__memory.move_to_end(key)
+                self.__memory_hits += 1
+                return data
+
+        path = self.__thumbnail_path(source, mtime_ns)
+        try:
+            data = path.read_bytes()
+            generated = False
+        except FileNotFoundError:
+            data = self.__generate(source, path)
+            generated = True
+
+        with self.__lock:
+            if generated:
+                self.__generated += 1
+            else:
+                self.__disk_hits += 1
+            if key not in self.__memory:
+                self.__memory[key] = data
+                self.__memory_bytes += len(data)
+                while len(self.__memory) > self.max_entries:
+                    _, evicted = self.__memory.popitem(last=False)
+                    self.__memory_bytes -= len(evicted)
+        return data
+
+
+    def __generate(self, source: Path, path: Path) -> bytes:
+        """Scales a poster down, stores the thumbnail at path and returns its bytes."""
+        # Pillow is only needed when a thumbnail is actually made.
+        from PIL import Image
+        from io import BytesIO
+
+        with Image.open(source) as image:
+            image = image.convert("RGB")
+            image.thumbnail(self.max_size, Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+        data = buffer.getvalue()
+
+        # Write to a temporary file first so a crash never leaves a half thumbnail.
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        temp_path.write_bytes(data)
+        temp_path.replace(path)
+
+        # Thumbnails of older versions of this poster are no longer reachable.
+        width, height = self.max_size
+        self.__remove_stale(self.__directory, re.escape(source.stem) + rf"_\d+_{width}x{height}\.jpg", path)
+        return data
+
+
+    @staticmethod
+    def __remove_stale(directory: Path, pattern: str, keep: Path):
+        """
+        Deletes the files in directory whose whole name matches pattern, except keep.
+
+        A glob on the poster's name is not enough: "01_Hero_*" also matches the
+        files of a poster called "01_Hero_Two".
+        """
+        name = re.compile(pattern)
+        for stale in directory.glob("*.jpg"):
+            if stale != keep and name.fullmatch(stale.name):
+                stale.unlink(missing_ok=True)
+
+
+    def publish(self, source, mtime_ns: int | None = None) -> str:
+        """
+        Publishes a poster's thumbnail as a static file and returns its URL.
+
+        The file is named after the poster and a hash of the thumbnail's
+        content, so a URL always refers to the same bytes; a changed poster
+        gets a new URL. The hash is also added as a ?v= query: Streamlit's
+        static file handler (Tornado's) only sends a long-lived Cache-Control
+        header for versioned URLs, so without it browsers revalidate every
+        poster on every page load. Once published, later calls return the URL
+        from memory without any file access.
+
+        Args:
+            source (str | Path): The full-size poster file.
+            mtime_ns (int | None): The poster's modification time, if the caller
+                already knows it. None reads it from the file.
+
+        Returns:
+            str: The thumbnail's URL, relative to the app (e.g.
+                "app/static/posters/01_The_Reluctant_Hero.3f2a9c1b04de.jpg?v=3f2a9c1b04de").
+
+        Raises:
+            FileNotFoundError: If the poster does not exist.
+            OSError: If the poster cannot be read as an image.
+        """
+        source = Path(source)
+        if mtime_ns is None:
+            mtime_ns = source.stat().st_mtime_ns
+        key = (str(source), mtime_ns, self.max_size)
+        with self.__lock:
+            url = self.__published.get(key)
+        if url is not None:
+            return url
+
+        data = self.get(source, mtime_ns)
+        version = hashlib.sha256(data).hexdigest()[:12]
+        name = f"{source.stem}.{version}.jpg"
+        path = self.__static_directory / name
+        if not path.exists():
+            self.__static_directory.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            temp_path.write_bytes(data)
+            temp_path.replace(path)
+            # Older versions of this poster are no longer referenced.
+            self.__remove_stale(self.__static_directory, re.escape(source.stem) + r"\.[0-9a-f]{12}\.jpg", path)
+
+        url = f"{self.__static_url}/{name}?v={version}"
+        with self.__lock:
+            self.__published[key] = url
+        return url
+
+
+    def clear(self):
+        """Deletes every thumbnail, on disk, in memory and in the static folder."""
+        with self.__lock:
+            self.__memory.clear()
+            self.__memory_bytes = 0
+            self.__published.clear()
+            for path in self.__directory.glob("*.jpg"):
+                path.unlink(missing_ok=True)
+            for path in self.__static_directory.glob("*.jpg"):
+                path.unlink(missing_ok=True)
+
+
+    def get_stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: memory_hits, disk_hits, generated (thumbnails made),
+                entries and bytes held in memory.
+        """
+        with self.__lock:
+            return {
+                "memory_hits": self.__memory_hits,
+                "disk_hits": self.__disk_hits,
+                "generated": self.__generated,
+                "entries": len(self.__memory),
+                "bytes": self.__memory_bytes,
+            }
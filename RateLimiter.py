@@ -0,0 +1,275 @@
+import random
+import threading
+import time
+
+class TokenBucket:
+    """
+    A classic token bucket: capacity tokens, refilled continuously at rate per second.
+
+    Not thread-safe on its own; RateLimitScheduler guards every bucket with its lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum tokens held, i.e. the allowed burst.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.__updated = time.monotonic()
+
+
+    def refill(self):
+        """Adds the tokens earned since the last refill."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Returns how many seconds until amount tokens are available (0 if they are now).
+
+        An amount larger than the capacity only waits for a full bucket, so an
+        oversized request is not blocked forever.
+        """
+        self.refill()
+        needed = min(amount, self.capacity) - self.tokens
+        if needed <= 0:
+            return 0.0
+        return needed / self.rate
+
+
+    def take(self, amount: float):
+        """Removes tokens. The balance may go negative, which delays later requests."""
+        self.tokens -= amount
+
+
+class RateLimitScheduler:
+    """
+    A client-side scheduler that keeps StoryMaker under OpenRouter's rate limits.
+
+    Every model gets a request bucket (requests per minute) and, optionally, a
+    token bucket (tokens per minute). acquire() blocks the calling thread until
+    both buckets allow the request, so concurrent callers queue up instead of
+    bursting into 429 errors. The scheduler adapts to the provider: rate-limit
+    response headers drain the request bucket when the provider has less
+    budget left than expected, and a 429 pauses the model until its reset time
+    (or an exponential backoff with jitter) before the request is retried.
+
+    Thread-safe; share one scheduler between every StoryMaker in the process
+    (see StoryMaker.set_rate_limiter()).
+    """
+
+    def __init__(self, requests_per_minute: float = 20, tokens_per_minute: float | None = None,
+                 max_retries: int = 5, base_backoff: float = 1.0, max_backoff: float = 60.0,
+                 model_limits: dict | None = None):
+        """
+        Args:
+            requests_per_minute (float): Default request budget per model.
+            tokens_per_minute (float | None): Default token budget per model, or
+                None to only limit requests.
+            max_retries (int): How many times a request rejected with 429 is retried.
+            base_backoff (float): First backoff in seconds when a 429 gives no reset time.
+            max_backoff (float): Upper bound for a single backoff.
+            model_limits (dict | None): Per-model overrides, mapping a model name
+                to a (requests_per_minute, tokens_per_minute) tuple.
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.__model_limits = dict(model_limits or {})
+        self.__lock = threading.Lock()
+        self.__request_buckets = {}
+        self.__token_buckets = {}
+        self.__paused_until = {}
+        self.__queue_depth = 0
+        self.__waits = 0
+        self.__wait_total = 0.0
+        self.__wait_max = 0.0
+        self.__rate_limited = 0
+
+
+    def __buckets(self, model: str) -> tuple:
+        """Returns (request bucket, token bucket or None) for a model. Caller holds the lock."""
+        if model not in self.__request_buckets:
+            rpm, tpm = self.__model_limits.get(model, (self.requests_per_minute, self.tokens_per_minute))
+            self.__request_buckets[model] = TokenBucket(rpm / 60, max(rpm, 1))
+            self.__token_buckets[model] = TokenBucket(tpm / 60, tpm) if tpm else None
+        return self.__request_buckets[model], self.__token_buckets[model]
+
+
+    def acquire(self, model: str, tokens: int = 0) -> float:
+        """
+        Blocks until a request to model fits in its budgets, then spends them.
+
+        Args:
+            model (str): The model the request is sent to.
+            tokens (int): Estimated prompt tokens of the request.
+
+        Returns:
+            float: The seconds spent waiting.
+        """
+        waited = 0.0
+        queued = False
+        try:
+            while True:
+                with self.__lock:
+                    requests, token_bucket = self.__buckets(model)
+                    wait = max(
+                        self.__paused_until.get(model, 0.0) - time.monotonic(),
+                        requests.wait_time(1),
+                        token_bucket.wait_time(tokens) if token_bucket is not None else 0.0,
+                    )
+                    if wait <= 0:
+                        requests.take(1)
+                        if token_bucket is not None:
+                            token_bucket.take(tokens)
+                        if waited > 0:
+                            self.__waits += 1
+                            self.__wait_total += waited
+                            self.__wait_max = max(self.__wait_max, waited)
+                        return waited
+                    if not queued:
+                        self.__queue_depth += 1
+                        queued = True
+
+                # A little jitter keeps queued callers from waking in lockstep.
+                delay = wait + random.uniform(0, min(wait, 1.0) * 0.1)
+                time.sleep(delay)
+                waited += delay
+        finally:
+            if queued:
+                with self.__lock:
+                    self.__queue_depth -= 1
+
+
+    def charge(self, model: str, tokens: int):
+        """
+        Spends extra tokens after a response, e.g. its completion tokens.
+
+        Args:
+            model (str): The model that was called.
+            tokens (int): Tokens to take from the model's token bucket.
+        """
+        with self.__lock:
+            _, token_bucket = self.__buckets(model)
+            if token_bucket is not None:
+                token_bucket.take(tokens)
+
+
+    def update_from_headers(self, model: str, headers):
+        """
+        Adapts the model's request budget to the provider's rate-limit headers.
+
+        If the provider reports fewer remaining requests than the local bucket
+        holds, the bucket is drained to match, and when nothing remains the
+        model is paused until the reported reset time. Understands OpenRouter's
+        X-RateLimit-Remaining / X-RateLimit-Reset (reset as epoch milliseconds),
+        the OpenAI-style x-ratelimit-remaining-requests, and Retry-After.
+
+        Args:
+            model (str): The model that was called.
+            headers (Mapping[str, str]): The response headers.
+        """
+        remaining = self.__header_number(headers, "x-ratelimit-remaining-requests", "x-ratelimit-remaining")
+        if remaining is None:
+            return
+        reset_at = self.__reset_time(headers)
+        with self.__lock:
+            requests, _ = self.__buckets(model)
+            requests.refill()
+            requests.tokens = min(requests.tokens, remaining)
+            if remaining <= 0 and reset_at is not None:
+                self.__paused_until[model] = max(self.__paused_until.get(model, 0.0), reset_at)
+
+
+    def on_rate_limited(self, model: str, headers, attempt: int) -> float:
+        """
+        Pauses a model after a 429 response.
+
+        Args:
+            model (str): The model that rejected the request.
+            headers (Mapping[str, str]): The 429 response headers.
+            attempt (int): How many times this request has already been retried.
+
+        Returns:
+            float: The seconds the model is paused for.
+        """
+        reset_at = self.__reset_time(headers)
+        if reset_at is not None:
+            delay = min(max(reset_at - time.monotonic(), 0.0), self.max_backoff)
+        else:
+            delay = self.backoff(attempt)
+        with self.__lock:
+            self.__rate_limited += 1
+            self.__paused_until[model] = max(self.__paused_until.get(model, 0.0), time.monotonic() + delay)
+        return delay
+
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns an exponential backoff with full jitter for a retry.
+
+        Also used by StoryMaker for retrying server and connection errors,
+        which do not pause the model.
+
+        Args:
+            attempt (int): How many times the request has already been retried.
+
+        Returns:
+            float: Seconds to wait, at most max_backoff.
+        """
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+
+    @staticmethod
+    def __header_number(headers, *names) -> float | None:
+        for name in names:
+            value = headers.get(name)
+            if value is not None:
+                try:
+                    return float(value)
+                except ValueError:
+                    pass
+        return None
+
+
+    @classmethod
+    def __reset_time(cls, headers) -> float | None:
+        """Returns the time.monotonic() value at which the limit resets, if the headers say."""
+        retry_after = cls.__header_number(headers, "retry-after")
+        if retry_after is not None:
+            return time.monotonic() + retry_after
+        reset = cls.__header_number(headers, "x-ratelimit-reset")
+        if reset is not None:
+            # OpenRouter sends an epoch timestamp in milliseconds.
+            return time.monotonic() + max(reset / 1000 - time.time(), 0.0)
+        return None
+
+
+    def get_stats(self) -> dict:
+        """
+        Returns the scheduler's queue and wait counters.
+
+        Returns:
+            dict: queue_depth (callers waiting right now), waits (requests that
+                had to wait), mean_wait and max_wait in seconds, rate_limited
+                (429 responses seen) and, per model, the requests currently
+                available.
+        """
+        with self.__lock:
+            return {
+                "queue_depth": self.__queue_depth,
+                "waits": self.__waits,
+                "mean_wait": self.__wait_total / self.__waits if self.__waits else 0.0,
+                "max_wait": self.__wait_max,
+                "rate_limited": self.__rate_limited,
+                "available_requests": {
+                    model: round(bucket.tokens, 2) for model, bucket in self.__request_buckets.items()
+                },
+            }
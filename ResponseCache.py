@@ -0,0 +1,201 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import threading
+import time
+
+class ResponseCache:
+    """
+    A content-addressed, on-disk cache of model responses.
+
+    Each entry is keyed on a stable SHA-256 hash of the full request (base URL,
+    model, fallback models, messages, temperature and max_tokens) and stored as
+    one small JSON file, so the cache survives restarts. The cache is bounded by
+    entry count and, optionally, total bytes; the least recently used entries
+    are evicted first. Entries older than ttl seconds are treated as misses and
+    removed.
+
+    Instances are thread-safe, so one cache can be shared by every StoryMaker
+    in the process (see StoryMaker.set_response_cache()).
+
+    Attributes:
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that had to go to the model.
+    """
+
+    def __init__(self, directory: str = "outputs/cache", max_entries: int = 1000,
+                 max_bytes: int | None = None, ttl: float | None = None):
+        """
+        Opens (or creates) a cache directory and indexes the entries already in it.
+
+        Args:
+            directory (str): Where cache files are stored.
+            max_entries (int): Maximum number of cached responses.
+            max_bytes (int | None): Maximum total size of the cache files. None
+                means no byte limit.
+            ttl (float | None): Seconds an entry stays fresh. None means entries
+                never expire.
+        """
+        self.__directory = Path(directory)
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+
+        # key -> file size, ordered from least to most recently used.
+        # File mtimes record last use, so the LRU order survives restarts.
+        self.__index = OrderedDict()
+        self.__total_bytes = 0
+        entries = sorted(self.__directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in entries:
+            size = path.stat().st_size
+            self.__index[path.stem] = size
+            self.__total_bytes += size
+
+
+    @staticmethod
+    def make_key(request: dict) -> str:
+        """
+        Returns a stable hash of a chat completion request.
+
+        The stream flag and stream options are ignored, so a response cached by
+        generate() can be replayed by stream_generate() and vice versa.
+
+        Args:
+            request (dict): The request keyword arguments, plus the base URL.
+
+        Returns:
+            str: A hex SHA-256 digest.
+        """
+        request = {name: value for name, value in request.items() if name not in ("stream", "stream_options")}
+        encoded = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+    def __path(self, key: str) -> Path:
+        return self.__directory / f"{key}.json"
+
+
+    def __remove(self, key: str):
+        """Deletes an entry's file and index record. Caller must hold the lock."""
+        self.__total_bytes -= self.__index.pop(key, 0)
+        self.__path(key).unlink(missing_ok=True)
+
+
+    def get(self, key: str) -> str | None:
+        """
+        Looks up a cached response and marks it as recently used.
+
+        Args:
+            key (str): A key from make_key().
+
+        Returns:
+            str | None: The cached response text, or None on a miss.
+        """
+        with self.__lock:
+            if key not in self.__index:
+                self.misses += 1
+                return None
+
+            path = self.__path(key)
+            try:
+                with open(path, encoding="utf-8") as file:
+                    entry = json.load(file)
+            except (OSError, ValueError):
+                self.__remove(key)
+                self.misses += 1
+                return None
+
+            if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+                self.__remove(key)
+                self.misses += 1
+                return None
+
+            self.__index.move_to_end(key)
+            path.touch()
+            self.hits += 1
+            return entry["content"]
+
+
+    def put(self, key: str, content: str):
+        """
+        Stores a response, evicting least recently used entries if over budget.
+
+        Args:
+            key (str): A key from make_key().
+            content (str): The complete response text.
+        """
+        data = json.dumps({"created": time.time(), "content": content}, ensure_ascii=False).encode("utf-8")
+        with self.__lock:
+            if key in self.__index:
+                self.__remove(key)
+
+            # Write to a temporary file first so a crash never leaves a half entry.
+            path = self.__path(key)
+            temp_path = path.with_suffix(".tmp")
+            temp_path.write_bytes(data)
+            temp_path.replace(path)
+            self.__index[key] = len(data)
+            self.__total_bytes += len(data)
+
+            while self.__index and (
+                len(self.__index) > self.max_entries
+                or (self.max_bytes is not None and self.__total_bytes > self.max_bytes)
+            ):
+                self.__remove(next(iter(self.__index)))
+
+
+    def clear(self):
+        """Deletes every cached entry and resets the hit and miss counters."""
+        with self.__lock:
+            for key in list(self.__index):
+                self.__remove(key)
+            self.hits = 0
+            self.misses = 0
+
+
+    def get_stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: hits, misses, hit_rate, entries and bytes.
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.__index),
+                "bytes": self.__total_bytes,
+            }
+
+
+def iter_chunks(content: str, chunk_size: int = 24):
+    """
+    Splits text into stream-sized chunks, breaking after whitespace where possible.
+
+    Used to replay a cached response through stream_generate() so callers see
+    the same kind of chunked stream a live model produces.
+
+    Args:
+        content (str): The text to split.
+        chunk_size (int): The approximate number of characters per chunk.
+
+    Yields:
+        str: Consecutive pieces of content.
+    """
+    start = 0
+    while start < len(content):
+        end = min(start + chunk_size, len(content))
+        if end < len(content):
+            space = content.rfind(" ", start, end)
+            if space > start:
+                end = space + 1
+        yield content[start:end]
+        start = end
@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import shutil
+import tempfile
+import threading
+import weakref
+import zlib
+
+class SessionStoryStore:
+    """
+    The stories generated in one app session, kept within a memory budget.
+
+    Stories are stored under any hashable key (the app uses a card's
+    session key and the story's StoryRecord). Each distinct text is held once,
+    however many keys refer to it, so a story shown on its card and listed
+    in the Created Stories tab costs its memory only once.
+
+    At most memory_budget bytes of text stay in memory, most recently used
+    first. Older texts are compressed with zlib into a private folder under
+    spill_directory and read back when get() asks for them. A text that no
+    key refers to any more is dropped from memory and from disk.
+
+    The spill folder is deleted by close(), or when the store is garbage
+    collected, e.g. when its Streamlit session ends.
+
+    Thread-safe.
+    """
+
+    def __init__(self, memory_budget: int = 256 * 1024, spill_directory: str = "outputs/cache/sessions",
+                 compression_level: int = 6):
+        """
+        Args:
+            memory_budget (int): Bytes of (UTF-8) story text kept in memory.
+            spill_directory (str): Where the store creates its spill folder.
+            compression_level (int): zlib level for spilled texts, 1 to 9.
+
+        Raises:
+            ValueError: If memory_budget is negative.
+        """
+        if memory_budget < 0:
+            raise ValueError("memory_budget must not be negative.")
+        self.memory_budget = memory_budget
+        self.compression_level = compression_level
+        self.__spill_root = Path(spill_directory)
+        self.__spill_path = None
+        self.__finalizer = None
+        self.__lock = threading.Lock()
+        # key -> digest, in insertion order.
+        self.__keys = {}
+        # digest -> number of keys referring to it.
+        self.__references = {}
+        # digest -> text, least recently used first.
+        self.__memory = OrderedDict()
+        self.__memory_bytes = 0
+        # digest -> compressed size, for every text written to disk.
+        self.__spilled = {}
+        self.__spills = 0
+        self.__page_ins = 0
+
+
+    def __spill_folder(self) -> Path:
+        """Creates the spill folder on first use. Caller holds the lock."""
+        if self.__spill_path is None:
+            self.__spill_root.mkdir(parents=True, exist_ok=True)
+            self.__spill_path = Path(tempfile.mkdtemp(prefix="stories-", dir=self.__spill_root))
+            self.__finalizer = weakref.finalize(self, shutil.rmtree, self.__spill_path, True)
+        return self.__spill_path
+
+
+    def put(self, key, text: str):
+        """
+        Stores a story under a key, replacing what the key held before.
+
+        Args:
+            key: Any hashable key.
+            text (str): The story text.
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self.__lock:
+            previous = self.__keys.pop(key, None)
+            self.__keys[key] = digest
+            self.__references[digest] = self.__references.get(digest, 0) + 1
+            if previous is not None:
+                self.__release(previous)
+            if digest in self.__memory:
+                self.__memory.move_to_end(digest)
+            elif digest not in self.__spilled:
+                self.__remember(digest, text, len(data))
+
+
+    def get(self, key, default=None):
+        """
+        Returns the story stored under a key, reading it back from disk if it was spilled.
+
+        Args:
+            key: The key the story was stored under.
+            default: Returned if nothing is stored under the key.
+
+        Returns:
+            str: The story text, or default.
+        """
+        with self.__lock:
+            digest = self.__keys.get(key)
+            if digest is None:
+                return default
+            text = self.__memory.get(digest)
+            if text is not None:
+                self.__memory.move_to_end(digest)
+                return text
+            data = zlib.decompress((self.__spill_path / digest).read_bytes())
+            text = data.decode("utf-8")
+            self.__page_ins += 1
+            self.__remember(digest, text, len(data))
+            return text
+
+
+    def __remember(self, digest: str, text: str, size: int):
+        """Keeps a text in memory and spills older ones over the budget. Caller holds the lock."""
+        self.__memory[digest] = text
+        self.__memory_bytes += size
+        # The newest text always stays, even if it alone is over the budget.
+        while self.__memory_bytes > self.memory_budget and len(self.__memory) > 1:
+            old_digest, old_text = self.__memory.popitem(last=False)
+            data = old_text.encode("utf-8")
+            self.__memory_bytes -= len(data)
+            if old_digest not in self.__spilled:
+                # Spilled texts never change, so a text read back in keeps its file.
+                compressed = zlib.compress(data, self.compression_level)
+                (self.__spill_folder() / old_digest).write_bytes(compressed)
+                self.__spilled[old_digest] = len(compressed)
+                self.__spills += 1
+
+
+    def __release(self, digest: str):
+        """Drops one reference to a text and forgets it once none are left. Caller holds the lock."""
+        self.__references[digest] -= 1
+        if self.__references[digest]:
+            return
+        del self.__references[digest]
+        text = self.__memory.pop(digest, None)
+        if text is not None:
+            self.__memory_bytes -= len(text.encode("utf-8"))
+        if self.__spilled.pop(digest, None) is not None:
+            (self.__spill_path / digest).unlink(missing_ok=True)
+
+
+    def discard(self, key):
+        """Removes a key. Does nothing if nothing is stored under it."""
+        with self.__lock:
+            digest = self.__keys.pop(key, None)
+            if digest is not None:
+                self.__release(digest)
+
+
+    def keys(self, kind: type | None = None) -> list:
+        """
+        Returns the stored keys, oldest first, without reading any text.
+
+        Args:
+            kind (type | None): Only keys that are instances of this type,
+                e.g. StoryRecord.
+        """
+        with self.__lock:
+            return [key for key in self.__keys if kind is None or isinstance(key, kind)]
+
+
+    def __contains__(self, key) -> bool:
+        with self.__lock:
+            return key in self.__keys
+
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__keys)
+
+
+    def close(self):
+        """Forgets every story and deletes the spill folder."""
+        with self.__lock:
+            self.__keys.clear()
+            self.__references.clear()
+            self.__memory.clear()
+            self.__memory_bytes = 0
+            self.__spilled.clear()
+            if self.__finalizer is not None:
+                self.__finalizer()
+                self.__finalizer = None
+                self.__spill_path = None
+
+
+    def get_stats(self) -> dict:
+        """
+        Returns the store's counters.
+
+        Returns:
+            dict: keys, texts (distinct stories), memory_texts and memory_bytes
+                (held in memory), disk_texts and disk_bytes (compressed files),
+                spills (texts written to disk) and page_ins (texts read back).
+        """
+        with self.__lock:
+            return {
+                "keys": len(self.__keys),
+                "texts": len(self.__references),
+                "memory_texts": len(self.__memory),
+                "memory_bytes": self.__memory_bytes,
+                "disk_texts": len(self.__spilled),
+                "disk_bytes": sum(self.__spilled.values()),
+                "spills": self.__spills,
+                "page_ins": self.__page_ins,
+            }
@@ -0,0 +1,206 @@
+from ModelStreams import CancelScope, StreamCancelledError
+import threading
+
+class _Flight:
+    """
+    The shared state of one in-flight stream: every chunk so far, and how it ended.
+
+    followers counts the callers currently following the stream; SingleFlight
+    updates it under its own lock. abandoned is set once they have all left
+    before the stream ended, and scope is cancelled with it, which closes
+    the upstream stream.
+    """
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__chunks = []
+        self.__done = False
+        self.__error = None
+        self.followers = 0
+        self.abandoned = threading.Event()
+        self.scope = CancelScope()
+
+
+    def add(self, chunk: str):
+        """Appends a chunk and wakes every follower."""
+        with self.__condition:
+            self.__chunks.append(chunk)
+            self.__condition.notify_all()
+
+
+    def finish(self, error: BaseException | None = None):
+        """Marks the stream as ended, successfully or with error."""
+        with self.__condition:
+            self.__done = True
+            self.__error = error
+            self.__condition.notify_all()
+
+
+    def stop(self, stopped: threading.Event):
+        """Sets one follower's stopped event and wakes it."""
+        with self.__condition:
+            stopped.set()
+            self.__condition.notify_all()
+
+
+    def is_done(self) -> bool:
+        """Returns True once finish() has been called."""
+        with self.__condition:
+            return self.__done
+
+
+    def follow(self, stopped: threading.Event):
+        """
+        Yields every chunk from the start of the stream, then the rest as they arrive.
+
+        Args:
+            stopped (threading.Event): Set through stop() to make this
+                follower give up while it waits.
+
+        Raises:
+            BaseException: The error that ended the upstream stream, if any.
+            StreamCancelledError: If stopped was set.
+        """
+        index = 0
+        while True:
+            with self.__condition:
+                while index == len(self.__chunks) and not self.__done:
+                    if stopped.is_set():
+                        raise StreamCancelledError("The stream was cancelled.")
+                    self.__condition.wait()
+                chunks = self.__chunks[index:]
+                index += len(chunks)
+                done, error = self.__done, self.__error
+
+            # Yield outside the lock so a slow caller never holds up the others.
+            yield from chunks
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """
+    Collapses identical in-flight streams into a single upstream call.
+
+    The first caller for a key starts the upstream stream on a background
+    thread. Every caller that asks for the same key while that stream is still
+    running attaches to it: it receives the chunks produced so far, then the
+    rest live, and the same error if the stream fails. Once the stream ends the
+    key is released, so the next caller starts a fresh request. This is not a
+    cache; see ResponseCache for reusing finished responses.
+
+    Because the upstream runs on its own thread, callers may stop iterating at
+    any time without cutting the stream short for the others; a caller inside
+    a CancelScope stops waiting as soon as the scope is cancelled. Once every
+    caller has stopped, the stream is abandoned: the key is released at once,
+    and the upstream stops at its next chunk and is closed, which ends the
+    request and returns anything it leased (e.g. a MakerPool conversation).
+
+    Thread-safe; share one instance between every StoryHelper in the process
+    (see StoryHelper.set_single_flight()).
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__flights = {}
+        self.__started = 0
+        self.__joined = 0
+        self.__abandoned = 0
+
+
+    def stream(self, key, open_stream):
+        """
+        Yields the chunks of the stream for key, sharing it with concurrent callers.
+
+        Args:
+            key (Hashable): Identifies the request. Callers with equal keys
+                share one upstream stream.
+            open_stream (callable): Takes no arguments and returns an iterable
+                of str chunks. Only called if no stream for key is in flight.
+
+        Yields:
+            str: The stream's chunks, from the first one.
+        """
+        with self.__lock:
+            flight = self.__flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self.__flights[key] = flight
+                self.__started += 1
+            else:
+                self.__joined += 1
+            flight.followers += 1
+
+        if leader:
+            threading.Thread(target=self.__run, args=(key, flight, open_stream), daemon=True).start()
+        stopped = threading.Event()
+        scope = CancelScope.current()
+        if scope is not None:
+            scope.add(lambda: flight.stop(stopped))
+        try:
+            yield from flight.follow(stopped)
+        finally:
+            self.__leave(key, flight)
+
+
+    def __leave(self, key, flight: _Flight):
+        """Drops one follower. The last one to leave a stream that has not ended abandons it."""
+        with self.__lock:
+            flight.followers -= 1
+            if flight.followers or flight.is_done():
+                return
+            # Nobody may join a stream that is about to stop.
+            if self.__flights.get(key) is flight:
+                del self.__flights[key]
+            self.__abandoned += 1
+        flight.abandoned.set()
+        flight.scope.cancel()
+
+
+    def __run(self, key, flight: _Flight, open_stream):
+        """Pumps the upstream stream into flight. Runs on the flight's own thread."""
+        error = None
+        stream = None
+        # The scope lets an abandoning caller interrupt a read that waits on the upstream.
+        with flight.scope:
+            try:
+                stream = iter(open_stream())
+                for chunk in stream:
+                    if flight.abandoned.is_set():
+                        break
+                    flight.add(chunk)
+            except BaseException as exc:
+                error = exc
+            finally:
+                # Closing an abandoned generator stops the upstream request and
+                # returns whatever it leased.
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+            # Release the key first, so nobody joins a stream that has ended.
+            with self.__lock:
+                if self.__flights.get(key) is flight:
+                    del self.__flights[key]
+            flight.finish(error)
+
+
+    def get_stats(self) -> dict:
+        """
+        Returns the single-flight counters.
+
+        Returns:
+            dict: in_flight (streams running now), started (upstream streams
+                started), joined (callers that attached to a running stream
+                instead of starting their own) and abandoned (streams stopped
+                because every caller left).
+        """
+        with self.__lock:
+            return {
+                "in_flight": len(self.__flights),
+                "started": self.__started,
+                "joined": self.__joined,
+                "abandoned": self.__abandoned,
+            }
@@ -0,0 +1,292 @@
+"""
+A persistent, searchable archive of every generated story.
+
+Stories generated in the app (through StoryHelper.set_story_archive()) and
+by main.py are recorded in one SQLite database, with the prompt and story
+type they were made for, the model that answered, timings and token counts.
+They outlive the session that generated them, and search() finds them by
+their words through an SQLite FTS5 index, or by prompt, story type or model
+through ordinary indexes.
+"""
+from collections import namedtuple
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+# One archived story. created is a Unix timestamp; ttft and total_time are in
+# seconds and None when the story was not timed (e.g. generated in a batch).
+# prompt_tokens and completion_tokens are estimates unless the provider
+# reported them. source says where the story was generated ("app", "batch",
+# "cli", ...).
+ArchivedStory = namedtuple('ArchivedStory', [
+    'id', 'created', 'source', 'prompt_id', 'story_id', 'model', 'title', 'prompt', 'text',
+    'ttft', 'total_time', 'prompt_tokens', 'completion_tokens',
+])
+
+# One search result: an ArchivedStory without its text, plus a snippet of the
+# text around the matched words (or its opening, when no words were searched).
+ArchiveHit = namedtuple('ArchiveHit', [
+    'id', 'created', 'source', 'prompt_id', 'story_id', 'model', 'title', 'snippet',
+])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    source TEXT NOT NULL,
+    prompt_id INTEGER,
+    story_id INTEGER,
+    model TEXT,
+    title TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    text TEXT NOT NULL,
+    ttft REAL,
+    total_time REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS stories_prompt ON stories (prompt_id, id);
+CREATE INDEX IF NOT EXISTS stories_story ON stories (story_id, id);
+CREATE INDEX IF NOT EXISTS stories_model ON stories (model, id);
+
+-- Full-text index over the title and text. It stores no copy of them: the
+-- stories table is its content, kept in step by the trigger below.
+CREATE VIRTUAL TABLE IF NOT EXISTS stories_fts USING fts5(
+    title, text, content='stories', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS stories_fts_insert AFTER INSERT ON stories BEGIN
+    INSERT INTO stories_fts (rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS stories_fts_delete AFTER DELETE ON stories BEGIN
+    INSERT INTO stories_fts (stories_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+END;
+"""
+
+# Columns of the stories table, in ArchivedStory order.
+STORY_COLUMNS = ", ".join(ArchivedStory._fields)
+
+
+def to_match_query(words: str) -> str:
+    """
+    Turns free text into an FTS5 query matching stories that contain every word.
+
+    Each word is quoted, so characters FTS5 treats as syntax (quotes,
+    hyphens, colons, ...) are searched for literally instead of raising an error.
+
+    Args:
+        words (str): What the user typed.
+
+    Returns:
+        str: The FTS5 query, or "" if words holds no words.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words.split())
+
+
+class StoryArchive:
+    """
+    Stores generated stories in SQLite and searches them.
+
+    The database is created on first use. It runs in WAL mode, so searches
+    are not blocked by a story being recorded. Searching by words goes
+    through the FTS5 index, and the other filters through indexes on
+    prompt_id, story_id and model, so a page of results comes back in
+    milliseconds whatever the size of the archive. Results come newest
+    first, or best match first with order="relevance"; ranking has to score
+    every match, so it is slower for words found in much of the archive.
+
+    Thread-safe; one archive can be shared by every session and worker thread.
+    """
+
+    def __init__(self, db_path: str = "outputs/story_archive.sqlite3"):
+        """
+        Args:
+            db_path (str): The database file. Created (with its folder) if missing.
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(db_path)
+        self.__connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.__lock = threading.Lock()
+        with self.__lock:
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.executescript(SCHEMA)
+            self.__connection.commit()
+
+
+    def __fetch(self, sql: str, parameters=()) -> list:
+        with self.__lock:
+            return self.__connection.execute(sql, parameters).fetchall()
+
+
+    def record(self, text: str, prompt: str = "", title: str = "", prompt_id: int | None = None,
+               story_id: int | None = None, model: str | None = None, source: str = "app",
+               ttft: float | None = None, total_time: float | None = None,
+               prompt_tokens: int | None = None, completion_tokens: int | None = None) -> int:
+        """
+        Adds a story to the archive.
+
+        Args:
+            text (str): The generated story.
+            prompt (str): The prompt it was generated from.
+            title (str): A short title, e.g. the story type's protagonist.
+            prompt_id (int | None): The system prompt used, if it is one of the catalog's.
+            story_id (int | None): The story type used, if it is one of the catalog's.
+            model (str | None): The model that answered.
+            source (str): Where the story was generated, e.g. "app" or "cli".
+            ttft (float | None): Seconds until the first chunk arrived.
+            total_time (float | None): Seconds the whole generation took.
+            prompt_tokens (int | None): Tokens sent with the request.
+            completion_tokens (int | None): Tokens in the story.
+
+        Returns:
+            int: The archived story's id.
+        """
+        with self.__lock:
+            cursor = self.__connection.execute(
+                f"INSERT INTO stories ({STORY_COLUMNS}) VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), source, prompt_id, story_id, model, title, prompt, text,
+                 ttft, total_time, prompt_tokens, completion_tokens),
+            )
+            self.__connection.commit()
+            return cursor.lastrowid
+
+
+    def get(self, archive_id: int, default=None):
+        """
+        Returns an archived story with its full text.
+
+        Args:
+            archive_id (int): The id returned by record() or found by search().
+            default: Returned if there is no such story.
+
+        Returns:
+            ArchivedStory: The story, or default.
+        """
+        rows = self.__fetch(f"SELECT {STORY_COLUMNS} FROM stories WHERE id = ?", (archive_id,))
+        return ArchivedStory(*rows[0]) if rows else default
+
+
+    def delete(self, archive_id: int) -> bool:
+        """Removes a story from the archive. Returns False if there was no such story."""
+        with self.__lock:
+            cursor = self.__connection.execute("DELETE FROM stories WHERE id = ?", (archive_id,))
+            self.__connection.commit()
+            return cursor.rowcount > 0
+
+
+    def __where(self, words: str = "", prompt_id=None, story_id=None, model=None) -> tuple:
+        """Builds the FROM/WHERE part and parameters shared by search() and count()."""
+        match = to_match_query(words)
+        clauses = []
+        parameters = []
+        if match:
+            # CROSS JOIN keeps the full-text index as the outer loop. Left to
+            # itself, SQLite may walk a filter's index and run the match once
+            # per row instead, which is far slower on a large archive.
+            source = "stories_fts CROSS JOIN stories s ON s.id = stories_fts.rowid"
+            clauses.append("stories_fts MATCH ?")
+            parameters.append(match)
+        else:
+            source = "stories s"
+        for column, wanted in (("prompt_id", prompt_id), ("story_id", story_id), ("model", model)):
+            if wanted is not None:
+                clauses.append(f"s.{column} = ?")
+                parameters.append(wanted)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return bool(match), f"{source} {where}", parameters
+
+
+    def search(self, words: str = "", prompt_id: int | None = None, story_id: int | None = None,
+               model: str | None = None, limit: int = 20, offset: int = 0, order: str = "recent") -> list:
+        """
+        Returns the archived stories matching every given filter.
+
+        Example:
+            archive.search("dragon betrayal", prompt_id=3, limit=10)
+
+        Args:
+            words (str): Words that must all appear in the title or text.
+                Matching ignores case and word endings ("dragons" finds
+                "dragon"). Empty matches every story.
+            prompt_id (int | None): Only stories for this system prompt.
+            story_id (int | None): Only stories of this story type.
+            model (str | None): Only stories this model wrote.
+            limit (int): Maximum number of results.
+            offset (int): Number of results to skip, for paging.
+            order (str): "recent" for newest first, or "relevance" for the
+                best match first (only when words are given).
+
+        Returns:
+            list[ArchiveHit]: One page of results.
+
+        Raises:
+            ValueError: If order is unknown, or limit or offset is negative.
+        """
+        if order not in ("recent", "relevance"):
+            raise ValueError("order must be 'recent' or 'relevance'.")
+        if limit < 0 or offset < 0:
+            raise ValueError("limit and offset must not be negative.")
+        matched, source, parameters = self.__where(words, prompt_id, story_id, model)
+        if matched:
+            snippet = "snippet(stories_fts, 1, '**', '**', ' … ', 24)"
+            order_by = "rank" if order == "relevance" else "stories_fts.rowid DESC"
+        else:
+            snippet = "substr(s.text, 1, 200)"
+            order_by = "s.id DESC"
+        columns = ", ".join(f"s.{field}" for field in ArchiveHit._fields[:-1])
+        rows = self.__fetch(
+            f"SELECT {columns}, {snippet} FROM {source} ORDER BY {order_by} LIMIT ? OFFSET ?",
+            (*parameters, limit, offset),
+        )
+        return [ArchiveHit(*row) for row in rows]
+
+
+    def count(self, words: str = "", prompt_id: int | None = None, story_id: int | None = None,
+              model: str | None = None, limit: int | None = None) -> int:
+        """
+        Returns how many stories search() would match without a limit.
+
+        Counting every match of a very common word reads its whole index
+        entry, so callers that only need "more than N" (e.g. a pager) should
+        pass limit.
+
+        Args:
+            words, prompt_id, story_id, model: As for search().
+            limit (int | None): Stop counting at this many matches. None counts all.
+        """
+        _, source, parameters = self.__where(words, prompt_id, story_id, model)
+        if limit is None:
+            return self.__fetch(f"SELECT COUNT(*) FROM {source}", parameters)[0][0]
+        return self.__fetch(f"SELECT COUNT(*) FROM (SELECT 1 FROM {source} LIMIT ?)", (*parameters, limit))[0][0]
+
+
+    def models(self) -> list:
+        """Returns every model that has an archived story, sorted."""
+        return [model for model, in self.__fetch(
+            "SELECT DISTINCT model FROM stories WHERE model IS NOT NULL ORDER BY model"
+        )]
+
+
+    def get_stats(self) -> dict:
+        """
+        Returns totals over the whole archive.
+
+        Returns:
+            dict: stories, prompt_tokens and completion_tokens (sums of the
+                known values), and mean_total_time (seconds, over timed stories).
+        """
+        stories, prompt_tokens, completion_tokens, mean_total_time = self.__fetch(
+            "SELECT COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), AVG(total_time) FROM stories"
+        )[0]
+        return {
+            "stories": stories,
+            "prompt_tokens": prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "mean_total_time": mean_total_time,
+        }
+
+
+    def close(self):
+        """Closes the database connection."""
+        with self.__lock:
+            self.__connection.close()
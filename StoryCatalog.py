@@ -0,0 +1,351 @@
+from collections import OrderedDict, namedtuple
+import threading
+
+# The story ids that differ between a catalog and the one it was built from
+# by StoryCatalog.updated(). A freshly loaded catalog lists every id as added.
+CatalogChanges = namedtuple('CatalogChanges', ['added', 'changed', 'removed'])
+
+class StoryCatalog:
+    """
+    An indexed, read-only catalog of story types and the system prompts that use them.
+
+    Built once when the catalog is loaded (see StoryHelper.get_catalog()), so
+    every lookup afterwards avoids scanning the story list:
+
+    - by story id, in O(1), whatever the ids are (sparse, unordered, ...);
+    - by each of indexed_fields, through one exact-value index per field;
+    - by prompt_id, through the prompt's story_ids.
+
+    query() combines these: it starts from the smallest matching index and
+    checks the remaining filters by set membership, so its cost depends on
+    the number of matches rather than the size of the catalog. The sorted
+    matches of recent filter combinations are kept, so paging through them
+    only slices a list.
+
+    Iterating the catalog yields StoryRecords in load order, which is also
+    the order query() returns them in.
+
+    A catalog is never modified after it is built; updated() returns a new
+    one. That lets StoryHelper swap in a reloaded catalog while other threads
+    keep reading the old one without any locking.
+
+    Attributes:
+        changes (CatalogChanges): The story ids added, changed and removed
+            compared with the catalog this one was updated() from.
+    """
+
+    # StoryRecord fields with a secondary index.
+    indexed_fields = ('setting', 'conflict', 'theme', 'point_of_view')
+
+    # How many filter combinations keep their sorted matches.
+    match_cache_size = 64
+
+    def __init__(self, stories: list, prompts: list):
+        """
+        Args:
+            stories (list[StoryRecord]): Every story type.
+            prompts (list[dict]): Every system prompt dict, as loaded from
+                story_system_prompts.json.
+
+        Raises:
+            ValueError: If two stories or two prompts share an id.
+        """
+        self.__stories = {}
+        self.__order = []
+        self.__position = {}
+        # field -> value -> {story_id: None}. Dicts double as ordered sets.
+        self.__indexes = {field: {} for field in self.indexed_fields}
+        for story in stories:
+            if story.id in self.__stories:
+                raise ValueError(f"Duplicate story id {story.id} in the catalog.")
+            self.__position[story.id] = len(self.__order)
+            self.__order.append(story.id)
+            self.__stories[story.id] = story
+            for field in self.indexed_fields:
+                self.__indexes[field].setdefault(getattr(story, field), {})[story.id] = None
+
+        self.__link_prompts(prompts)
+        self.changes = CatalogChanges(added=list(self.__order), changed=[], removed=[])
+
+
+    def __link_prompts(self, prompts: list):
+        """Builds the prompt lookups. Call after the stories are in place."""
+        # Sorted matches depend on the stories and prompts, so they start empty.
+        self.__match_cache = OrderedDict()
+        self.__match_lock = threading.Lock()
+        self.__prompts = {}
+        self.__prompt_stories = {}
+        for prompt in prompts:
+            if prompt["prompt_id"] in self.__prompts:
+                raise ValueError(f"Duplicate prompt id {prompt['prompt_id']} in the catalog.")
+            self.__prompts[prompt["prompt_id"]] = prompt
+            # Links to unknown stories are left out; missing_story_ids() reports them.
+            self.__prompt_stories[prompt["prompt_id"]] = {
+                story_id: None for story_id in prompt["story_ids"] if story_id in self.__stories
+            }
+
+
+    def updated(self, stories: list, prompts: list) -> "StoryCatalog":
+        """
+        Returns a new catalog with this content, rebuilding only what changed.
+
+        Unchanged StoryRecords are kept, and only the index entries of added,
+        changed and removed stories are touched. Index buckets are copied
+        before they are modified, so this catalog stays valid and unchanged
+        for anyone still reading it. The new catalog's changes attribute
+        lists the story ids that differ.
+
+        Args:
+            stories (list[StoryRecord]): Every story type, in catalog order.
+            prompts (list[dict]): Every system prompt dict.
+
+        Returns:
+            StoryCatalog: The new catalog.
+
+        Raises:
+            ValueError: If two stories or two prompts share an id.
+        """
+        new = object.__new__(StoryCatalog)
+        new.__stories = {}
+        changed_ids = []
+        for story in stories:
+            if story.id in new.__stories:
+                raise ValueError(f"Duplicate story id {story.id} in the catalog.")
+            old = self.__stories.get(story.id)
+            if old == story:
+                # Keep the existing record so unchanged stories stay identical objects.
+                story = old
+            else:
+                changed_ids.append(story.id)
+            new.__stories[story.id] = story
+        removed_ids = [story_id for story_id in self.__stories if story_id not in new.__stories]
+
+        order = list(new.__stories)
+        if order == self.__order:
+            new.__order, new.__position = self.__order, self.__position
+        else:
+            new.__order = order
+            new.__position = {story_id: position for position, story_id in enumerate(order)}
+
+        # Copy-on-write indexes: only buckets holding a changed story are copied.
+        new.__indexes = {field: dict(index) for field, index in self.__indexes.items()}
+        copied = set()
+
+        def bucket(field, value):
+            if (field, value) not in copied:
+                new.__indexes[field][value] = dict(new.__indexes[field].get(value, {}))
+                copied.add((field, value))
+            return new.__indexes[field][value]
+
+        for story_id in changed_ids + removed_ids:
+            old = self.__stories.get(story_id)
+            if old is None:
+                continue
+            for field in self.indexed_fields:
+                bucket(field, getattr(old, field)).pop(story_id, None)
+        for story_id in changed_ids:
+            story = new.__stories[story_id]
+            for field in self.indexed_fields:
+                bucket(field, getattr(story, field))[story_id] = None
+        for field, value in copied:
+            if not new.__indexes[field][value]:
+                del new.__indexes[field][value]
+
+        new.__link_prompts(prompts)
+        new.changes = CatalogChanges(
+            added=[story_id for story_id in changed_ids if story_id not in self.__stories],
+            changed=[story_id for story_id in changed_ids if story_id in self.__stories],
+            removed=removed_ids,
+        )
+        return new
+
+
+    def __len__(self) -> int:
+        return len(self.__stories)
+
+
+    def __iter__(self):
+        return iter(self.__stories.values())
+
+
+    def __contains__(self, story_id) -> bool:
+        return story_id in self.__stories
+
+
+    def __getitem__(self, story_id: int):
+        """Returns the StoryRecord with this id. Raises KeyError if there is none."""
+        return self.__stories[story_id]
+
+
+    def get(self, story_id: int, default=None):
+        """
+        Returns the StoryRecord with this id.
+
+        Args:
+            story_id (int): The story's "id" from story_types.json.
+            default: Returned if no story has this id.
+
+        Returns:
+            StoryRecord: The story, or default.
+        """
+        return self.__stories.get(story_id, default)
+
+
+    def get_prompt(self, prompt_id: int, default=None):
+        """
+        Returns the system prompt dict with this id.
+
+        Args:
+            prompt_id (int): The prompt's "prompt_id" from story_system_prompts.json.
+            default: Returned if no prompt has this id.
+
+        Returns:
+            dict: The prompt, or default.
+        """
+        return self.__prompts.get(prompt_id, default)
+
+
+    def prompts(self) -> list:
+        """Returns every system prompt dict, in load order."""
+        return list(self.__prompts.values())
+
+
+    def stories_for_prompt(self, prompt_id: int) -> list:
+        """
+        Returns the stories linked to a system prompt, in its story_ids order.
+
+        Args:
+            prompt_id (int): The prompt's id.
+
+        Returns:
+            list[StoryRecord]: The linked stories that exist in the catalog.
+                Empty for an unknown prompt.
+        """
+        return [self.__stories[story_id] for story_id in self.__prompt_stories.get(prompt_id, ())]
+
+
+    def missing_story_ids(self, prompt_id: int) -> list:
+        """Returns the story_ids of a prompt that have no story in the catalog."""
+        prompt = self.__prompts.get(prompt_id)
+        if prompt is None:
+            return []
+        return [story_id for story_id in prompt["story_ids"] if story_id not in self.__stories]
+
+
+    def values(self, field: str) -> list:
+        """
+        Returns the distinct values of an indexed field, e.g. to offer as filters.
+
+        Args:
+            field (str): One of indexed_fields.
+
+        Returns:
+            list[str]: The values, sorted.
+
+        Raises:
+            ValueError: If field is not indexed.
+        """
+        return sorted(self.__index(field))
+
+
+    def __index(self, field: str) -> dict:
+        if field not in self.__indexes:
+            raise ValueError(f"{field} is not an indexed field. Choose from {', '.join(self.indexed_fields)}.")
+        return self.__indexes[field]
+
+
+    def __matching_ids(self, prompt_id=None, **filters) -> list | None:
+        """
+        Returns one id set per active filter, or None if no filter is active.
+
+        A filter value may be a single value or a list/tuple/set of values,
+        any of which may match.
+        """
+        candidates = []
+        if prompt_id is not None:
+            candidates.append(self.__prompt_stories.get(prompt_id, {}))
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            index = self.__index(field)
+            if isinstance(wanted, (list, tuple, set, frozenset)):
+                matches = {}
+                for value in wanted:
+                    matches.update(index.get(value, {}))
+                candidates.append(matches)
+            else:
+                candidates.append(index.get(wanted, {}))
+        return candidates or None
+
+
+    def query(self, prompt_id: int | None = None, limit: int | None = None, offset: int = 0, **filters) -> list:
+        """
+        Returns the stories matching every given filter.
+
+        Example:
+            catalog.query(prompt_id=3, theme=["Redemption", "Sacrifice"], limit=10)
+
+        Args:
+            prompt_id (int | None): Only stories linked to this system prompt.
+            limit (int | None): Maximum number of stories returned. None means all.
+            offset (int): Number of matching stories to skip, for paging.
+            **filters: Any of indexed_fields, mapped to an exact value or a
+                list of values (any of which may match). None ignores the field.
+
+        Returns:
+            list[StoryRecord]: The matches, in catalog order.
+
+        Raises:
+            ValueError: If a filter names a field that is not indexed, or
+                offset is negative.
+        """
+        if offset < 0:
+            raise ValueError("offset must not be negative.")
+        ids = self.__sorted_matches(prompt_id, **filters)
+        end = None if limit is None else offset + limit
+        return [self.__stories[story_id] for story_id in ids[offset:end]]
+
+
+    def __sorted_matches(self, prompt_id=None, **filters) -> list:
+        """
+        Returns the ids matching every filter, in catalog order.
+
+        The result for each filter combination is computed once and kept,
+        so later pages of the same query cost only the slice.
+        """
+        key = (prompt_id, tuple(sorted(
+            (field, frozenset(wanted) if isinstance(wanted, (list, tuple, set, frozenset)) else wanted)
+            for field, wanted in filters.items() if wanted is not None
+        )))
+        with self.__match_lock:
+            ids = self.__match_cache.get(key)
+            if ids is not None:
+                self.__match_cache.move_to_end(key)
+                return ids
+
+        candidates = self.__matching_ids(prompt_id, **filters)
+        if candidates is None:
+            return self.__order
+        # Walk the smallest candidate set; check the others by membership.
+        candidates.sort(key=len)
+        smallest, rest = candidates[0], candidates[1:]
+        ids = sorted(
+            (story_id for story_id in smallest if all(story_id in other for other in rest)),
+            key=self.__position.__getitem__,
+        )
+        with self.__match_lock:
+            self.__match_cache[key] = ids
+            while len(self.__match_cache) > self.match_cache_size:
+                self.__match_cache.popitem(last=False)
+        return ids
+
+
+    def count(self, prompt_id: int | None = None, **filters) -> int:
+        """
+        Returns how many stories query() would match without a limit.
+
+        Args:
+            prompt_id (int | None): Only stories linked to this system prompt.
+            **filters: As for query().
+        """
+        return len(self.__sorted_matches(prompt_id, **filters))
@@ -1,8 +1,15 @@
 from StoryMaker import StoryMaker
+from StoryCatalog import StoryCatalog
+from PosterCache import PosterCache
+from ModelStreams import coalesce_chunks
+from HistoryPolicy import estimate_tokens, estimate_messages_tokens
 from collections import namedtuple
-from PIL import Image
 import json
 from pathlib import Path
+import re
+import sqlite3
+import threading
+import warnings
 
 # A lightweight, immutable record for a single story archetype.
 # Being a namedtuple makes StoryRecord hashable, so instances can be used
@@ -12,36 +19,81 @@ StoryRecord = namedtuple(
     ['id', 'protagonist', 'description', 'setting', 'plot', 'conflict', 'theme', 'point_of_view']
 )
 
+# One page of a filtered story listing — see StoryHelper.get_helper_story_page().
+# page is 0-based; total counts every match, not just this page's stories.
+StoryPage = namedtuple('StoryPage', ['stories', 'page', 'page_count', 'total'])
+
+def to_story_record(story: dict) -> StoryRecord:
+    """Convert one entry of story_types.json into a StoryRecord."""
+    return StoryRecord(
+        id=story['id'],
+        protagonist=story['characters']['protagonist'],
+        description=story['characters']['description'],
+        setting=story['setting'],
+        plot=story['plot'],
+        conflict=story['conflict'],
+        theme=story['theme'],
+        point_of_view=story['point_of_view'],
+    )
+
 class StoryHelper(StoryMaker):
 
+    # Optional single-flight layer and conversation pool for generate_story()
+    # (both off by default).
+    single_flight = None
+    maker_pool = None
+
+    # Thumbnail cache for get_helper_thumbnail(), created on first use.
+    poster_cache = None
+
+    # (interval, max_chars) for merging generate_story()'s chunks, or None to
+    # pass every chunk through (see set_stream_coalescing()).
+    stream_coalescing = None
+
+    # Optional StoryArchive that records every finished story (off by default).
+    story_archive = None
+
     def __init__(self):
+        # Set up StoryMaker's (empty) conversation so close() and garbage
+        # collection work even if generate_story() is never called here, as
+        # happens when stories are generated in a maker pool.
+        super().__init__()
         self.__story_path = Path("story_inputs")
         self.__image_path = self.__story_path / "posters"
+        # Built on first poster lookup; see __index_posters().
+        self.__poster_index = None
+
+        # (mtime, size) of each JSON file when it was last read, for reload_catalog().
+        self.__file_stamps = {}
+        self.__reload_lock = threading.Lock()
+        self.__watch_stop = None
+
+
+    def __file_stamp(self, name: str) -> tuple:
+        """Return (mtime in ns, size) of a file in story_inputs, or None if it is missing."""
+        try:
+            stat = (self.__story_path / name).stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+    def __read_json(self, name: str):
+        """Read a story_inputs JSON file, recording its stamp first so a concurrent edit is never missed."""
+        self.__file_stamps[name] = self.__file_stamp(name)
+        with open(self.__story_path / name) as file:
+            return json.load(file)
 
 
     def __load_helpers(self):
         """Load story types from story_types.json into self.helpers as StoryRecord instances."""
-        with open(self.__story_path / "story_types.json") as file:
-            raw = json.load(file)
-        self.helpers = [
-            StoryRecord(
-                id=story['id'],
-                protagonist=story['characters']['protagonist'],
-                description=story['characters']['description'],
-                setting=story['setting'],
-                plot=story['plot'],
-                conflict=story['conflict'],
-                theme=story['theme'],
-                point_of_view=story['point_of_view'],
-            )
-            for story in raw
-        ]
+        raw = self.__read_json("story_types.json")
+        self.helpers = [to_story_record(story) for story in raw]
 
 
     def __load_system_prompts(self):
         """Load system prompts from story_system_prompts.json into self.system_prompt."""
-        with open(self.__story_path / "story_system_prompts.json") as file:
-            self.system_prompt = json.load(file)
+        self.system_prompt = self.__read_json("story_system_prompts.json")
 
 
     def __check_attr(self, attribute):
@@ -49,7 +101,7 @@ class StoryHelper(StoryMaker):
         Lazily load data only when it is first accessed.
 
         Args:
-            attribute (str): Either "helpers" or "system_prompt". If the
+            attribute (str): "helpers", "system_prompt" or "catalog". If the
                 corresponding instance attribute does not yet exist, the
                 matching private loader method is called to populate it.
         """
@@ -59,62 +111,229 @@ class StoryHelper(StoryMaker):
         elif attribute == "system_prompt":
             if not hasattr(self, 'system_prompt'):
                 self.__load_system_prompts()
+        elif attribute == "catalog":
+            if not hasattr(self, 'catalog'):
+                self.__check_attr("helpers")
+                self.__check_attr("system_prompt")
+                self.catalog = StoryCatalog(self.helpers, self.system_prompt)
 
 
-    def get_helper_story(self, story_id: int) -> dict:
+    def get_catalog(self) -> StoryCatalog:
+        """
+        Return the indexed catalog of story types and system prompts.
+
+        Unless another backend was set with set_catalog(), it is built on
+        first use from both JSON files, then reused. Use it for lookups by id
+        and for filtering (see StoryCatalog.query()).
+
+        Returns:
+            StoryCatalog | SQLiteCatalog: The catalog.
+        """
+        self.__check_attr("catalog")
+        return self.catalog
+
+
+    def reload_catalog(self) -> bool:
+        """
+        Reload the JSON catalog if either file changed since it was read.
+
+        Changes are detected by modification time and size. Only a changed
+        file is re-parsed, and StoryCatalog.updated() rebuilds only the
+        records that differ. The new catalog is swapped in with a single
+        assignment, so readers never wait; anyone holding the old catalog
+        keeps a consistent view of it. If a file cannot be parsed (e.g. it
+        is half-written), the current catalog is kept and a warning is
+        issued, and the next call tries again.
+
+        Does nothing for a catalog that was not loaded from the JSON files,
+        such as one set with set_catalog().
+
+        Returns:
+            bool: True if a new catalog was swapped in.
+        """
+        if not isinstance(getattr(self, 'catalog', None), StoryCatalog) or not self.__file_stamps:
+            return False
+
+        with self.__reload_lock:
+            stories_changed = self.__file_stamp("story_types.json") != self.__file_stamps.get("story_types.json")
+            prompts_changed = self.__file_stamp("story_system_prompts.json") != self.__file_stamps.get("story_system_prompts.json")
+            if not (stories_changed or prompts_changed):
+                return False
+
+            stamps = dict(self.__file_stamps)
+            try:
+                helpers = self.helpers
+                if stories_changed:
+                    helpers = [to_story_record(story) for story in self.__read_json("story_types.json")]
+                system_prompt = self.system_prompt
+                if prompts_changed:
+                    system_prompt = self.__read_json("story_system_prompts.json")
+                catalog = self.catalog.updated(helpers, system_prompt)
+            except (OSError, ValueError, KeyError, TypeError) as error:
+                # Retry on the next call rather than treating the bad read as current.
+                self.__file_stamps = stamps
+                warnings.warn(f"Keeping the current story catalog; reloading failed: {error!r}")
+                return False
+
+            self.helpers = helpers
+            self.system_prompt = system_prompt
+            self.catalog = catalog
+            return True
+
+
+    def watch_catalog(self, interval: float = 2.0):
         """
-        Return a single story type dict by its 1-based ID.
+        Start a background thread that calls reload_catalog() every interval seconds.
+
+        The same thread rebuilds the poster index when files are added to or
+        removed from story_inputs/posters.
+
+        Does nothing if this instance is already watching. Stop it with
+        stop_watching_catalog().
+
+        Args:
+            interval (float): Seconds between checks of the files' modification times.
+        """
+        if self.__watch_stop is not None:
+            return
+        self.__watch_stop = threading.Event()
+        stop = self.__watch_stop
+
+        def watch():
+            while not stop.wait(interval):
+                self.reload_catalog()
+                self.__refresh_posters_if_changed()
+
+        threading.Thread(target=watch, name="catalog-watcher", daemon=True).start()
+
+
+    def stop_watching_catalog(self):
+        """Stop the thread started by watch_catalog()."""
+        if self.__watch_stop is not None:
+            self.__watch_stop.set()
+            self.__watch_stop = None
+
+
+    def set_catalog(self, catalog):
+        """
+        Use a different catalog backend instead of loading the JSON files.
+
+        For large catalogs, pass a CatalogStore.SQLiteCatalog: story types are
+        then read lazily from disk instead of all being loaded at start-up.
 
         Args:
-            story_id (int): The 1-based ID of the story (matches the "id" field
+            catalog (StoryCatalog | SQLiteCatalog): Any object with
+                StoryCatalog's interface.
+        """
+        self.catalog = catalog
+
+
+    def get_helper_story(self, story_id: int) -> StoryRecord:
+        """
+        Return a single story type by its ID.
+
+        Args:
+            story_id (int): The ID of the story (matches the "id" field
                 in story_types.json).
 
         Returns:
-            dict: The story type entry for the given ID.
+            StoryRecord: The story type entry for the given ID.
+
+        Raises:
+            IndexError: If no story has this ID.
         """
-        self.__check_attr("helpers")
-        return self.helpers[story_id - 1]
+        story = self.get_catalog().get(story_id)
+        if story is None:
+            raise IndexError(f"No story type with id {story_id}.")
+        return story
 
 
     def get_helper_prompts(self, prompt_id: int) -> dict:
         """
-        Return a single system prompt dict by its 1-based ID.
+        Return a single system prompt dict by its ID.
 
         Args:
-            prompt_id (int): The 1-based ID of the system prompt (matches the
+            prompt_id (int): The ID of the system prompt (matches the
                 "prompt_id" field in story_system_prompts.json).
 
         Returns:
             dict: The system prompt entry for the given ID.
+
+        Raises:
+            IndexError: If no system prompt has this ID.
         """
-        self.__check_attr("system_prompt")
-        return self.system_prompt[prompt_id - 1]
+        prompt = self.get_catalog().get_prompt(prompt_id)
+        if prompt is None:
+            raise IndexError(f"No system prompt with id {prompt_id}.")
+        return prompt
+
+
+    def get_helper_story_page(self, page: int = 0, page_size: int = 10,
+                              prompt_id: int | None = None, **filters) -> StoryPage:
+        """
+        Return one page of the story types matching the given filters.
+
+        Only the stories on the requested page are fetched, through the
+        catalog's indexes (or SQL queries), so turning a page costs the same
+        however large the catalog is.
+
+        Args:
+            page (int): The 0-based page number. Pages past the end are
+                clamped to the last page.
+            page_size (int): Stories per page.
+            prompt_id (int | None): Only stories linked to this system prompt.
+            **filters: Any of the catalog's indexed fields (setting, conflict,
+                theme, point_of_view), mapped to a value or a list of values.
+                None or an empty list ignores the field.
+
+        Returns:
+            StoryPage: The page's stories, its number, the number of pages
+                and the total number of matches.
+
+        Raises:
+            ValueError: If page is negative, page_size is less than 1, or a
+                filter names a field that is not indexed.
+        """
+        if page < 0:
+            raise ValueError("page must not be negative.")
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1.")
+        # An empty selection means "any value", as in a cleared filter widget.
+        filters = {field: wanted for field, wanted in filters.items() if wanted not in (None, [], ())}
+
+        catalog = self.get_catalog()
+        total = catalog.count(prompt_id, **filters)
+        page_count = max(1, -(-total // page_size))
+        page = min(page, page_count - 1)
+        stories = catalog.query(prompt_id, limit=page_size, offset=page * page_size, **filters)
+        return StoryPage(stories=stories, page=page, page_count=page_count, total=total)
 
 
     def get_helper_image(self, story_id: int, hero_type: str):
         """
         Load and return the poster image for a given story.
 
-        Builds the file path from the zero-padded story ID and the protagonist
-        name (spaces replaced with underscores), then attempts to open it with
-        Pillow.
+        Finds the file in the poster index (see find_poster()), then attempts
+        to open it with Pillow.
 
         Args:
-            story_id (int): The numeric story ID. Values below 10 are
-                zero-padded automatically (e.g. 3 → "03").
+            story_id (int): The numeric story ID (e.g. 3 for "03_...jpg").
             hero_type (str): The protagonist name as it appears in the JSON
-                (e.g. "The Reluctant Hero"). Spaces are converted to underscores
-                to match the filename convention.
+                (e.g. "The Reluctant Hero").
 
         Returns:
             PIL.Image.Image: The opened image on success.
             str: An error message ("File not found." or "Cannot open the image.")
                 if the file is missing or cannot be read.
         """
-        id = f"0{story_id}" if story_id < 10 else str(story_id)
-        image = self.__image_path / f"{id}_{hero_type.replace(' ', '_')}.jpg"
+        # Pillow is imported here so that browsing the catalog does not pay for it.
+        from PIL import Image
+
+        poster = self.find_poster(story_id, hero_type)
+        if poster is None:
+            return "File not found."
         try:
-            helper_img = Image.open(image)
+            helper_img = Image.open(poster[0])
             return helper_img
         except FileNotFoundError:
             return "File not found."
@@ -122,6 +341,166 @@ class StoryHelper(StoryMaker):
             return "Cannot open the image."
 
 
+    def get_helper_thumbnail(self, story_id: int, hero_type: str):
+        """
+        Return the poster for a given story as display-sized JPEG bytes.
+
+        Same lookup as get_helper_image(), but served from the poster cache
+        (see set_poster_cache()), so after the first call no image is decoded
+        and only a small thumbnail is sent to the browser. Without a poster
+        cache, a default one in outputs/cache/posters is created on first use.
+
+        Args:
+            story_id (int): The numeric story ID.
+            hero_type (str): The protagonist name as it appears in the JSON.
+
+        Returns:
+            bytes: The encoded thumbnail on success.
+            str: An error message ("File not found." or "Cannot open the image.")
+                if the file is missing or cannot be read.
+        """
+        poster = self.find_poster(story_id, hero_type)
+        if poster is None:
+            return "File not found."
+        if self.poster_cache is None:
+            self.poster_cache = PosterCache()
+        try:
+            # Passing the indexed mtime means a cached thumbnail needs no stat either.
+            return self.poster_cache.get(*poster)
+        except FileNotFoundError:
+            return "File not found."
+        except IOError:
+            return "Cannot open the image."
+
+
+    def get_helper_poster_url(self, story_id: int, hero_type: str) -> str | None:
+        """
+        Return the URL of a story's poster thumbnail, served as a static file.
+
+        For Streamlit apps with server.enableStaticServing on: the thumbnail
+        is published once into static/posters under a content-hashed name
+        (see PosterCache.publish()), and afterwards the URL comes straight
+        from memory. Render it with an <img> tag so the browser fetches and
+        caches the file itself.
+
+        Args:
+            story_id (int): The numeric story ID.
+            hero_type (str): The protagonist name as it appears in the JSON.
+
+        Returns:
+            str | None: The URL, relative to the app, or None if the poster is
+                missing or cannot be read.
+        """
+        poster = self.find_poster(story_id, hero_type)
+        if poster is None:
+            return None
+        if self.poster_cache is None:
+            self.poster_cache = PosterCache()
+        try:
+            return self.poster_cache.publish(*poster)
+        except IOError:
+            return None
+
+
+    @staticmethod
+    def normalize_poster_name(name: str) -> str:
+        """
+        Reduce a protagonist or poster name to lowercase words joined by underscores.
+
+        "The Anti-Hero" and "The_Anti_Hero" both become "the_anti_hero", so
+        names match however punctuation and spaces were written.
+        """
+        return "_".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+    def __index_posters(self):
+        """
+        Scan story_inputs/posters once and index every image by ID and by name.
+
+        Files are expected to be named "<id>_<name>.<ext>", as written by
+        generate_posters.py. The index maps each numeric ID to its files and
+        each normalized "<id>_<name>" to its file, with the modification time
+        read during the scan.
+        """
+        by_id = {}
+        by_name = {}
+        try:
+            stamp = self.__image_path.stat().st_mtime_ns
+            entries = list(self.__image_path.iterdir())
+        except FileNotFoundError:
+            stamp, entries = None, []
+        for path in sorted(entries):
+            if path.suffix.lower() not in (".jpg", ".jpeg", ".png", ".webp"):
+                continue
+            match = re.match(r"(\d+)_(.+)", path.stem)
+            if match is None:
+                continue
+            poster = (path, path.stat().st_mtime_ns)
+            story_id = int(match.group(1))
+            by_id.setdefault(story_id, []).append(poster)
+            by_name[(story_id, self.normalize_poster_name(match.group(2)))] = poster
+        # One assignment, so lookups on other threads see the old or the new index.
+        self.__poster_index = (stamp, by_id, by_name)
+
+
+    def __refresh_posters_if_changed(self):
+        """Rebuild the poster index if files were added to or removed from the posters folder."""
+        if self.__poster_index is None:
+            return
+        try:
+            stamp = self.__image_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self.__poster_index[0]:
+            self.__index_posters()
+
+
+    def refresh_poster_index(self):
+        """Rescan story_inputs/posters, e.g. after new posters were generated."""
+        self.__index_posters()
+
+
+    def find_poster(self, story_id: int, hero_type: str):
+        """
+        Look up a story's poster in the poster index, without touching the disk.
+
+        A file whose ID and normalized name both match wins. Otherwise a file
+        with just the matching ID is used, so a poster whose name drifted from
+        the protagonist's (e.g. "08_The_Villain_Turned_Ally") is still found.
+        The index is built on the first call.
+
+        Args:
+            story_id (int): The numeric story ID.
+            hero_type (str): The protagonist name as it appears in the JSON.
+
+        Returns:
+            tuple[Path, int] | None: The poster's path and modification time
+                in nanoseconds, or None if there is no poster for this story.
+        """
+        if self.__poster_index is None:
+            self.__index_posters()
+        _, by_id, by_name = self.__poster_index
+        poster = by_name.get((story_id, self.normalize_poster_name(hero_type)))
+        if poster is None:
+            candidates = by_id.get(story_id)
+            if candidates:
+                poster = candidates[0]
+        return poster
+
+
+    def set_poster_cache(self, cache):
+        """
+        Serve get_helper_thumbnail() from the given poster cache.
+
+        Assign StoryHelper.poster_cache instead to share one cache between
+        every instance.
+
+        Args:
+            cache (PosterCache): The cache to use.
+        """
+        self.poster_cache = cache
+
+
     def get_all_helpers(self, ids: list) -> list:
         """
         Return story type dicts for a list of 0-based indices.
@@ -147,14 +526,47 @@ class StoryHelper(StoryMaker):
         return self.system_prompt
 
 
-    def generate_story(self, system_prompt: str, *args):
+    def __build_prompt(self, *args) -> str:
+        """
+        Assemble story detail strings into a structured prompt for the model.
+
+        Args:
+            *args: Story detail strings in this order:
+                protagonist, description, setting, plot,
+                conflict, theme, point_of_view
+
+        Returns:
+            str: The prompt text.
+        """
+        # The labels match the order the Streamlit app passes the args.
+        labels = [
+            "Protagonist", "Description", "Setting",
+            "Plot", "Conflict", "Theme", "Point of View"
+        ]
+        prompt_lines = ["Write a story with the following details:"]
+        for label, value in zip(labels, args):
+            prompt_lines.append(f"- {label}: {value}")
+        return "\n".join(prompt_lines)
+
+
+    def generate_story(self, system_prompt: str, *args, prompt_id: int | None = None, story_id: int | None = None):
         """
         Initialize StoryMaker with a system prompt and generate a story.
 
         Calling super().__init__() here (rather than in StoryHelper.__init__)
         lets us inject the user-selected system prompt at generation time.
         Each call starts a fresh StoryMaker conversation, so successive calls
-        are independent of one another.
+        are independent of one another. If a maker pool is set (see
+        set_maker_pool()), that conversation is leased from the pool instead
+        and this instance is left untouched, which makes it safe to share
+        between concurrent users. If a single-flight layer is set (see
+        set_single_flight()), a call identical to one already streaming
+        attaches to that stream instead of sending another request.
+
+        If stream coalescing is set (see set_stream_coalescing()), the
+        chunks are merged before they are yielded. If a story archive is set
+        (see set_story_archive()), the story is recorded once it is complete;
+        callers that join an identical stream do not record it again.
 
         Args:
             system_prompt (str): The full system prompt text to pass to
@@ -164,36 +576,305 @@ class StoryHelper(StoryMaker):
                     protagonist, description, setting, plot,
                     conflict, theme, point_of_view
                 These are assembled into a structured prompt for the model.
+            prompt_id (int | None): The catalog prompt used, recorded in the archive.
+            story_id (int | None): The catalog story type used, recorded in the archive.
 
         Returns:
             str: The generated story text from StoryMaker.
         """
-        # Re-initialize StoryMaker fresh with the chosen system prompt.
-        # stream_generate() handles streaming internally, so turn_on_streaming()
-        # is not needed here.
-        super().__init__(system_prompt)
+        chunks = self.__story_chunks(system_prompt, args, prompt_id, story_id)
+        if self.stream_coalescing is None:
+            yield from chunks
+        else:
+            yield from coalesce_chunks(chunks, *self.stream_coalescing)
+
+
+    def __story_chunks(self, system_prompt: str, args: tuple, prompt_id, story_id):
+        """Streams one story, as described in generate_story()."""
+        prompt = self.__build_prompt(*args)
+        title = args[0] if args else ""
+
+        # With a maker pool, the story is generated in a leased conversation,
+        # so this instance is never modified and can be shared by concurrent
+        # users. With single-flight, the upstream call runs in a worker
+        # StoryMaker, so it is not tied to whichever caller happened to start it.
+        def open_stream():
+            with self._worker(system_prompt) as maker:
+                yield from self.__archived(maker, prompt, title, prompt_id, story_id)
+
+        if self.maker_pool is not None:
+            settings = (self.maker_pool.temperature, self.maker_pool.max_tokens)
+        else:
+            # Re-initialize StoryMaker fresh with the chosen system prompt.
+            # stream_generate() handles streaming internally, so turn_on_streaming()
+            # is not needed here.
+            super().__init__(system_prompt)
+            if self.single_flight is None:
+                # yield from turns generate_story() into a generator, so the caller
+                # (e.g. st.write_stream) receives chunks as they arrive from the model.
+                yield from self.__archived(self, prompt, title, prompt_id, story_id)
+                return
+            settings = (self.temp, self.max_tokens)
+
+        if self.single_flight is None:
+            yield from open_stream()
+            return
+
+        # Identical requests already in flight are joined rather than repeated.
+        key = (self.url, self.main_model, system_prompt, prompt, *settings)
+        story = ""
+        for chunk in self.single_flight.stream(key, open_stream):
+            story += chunk
+            yield chunk
+
+        if self.maker_pool is None:
+            # Keep this conversation the same as if the story had been generated here.
+            self._add_prompt(prompt)
+            self._add_response(story)
+
+
+    def __archived(self, maker: StoryMaker, prompt: str, title: str, prompt_id, story_id):
+        """
+        Streams a story from maker and records it in the story archive once complete.
 
-        # Assemble the story fields into a structured prompt for the model.
-        # The labels match the order the Streamlit app passes the args.
-        labels = [
-            "Protagonist", "Description", "Setting",
-            "Plot", "Conflict", "Theme", "Point of View"
-        ]
-        prompt_lines = ["Write a story with the following details:"]
-        for label, value in zip(labels, args):
-            prompt_lines.append(f"- {label}: {value}")
-        prompt = "\n".join(prompt_lines)
+        The model, timings and token usage come from maker's last call (see
+        StoryMaker.get_last_call()). A story that fails or is abandoned
+        part-way is not recorded.
+        """
+        if self.story_archive is None:
+            yield from maker.stream_generate(prompt)
+            return
+
+        parts = []
+        for chunk in maker.stream_generate(prompt):
+            parts.append(chunk)
+            yield chunk
+
+        turns = maker.get_turn_stats()
+        self.__record_story(
+            "".join(parts), prompt, title, prompt_id, story_id, "app",
+            maker.get_last_call(), turns[-1].sent_tokens if turns else None,
+        )
+
+
+    def __record_story(self, story: str, prompt: str, title: str, prompt_id, story_id, source: str,
+                       call, sent_tokens: int | None):
+        """
+        Records a finished story in the story archive.
+
+        Token counts are the provider's when call has them, and estimates
+        otherwise. ttft is only kept for streamed calls; for the others it
+        would just repeat total_time.
+
+        Args:
+            call (CallMetrics | None): The model call that wrote the story.
+            sent_tokens (int | None): Estimated prompt tokens, used when the
+                provider did not report them.
+
+        Returns:
+            int | None: The archived story's id, or None if it could not be recorded.
+        """
+        try:
+            return self.story_archive.record(
+                story,
+                prompt=prompt,
+                title=title,
+                prompt_id=prompt_id,
+                story_id=story_id,
+                model=call.model if call is not None else None,
+                source=source,
+                ttft=call.ttft if call is not None and call.streamed else None,
+                total_time=call.total_time if call is not None else None,
+                prompt_tokens=call.prompt_tokens if call is not None and call.prompt_tokens is not None else sent_tokens,
+                completion_tokens=call.completion_tokens if call is not None and call.completion_tokens is not None else estimate_tokens(story),
+            )
+        except sqlite3.Error as error:
+            # The reader already has the story; losing its archive entry is not fatal.
+            warnings.warn(f"Could not archive the story: {error}")
+            return None
+
+
+    @staticmethod
+    def __estimate_request(system_prompt: str, prompt: str) -> int:
+        """Estimates the prompt tokens of a fresh conversation's first request."""
+        return estimate_messages_tokens([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ])
+
+
+    def archive_story(self, story: str, prompt_id: int, story_id: int, call=None, source: str = "app") -> int | None:
+        """
+        Records a story generated for a catalog card in the story archive.
+
+        For stories generated elsewhere and served later, e.g. by WarmPool
+        when a card takes one. generate_story() and generate_many_stories()
+        record their own stories. Does nothing if no archive is set.
+
+        Args:
+            story (str): The story text.
+            prompt_id (int): The 1-based system prompt ID it was generated with.
+            story_id (int): The 1-based story ID it was generated for.
+            call (CallMetrics | None): The model call that wrote it, e.g.
+                BatchResult.call. None records it without timings.
+            source (str): Where it was generated, e.g. "warm pool".
+
+        Returns:
+            int | None: The archived story's id, or None if it was not recorded.
+        """
+        if self.story_archive is None:
+            return None
+        system_prompt = self.get_helper_prompts(prompt_id)["system_prompt"]
+        record = self.get_helper_story(story_id)
+        prompt = self.__build_prompt(*record[1:])
+        return self.__record_story(story, prompt, record.protagonist, prompt_id, story_id, source, call,
+                                   self.__estimate_request(system_prompt, prompt))
+
+
+    def _worker(self, system_prompt: str = ""):
+        """
+        Leases the conversation from the maker pool, if one is set (see
+        set_maker_pool()), so this helper never has more conversations open
+        than the pool allows. Otherwise spawns one, as StoryMaker does.
+        """
+        if self.maker_pool is not None:
+            return self.maker_pool.lease(system_prompt, self._policy_state())
+        return super()._worker(system_prompt)
+
+
+    def generate_many_stories(self, pairs: list, max_concurrency: int = 4, in_order: bool = True,
+                              archive: bool = True):
+        """
+        Generate one story per (prompt_id, story_id) pair, running requests concurrently.
+
+        Each pair is resolved to its system prompt and story details, then the
+        whole batch is handed to StoryMaker's batch runner so every request
+        shares one HTTP client. With a maker pool set, each request leases its
+        conversation from the pool, so batches and live generations share its
+        bound. A failing pair is reported in its BatchResult and does not
+        abort the rest of the batch. Finished stories are recorded in the
+        story archive, if one is set (see set_story_archive()), with the
+        model, timings and token usage of the call that wrote them.
+
+        Args:
+            pairs (list[tuple[int, int]]): (prompt_id, story_id) pairs, both
+                1-based as in the JSON files.
+            max_concurrency (int): Maximum number of requests in flight at once.
+            in_order (bool): If True, results are yielded in input order. If
+                False, they are yielded as soon as each one completes.
+            archive (bool): If False, nothing is recorded. For stories kept to
+                be served later, which archive_story() records once served.
+
+        Yields:
+            BatchResult: One result per pair. BatchResult.index is the pair's
+                position in pairs.
+
+        Raises:
+            IndexError: If a pair references an unknown prompt or story ID.
+                Pairs are resolved before any request is sent.
+        """
+        # Each request runs in its own conversation from _worker(), built from
+        # this instance's current settings, so this conversation and any
+        # temperature or token limit set on it are left as they are.
+        jobs = []
+        titles = []
+        for prompt_id, story_id in pairs:
+            story = self.get_helper_story(story_id)
+            jobs.append((
+                self.get_helper_prompts(prompt_id)["system_prompt"],
+                self.__build_prompt(*story[1:]),
+            ))
+            titles.append(story.protagonist)
+
+        for result in self._generate_batch(jobs, max_concurrency, in_order):
+            if result.error is None and archive and self.story_archive is not None:
+                prompt_id, story_id = pairs[result.index]
+                system_prompt, prompt = jobs[result.index]
+                self.__record_story(result.story, prompt, titles[result.index], prompt_id, story_id,
+                                    "batch", result.call, self.__estimate_request(system_prompt, prompt))
+            yield result
+
+
+    def set_single_flight(self, single_flight):
+        """
+        Deduplicates identical generate_story() calls that overlap in time.
 
-        # yield from turns generate_story() into a generator, so the caller
-        # (e.g. st.write_stream) receives chunks as they arrive from the model.
-        yield from self.stream_generate(prompt)
+        Assign StoryHelper.single_flight instead to share one layer between
+        every instance, e.g. every session of the Streamlit app.
+
+        Args:
+            single_flight (SingleFlight | None): The layer, or None to disable.
+        """
+        self.single_flight = single_flight
+
+
+    def set_stream_coalescing(self, interval: float | None = 0.1, max_chars: int | None = 1024):
+        """
+        Enables or disables merging generate_story()'s chunks into fewer, larger ones.
+
+        Streams otherwise arrive a token or two at a time, and a consumer
+        that redraws per chunk (e.g. st.write_stream()) pays for every one.
+        The first chunk is still passed through at once. See
+        ModelStreams.coalesce_chunks() for the details, and
+        stream_benchmark.py for the effect of different settings.
+
+        The Streamlit app does not use this: its background jobs collect
+        the chunks, and the progress panel redraws on its 0.5 second poll,
+        so the number of chunks never reaches the browser.
+
+        Args:
+            interval (float | None): Seconds between merged chunks. None
+                flushes on size only.
+            max_chars (int | None): Buffered characters that force a chunk
+                out early. None flushes on time only. Passing None for both
+                passes every chunk through again.
+        """
+        if interval is None and max_chars is None:
+            self.stream_coalescing = None
+        else:
+            self.stream_coalescing = (interval, max_chars)
+
+
+    def set_story_archive(self, archive):
+        """
+        Records every story this helper generates in a persistent archive.
+
+        Stories from generate_story() and generate_many_stories() are recorded
+        with the model, timings and token usage of the call that wrote them;
+        stories served later (e.g. by the app's warm pool) are recorded by
+        archive_story() when they are served. Assign StoryHelper.story_archive
+        instead to share one archive between every instance.
+
+        Args:
+            archive (StoryArchive | None): The archive, or None to stop recording.
+        """
+        self.story_archive = archive
+
+
+    def set_maker_pool(self, pool):
+        """
+        Generates stories in conversations leased from a pool instead of this instance.
+
+        Needed when one StoryHelper serves several users at once, as in the
+        Streamlit app: each generate_story() call then gets its own
+        conversation, and the shared instance only serves the catalog.
+
+        Args:
+            pool (MakerPool | None): The pool, or None to generate in this
+                instance's own conversation again.
+        """
+        self.maker_pool = pool
 
 
     def close_instance(self):
         """Calls the close function to close the HTTP client and delete loaded JSON data from memory to free unused space."""
+        self.stop_watching_catalog()
         self.close()
         if hasattr(self, 'helpers'):
             del self.helpers
             
         if hasattr(self, 'system_prompt'):
-            del self.system_prompt
\ No newline at end of file
+            del self.system_prompt
+
+        if hasattr(self, 'catalog'):
+            del self.catalog
\ No newline at end of file
@@ -1,9 +1,57 @@
-from dotenv import dotenv_values
-from openai import OpenAI
+from ClientPool import ClientPool
+from ResponseCache import ResponseCache, iter_chunks
+from HistoryPolicy import TurnStats, estimate_tokens, estimate_messages_tokens
+from ModelStreams import StreamPump, LatencyTracker, StreamStalledError, StreamCancelledError, CancelScope
+from StoryMetrics import CallTimer
+from collections import namedtuple
+from contextlib import contextmanager
 import json
+import os
+import queue
+import time
 
-config = dotenv_values(".env")
-open_ai_key = config["OPENROUTER_API"]
+# Name of the setting holding the OpenRouter API key, in the environment or .env.
+API_KEY_NAME = "OPENROUTER_API"
+
+# Values read from .env, loaded on first use by resolve_api_key().
+_dotenv_config = None
+
+def resolve_api_key(api_key: str | None = None) -> str:
+    """
+    Finds the OpenRouter API key, reading configuration only when first needed.
+
+    Looks in this order: the explicit api_key argument, the OPENROUTER_API
+    environment variable, then OPENROUTER_API in the .env file of the current
+    directory. The .env file is read at most once per process.
+
+    Args:
+        api_key (str | None): An explicitly provided key.
+
+    Returns:
+        str: The API key.
+
+    Raises:
+        ValueError: If no key is configured anywhere.
+    """
+    global _dotenv_config
+    if api_key:
+        return api_key
+    if os.environ.get(API_KEY_NAME):
+        return os.environ[API_KEY_NAME]
+    if _dotenv_config is None:
+        # Imported here so that importing StoryMaker stays cheap.
+        from dotenv import dotenv_values
+        _dotenv_config = dotenv_values(".env")
+    if _dotenv_config.get(API_KEY_NAME):
+        return _dotenv_config[API_KEY_NAME]
+    raise ValueError(f"Error: No OpenRouter API key found. Pass api_key, set the {API_KEY_NAME} environment variable, or add {API_KEY_NAME} to .env.")
+
+# The outcome of one item in a generate_many() batch. Exactly one of story and
+# error is set: story holds the generated text, error the exception that
+# stopped that item. index is the item's position in the input. call holds the
+# CallMetrics of the model call that wrote the story (see get_last_call()), or
+# None if it failed or came from the response cache.
+BatchResult = namedtuple('BatchResult', ['index', 'prompt', 'story', 'error', 'call'], defaults=(None,))
 
 class StoryMaker:
     """
@@ -19,10 +67,30 @@ class StoryMaker:
         fallback_models (list[str]): Fallback models if the primary is unavailable.
         basic_prompt (str): Default user prompt when none is provided.
         init_sys_prompt (str): Default system prompt applied when no custom prompt is given.
+        api_key (str | None): Explicit OpenRouter API key. None resolves it lazily from
+            the environment or .env when the client is first created.
+        response_cache (ResponseCache | None): Optional cache of model responses.
+            Disabled (None) by default; see set_response_cache().
+        history_policy (HistoryPolicy | None): Optional policy deciding how much of
+            the conversation is re-sent per request. None sends everything; see
+            set_history_policy().
+        hedge_delay (float | None): Seconds to wait for a first token before racing
+            the next fallback model. None disables hedging; see set_hedging().
+        stall_timeout (float | None): Seconds a stream may go without a chunk before
+            failing over to a fallback model. None disables it; see set_stall_watchdog().
+        stream_deadline (float | None): Overall seconds allowed per streamed response.
+            None means no deadline.
+        metrics (MetricsRegistry | None): Optional registry that receives timings
+            and token usage for every model call; see set_metrics().
+        rate_limiter (RateLimitScheduler | None): Optional scheduler that paces
+            requests per model and retries 429 responses; see set_rate_limiter().
     """
 
     # Base URL
     url = "https://openrouter.ai/api/v1"
+
+    # API key; resolved lazily by resolve_api_key() when left as None.
+    api_key = None
     
     # Models to use and fallbacks
     main_model = "arcee-ai/trinity-large-preview:free"
@@ -34,23 +102,66 @@ class StoryMaker:
                        Show, don’t tell. Use sensory detail, internal monologue, and layered description. Build tension naturally. Characters should feel psychologically real and complex. \
                         Avoid generic phrasing, shallow description, and mechanical structure."
 
-    def __init__(self, system_prompt:str=""):
+    # Optional response cache, shared by every instance unless overridden.
+    response_cache = None
+
+    # Optional history policy and the prompt used when it asks for a summary.
+    history_policy = None
+    summary_prompt = "Summarize the following story-writing conversation in a short paragraph. \
+                      Keep character names, plot points, tone and every change the user asked for."
+    summary_max_tokens = 500
+
+    # Hedged requests (off by default). The latency tracker is shared by every
+    # instance so the adaptive delay learns from all generations in the process.
+    hedge_delay = None
+    hedge_adaptive = False
+    latency_tracker = LatencyTracker()
+
+    # Stream stall watchdog (off by default) and the instruction used to resume
+    # a stalled story on a fallback model.
+    stall_timeout = None
+    stream_deadline = None
+    continue_prompt = "Your previous reply was cut off. Continue the story exactly where it stopped, \
+                       without repeating any text and without any preamble."
+
+    # Optional call metrics (off by default).
+    metrics = None
+
+    # Optional client-side rate limiting (off by default).
+    rate_limiter = None
+
+    # Every per-instance policy set by a set_*() method, plus the model and
+    # the prompts those policies send. Workers that generate on an instance's
+    # behalf copy all of them (see _policy_state()), so a new policy only has
+    # to be listed here.
+    policy_attributes = ("response_cache", "history_policy", "hedge_delay", "hedge_adaptive",
+                         "stall_timeout", "stream_deadline", "metrics", "rate_limiter",
+                         "main_model", "summary_prompt", "summary_max_tokens", "continue_prompt")
+
+    def __init__(self, system_prompt:str="", api_key:str|None=None):
         """
         Initializes the StoryMaker with default settings.
 
-        The HTTP client is not created here. It is created lazily the first time
-        generate() is called.
+        The HTTP client is not created here, and no configuration is read. Both
+        happen lazily the first time generate() is called.
 
         Args:
             system_prompt (str): A custom system prompt to guide the model's behavior.
                 If left empty, the default storytelling prompt is used.
+            api_key (str | None): The OpenRouter API key. If None, it is read from
+                the OPENROUTER_API environment variable or .env on first use.
         """
 
         # make sure some values are set.
+        if api_key is not None:
+            self.api_key = api_key
         self.temp = 1
         self.max_tokens = 5000
         self.stream_result = False
         self.__preserve_convo = []
+        self.__turn_stats = []
+        self.__timer = None
+        self.__last_call = None
 
         if system_prompt == "":
             self.__preserve_convo.append({
@@ -67,8 +178,230 @@ class StoryMaker:
 
 
     def __create_client(self):
-        """Creates and assigns the OpenAI HTTP client. Called lazily by generate()."""
-        self.client = OpenAI(base_url=self.url, api_key=open_ai_key)
+        """Borrows the shared OpenAI HTTP client from ClientPool. Called lazily by generate()."""
+        self.client = ClientPool.acquire(self.url, resolve_api_key(self.api_key))
+
+
+    def _release_client(self):
+        """Returns the borrowed HTTP client to ClientPool, keeping its connections alive."""
+        if hasattr(self, 'client'):
+            ClientPool.release(self.client)
+            del self.client
+
+
+    def _request_params(self, stream: bool) -> dict:
+        """
+        Builds the keyword arguments for a chat completion request.
+
+        Shared by StoryMaker and AsyncStoryMaker so that both send exactly the
+        same request for the same conversation.
+
+        Args:
+            stream (bool): Whether the model should stream its response.
+
+        Returns:
+            dict: Keyword arguments for client.chat.completions.create().
+        """
+        params = {
+            "model": self.main_model,
+            "messages": self.__messages_to_send(),
+            "extra_body": {
+                "models": self.__fallback_models
+            },
+            "max_tokens": self.max_tokens,
+            "stream": stream,
+            "temperature": self.temp,
+        }
+        if stream and self.metrics is not None:
+            # Ask for token usage in the final chunk so it can be recorded.
+            params["stream_options"] = {"include_usage": True}
+        return params
+
+
+    def __messages_to_send(self) -> list:
+        """
+        Applies the history policy to the conversation and records the token savings.
+
+        Returns:
+            list[dict]: The messages to send with the next request.
+        """
+        messages = self.__preserve_convo
+        full_tokens = estimate_messages_tokens(messages)
+        if self.history_policy is not None:
+            messages = self.history_policy.apply(messages, self._summarizer())
+        sent_tokens = estimate_messages_tokens(messages) if messages is not self.__preserve_convo else full_tokens
+        self.__turn_stats.append(TurnStats(full_tokens, sent_tokens, full_tokens - sent_tokens))
+
+        # History entries may carry extra bookkeeping (e.g. "model"); only send
+        # the fields the API expects.
+        return [{"role": message["role"], "content": message["content"]} for message in messages]
+
+
+    def _summarizer(self):
+        """
+        Returns the function history policies use to summarize older turns.
+
+        Returns:
+            callable | None: __summarize, or None if there is no client yet.
+        """
+        return self.__summarize if hasattr(self, 'client') else None
+
+
+    def __summarize(self, messages: list) -> str:
+        """
+        Asks the model for a short summary of part of the conversation.
+
+        Args:
+            messages (list[dict]): The messages to summarize.
+
+        Returns:
+            str: The summary text.
+        """
+        transcript = "\n\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        response = self.__create(dict(
+            model=self.main_model,
+            messages=[
+                {"role": "system", "content": self.summary_prompt},
+                {"role": "user", "content": transcript},
+            ],
+            extra_body={
+                "models": self.__fallback_models
+            },
+            max_tokens=self.summary_max_tokens,
+            temperature=0.3,
+        ))
+        return response.choices[0].message.content or ""
+
+
+    def _add_prompt(self, prompt: str):
+        """
+        Appends a user prompt to the conversation history.
+
+        Args:
+            prompt (str): The story prompt. If empty, the default basic_prompt is used.
+        """
+        message = {"role": "user", "content": prompt if prompt else self.basic_prompt}
+        self.__preserve_convo.append(message)
+
+
+    def _add_update(self, **kwargs):
+        """
+        Appends an update instruction built from keyword arguments to the history.
+
+        Args:
+            **kwargs: Arbitrary keyword arguments describing the desired updates.
+
+        Raises:
+            ValueError: If no story has been generated yet.
+        """
+        if len(self.__preserve_convo) == 1:
+            raise ValueError("Error: You need to run `generate()` first to get a basic story. Then run `update()` again to make updates to it.")
+
+        # Make the message
+        message = {"role":"user", "content": "Update the story you have created with the following parameters:\n"}
+        for key, value in kwargs.items():
+            message["content"] += f"{key}: {value}\n"
+        self.__preserve_convo.append(message)
+
+
+    def _add_response(self, content: str, model: str | None = None):
+        """
+        Appends a complete model response to the conversation history.
+
+        Args:
+            content (str): The full response text from the model.
+            model (str | None): The model that actually answered, if known. It
+                is recorded under the message's "model" key.
+        """
+        message = {
+            "role": "assistant", 
+            "content": content,
+        }
+        if model is not None:
+            message["model"] = model
+        self.__preserve_convo.append(message)
+
+
+    def _clear_history(self):
+        """Clears the preserved conversation with the model to free unused space."""
+        self.__preserve_convo.clear()
+        self.__turn_stats.clear()
+
+
+    def __cache_key(self, params: dict) -> str | None:
+        """
+        Returns the response cache key for a request, or None if caching is off.
+
+        Args:
+            params (dict): The request keyword arguments from _request_params().
+        """
+        if self.response_cache is None:
+            return None
+        return ResponseCache.make_key({"base_url": self.url, **params})
+
+
+    def __create(self, params: dict):
+        """
+        Sends one chat completion request, paced by the rate limiter if one is set.
+
+        Every model call goes through here. With a rate limiter, the request
+        waits for its model's budget, the response headers feed the limiter,
+        and a 429 pauses the model and is retried up to rate_limiter.max_retries
+        times. The prompt's tokens are charged to the limiter once, however
+        often the request is retried.
+
+        Args:
+            params (dict): Keyword arguments for client.chat.completions.create().
+
+        Returns:
+            The parsed response, or a stream if params["stream"] is true.
+        """
+        limiter = self.rate_limiter
+        if limiter is None:
+            return self.client.chat.completions.create(**params)
+
+        # The scheduler owns retries, so the SDK's own retries (which would
+        # hide a 429 from it) are turned off for these calls. The other errors
+        # the SDK would retry are retried here instead, as often as it would.
+        client = self.client.with_options(max_retries=0)
+        model = params["model"]
+        tokens = estimate_messages_tokens(params["messages"])
+        rate_limited = 0
+        failures = 0
+        while True:
+            limiter.acquire(model, tokens if rate_limited + failures == 0 else 0)
+            try:
+                raw = client.chat.completions.with_raw_response.create(**params)
+            except Exception as error:
+                if getattr(error, "status_code", None) == 429 and rate_limited < limiter.max_retries:
+                    # acquire() on the next attempt waits out the pause set here.
+                    limiter.on_rate_limited(model, error.response.headers, rate_limited)
+                    rate_limited += 1
+                    continue
+                if self.__is_transient(error) and failures < self.client.max_retries:
+                    time.sleep(limiter.backoff(failures))
+                    failures += 1
+                    continue
+                raise
+            limiter.update_from_headers(model, raw.headers)
+            return raw.parse()
+
+
+    @staticmethod
+    def __is_transient(error: Exception) -> bool:
+        """Returns True for the errors the OpenAI SDK retries itself, other than 429."""
+        # Already imported by the time a request fails.
+        from openai import APIConnectionError
+        if isinstance(error, APIConnectionError):
+            return True
+        status = getattr(error, "status_code", None)
+        return status is not None and (status in (408, 409) or status >= 500)
+
+
+    def __charge_completion(self, params: dict, content: str | None):
+        """Charges a finished response's tokens to the rate limiter, if one is set."""
+        if self.rate_limiter is not None and content:
+            self.rate_limiter.charge(params["model"], estimate_tokens(content))
 
 
     def __chat(self):
@@ -80,23 +413,46 @@ class StoryMaker:
         Returns:
             str: The complete response text from the model.
         """
-        response = self.client.chat.completions.create(
-            model=self.main_model, 
-            messages=self.__preserve_convo,
-            extra_body={
-                "models": self.__fallback_models
-            },
-            max_tokens=self.max_tokens,
-            stream=self.stream_result,
-            temperature=self.temp
-        )
-
-        self.__preserve_convo.append({
-                "role": "assistant", 
-                "content": response.choices[0].message.content,
-            }
-        )
-        return response.choices[0].message.content
+        # Hedging and the watchdog read the response as a stream, so the
+        # request must ask for one (and for usage, when metrics are on).
+        params = self._request_params(self.stream_result or self.__uses_stream_workers())
+        self.__last_call = None
+        cache_key = self.__cache_key(params)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self._add_response(cached)
+                return cached
+
+        self.__start_timer(params)
+        model = None
+        try:
+            if self.__uses_stream_workers():
+                # Hedging and the watchdog work on streams, so join the stream into one response.
+                parts = []
+                for model, content in self.__stream_chunks(params):
+                    parts.append(content)
+                    if self.__timer is not None:
+                        self.__timer.chunk(content)
+                content = "".join(parts)
+            else:
+                response = self.__create(params)
+                content = response.choices[0].message.content
+                model = response.model
+                if self.__timer is not None:
+                    self.__timer.opened()
+                    self.__timer.usage(response.usage)
+                    self.__timer.chunk(content or "")
+        except Exception as error:
+            self.__finish_timer(model, error)
+            raise
+        self.__finish_timer(model)
+        self.__charge_completion(params, content)
+
+        if cache_key is not None and content is not None:
+            self.response_cache.put(cache_key, content)
+        self._add_response(content, model)
+        return content
 
         
     def __stream_chat(self):
@@ -111,29 +467,361 @@ class StoryMaker:
         Yields:
             str: Individual text chunks from the model as they arrive.
         """
-        response = self.client.chat.completions.create(
-            model=self.main_model,
-            messages=self.__preserve_convo,
-            extra_body={
-                "models": self.__fallback_models
-            },
-            max_tokens=self.max_tokens,
-            stream=True,                 # always stream in this path
-            temperature=self.temp
-        )
-
+        # always stream in this path
+        params = self._request_params(True)
+        self.__last_call = None
+        cache_key = self.__cache_key(params)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                # Replay the cached response as a chunked stream.
+                yield from iter_chunks(cached)
+                self._add_response(cached)
+                return
+
+        self.__start_timer(params)
         complete_response = ""
-        for chunk in response:
-            if chunk.choices[0].delta.content is not None:
-                content = chunk.choices[0].delta.content
+        model = None
+        try:
+            for model, content in self.__stream_chunks(params):
                 complete_response += content
+                if self.__timer is not None:
+                    self.__timer.chunk(content)
                 yield content            # send chunk to the caller
+        except Exception as error:
+            self.__finish_timer(model, error)
+            raise
+        self.__finish_timer(model)
+        self.__charge_completion(params, complete_response)
+
+        # Only a stream that ran to completion is cached.
+        if cache_key is not None:
+            self.response_cache.put(cache_key, complete_response)
 
         # Append the full assembled response to history once streaming is done
-        self.__preserve_convo.append({
-            "role": "assistant",
-            "content": complete_response,
-        })
+        self._add_response(complete_response, model)
+
+
+    def __start_timer(self, params: dict):
+        """Starts timing a model call. Every call is timed, for get_last_call()."""
+        self.__timer = CallTimer(params["model"], params["stream"])
+
+
+    def __finish_timer(self, model: str | None, error: BaseException | None = None):
+        """Keeps the current call's measurements and records them in the metrics registry, if set."""
+        timer, self.__timer = self.__timer, None
+        if timer is None:
+            return
+        self.__last_call = timer.result(model, error)
+        if self.metrics is not None:
+            self.metrics.record(self.__last_call, timer.gaps())
+
+
+    def __uses_stream_workers(self) -> bool:
+        """Returns True if hedging or the stall watchdog is enabled."""
+        return self.hedge_delay is not None or self.stall_timeout is not None or self.stream_deadline is not None
+
+
+    def __stream_chunks(self, params: dict):
+        """
+        Picks the streaming strategy for a request.
+
+        Inside a CancelScope, even a plain stream is read through a
+        StreamPump, so that cancelling the scope can interrupt a read that is
+        still waiting for the response.
+
+        Args:
+            params (dict): The request keyword arguments from _request_params().
+
+        Yields:
+            tuple[str, str]: (model, text) for each chunk.
+        """
+        if self.stall_timeout is not None or self.stream_deadline is not None:
+            return self.__watched_stream(params)
+        if self.hedge_delay is not None:
+            return self.__hedged_stream(params)
+        if CancelScope.current() is not None:
+            return self.__pumped_stream(params, None)
+        return self.__plain_stream(params)
+
+
+    @staticmethod
+    def __cancellable(events: queue.Queue) -> queue.Queue:
+        """Makes cancelling the thread's CancelScope, if any, put a "cancelled" event on events."""
+        scope = CancelScope.current()
+        if scope is not None:
+            scope.add(lambda: events.put((None, "cancelled", None)))
+        return events
+
+
+    @staticmethod
+    def __check_cancelled(event: tuple) -> tuple:
+        """Returns a stream event, raising StreamCancelledError for a "cancelled" one."""
+        if event[1] == "cancelled":
+            raise StreamCancelledError("The stream was cancelled.")
+        return event
+
+
+    def __next_event(self, events: queue.Queue, deadline: float | None):
+        """
+        Waits for the next stream event, enforcing the stall timeout and deadline.
+
+        Args:
+            events (queue.Queue): The StreamPump event queue.
+            deadline (float | None): time.monotonic() value the whole response
+                must finish by, or None.
+
+        Returns:
+            tuple: The (pump_id, kind, value) event.
+
+        Raises:
+            StreamStalledError: If no event arrives in time.
+            StreamCancelledError: If the thread's CancelScope was cancelled.
+        """
+        timeout = self.stall_timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise StreamStalledError("The stream missed its overall deadline.")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        try:
+            return self.__check_cancelled(events.get(timeout=timeout))
+        except queue.Empty:
+            raise StreamStalledError(f"No chunk arrived for {timeout:.1f} seconds.") from None
+
+
+    def __pumped_stream(self, params: dict, deadline: float | None):
+        """
+        Streams one request on a background StreamPump under the watchdog.
+
+        Args:
+            params (dict): The complete request keyword arguments.
+            deadline (float | None): time.monotonic() value to finish by, or None.
+
+        Yields:
+            tuple[str, str]: (model, text) for each chunk.
+        """
+        events = self.__cancellable(queue.Queue())
+        pump = StreamPump(0, lambda: self.__create(params), events, self.__timer)
+        try:
+            while True:
+                _, kind, value = self.__next_event(events, deadline)
+                if kind == "chunk":
+                    yield value
+                elif kind == "done":
+                    return
+                else:
+                    raise value
+        finally:
+            pump.cancel()
+
+
+    def __watched_stream(self, params: dict):
+        """
+        Streams a request, failing over mid-stream when it stalls or breaks.
+
+        If no chunk arrives within stall_timeout (or the stream errors), the
+        stream is cancelled and the request is re-issued to the next fallback
+        model with the text produced so far as an assistant message, followed
+        by continue_prompt. Its output is yielded as a seamless continuation.
+        When stream_deadline is set, the whole response, including failovers,
+        must finish within it.
+
+        Args:
+            params (dict): The request keyword arguments from _request_params().
+
+        Yields:
+            tuple[str, str]: (model, text) for each chunk.
+
+        Raises:
+            StreamStalledError: If every model stalled or the deadline passed.
+                Its partial attribute holds the text produced so far.
+        """
+        deadline = None
+        if self.stream_deadline is not None:
+            deadline = time.monotonic() + self.stream_deadline
+
+        models = [self.main_model] + [model for model in self.__fallback_models if model != self.main_model]
+        if self.hedge_delay is not None:
+            source = self.__hedged_stream(params, deadline)
+        else:
+            source = self.__pumped_stream(params, deadline)
+
+        partial = ""
+        last_model = self.main_model
+        tried = set()
+        while True:
+            try:
+                for last_model, content in source:
+                    partial += content
+                    yield last_model, content
+                return
+            except StreamCancelledError:
+                raise
+            except Exception as error:
+                source.close()
+                tried.add(last_model)
+                remaining = [model for model in models if model not in tried]
+                if not remaining or (deadline is not None and time.monotonic() >= deadline):
+                    raise StreamStalledError("Every model stalled or failed before the story finished.", partial) from error
+                last_model = remaining[0]
+
+            # Resume on the next model from where the stalled stream stopped.
+            messages = list(params["messages"])
+            if partial:
+                messages += [
+                    {"role": "assistant", "content": partial},
+                    {"role": "user", "content": self.continue_prompt},
+                ]
+            attempt = {**params, "model": last_model, "messages": messages, "stream": True}
+            attempt.pop("extra_body", None)
+            source = self.__pumped_stream(attempt, deadline)
+
+
+    def __plain_stream(self, params: dict):
+        """
+        Streams one request to the main model (with OpenRouter's own failover).
+
+        Args:
+            params (dict): The request keyword arguments from _request_params().
+
+        Yields:
+            tuple[str, str]: (model, text) for each non-empty chunk.
+        """
+        response = self.__create(params)
+        timer = self.__timer
+        if timer is not None:
+            timer.opened()
+        try:
+            for chunk in response:
+                if timer is not None and getattr(chunk, "usage", None) is not None:
+                    timer.usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    yield chunk.model, chunk.choices[0].delta.content
+        finally:
+            # Ends the request at once if the caller abandons the stream.
+            response.close()
+
+
+    def __hedge_delay_for(self, model: str) -> float:
+        """Returns how long to wait for a first token from model before hedging."""
+        if self.hedge_adaptive:
+            p95 = self.latency_tracker.percentile(model)
+            if p95 is not None:
+                return p95
+        return self.hedge_delay
+
+
+    def __hedged_stream(self, params: dict, deadline: float | None = None):
+        """
+        Streams a request, racing the fallback models against a slow main model.
+
+        The request is sent to the main model first. If no token arrives within
+        the hedge delay, the same request is also sent to the next fallback
+        model, and so on down the list. The first stream to produce a token
+        wins and every other stream is cancelled. A stream that fails before
+        producing anything immediately hands over to the next model.
+
+        Every stream that did not fail adds a time-to-first-token sample to
+        latency_tracker, including the losers: a loser that was cancelled
+        before its first token is recorded as censored at the time it was
+        cancelled.
+
+        Args:
+            params (dict): The request keyword arguments from _request_params().
+            deadline (float | None): time.monotonic() value to finish by, or
+                None. Set by the stall watchdog, which also makes the stall
+                timeout apply once every model has been launched.
+
+        Yields:
+            tuple[str, str]: (model, text) for each chunk of the winning stream.
+
+        Raises:
+            Exception: The last error, if every model failed.
+            StreamStalledError: If the stall timeout or deadline is exceeded.
+        """
+        models = [self.main_model] + [model for model in self.__fallback_models if model != self.main_model]
+        events = self.__cancellable(queue.Queue())
+        pumps = []
+        started = []
+        finished = set()
+        recorded = set()
+
+        def record(pump, now):
+            # Failed streams say nothing about latency.
+            if pump.pump_id in finished or pump.pump_id in recorded:
+                return
+            recorded.add(pump.pump_id)
+            first_token_at = pump.first_token_at
+            self.latency_tracker.record(
+                models[pump.pump_id],
+                (first_token_at if first_token_at is not None else now) - started[pump.pump_id],
+                censored=first_token_at is None,
+            )
+
+        def launch():
+            # Each attempt targets one model directly; hedging replaces
+            # OpenRouter's sequential failover.
+            attempt = {**params, "model": models[len(pumps)], "stream": True}
+            attempt.pop("extra_body", None)
+            started.append(time.monotonic())
+            pumps.append(StreamPump(len(pumps), lambda: self.__create(attempt), events, self.__timer))
+
+        launch()
+        try:
+            winner = None
+            while winner is None:
+                if len(pumps) < len(models):
+                    hedge_at = started[-1] + self.__hedge_delay_for(models[len(pumps) - 1])
+                    if deadline is not None and deadline < hedge_at:
+                        # The deadline comes first, so it is enforced below.
+                        pump_id, kind, value = self.__next_event(events, deadline)
+                    else:
+                        try:
+                            pump_id, kind, value = self.__check_cancelled(
+                                events.get(timeout=max(hedge_at - time.monotonic(), 0)))
+                        except queue.Empty:
+                            launch()
+                            continue
+                else:
+                    pump_id, kind, value = self.__next_event(events, deadline)
+
+                if kind == "error":
+                    finished.add(pump_id)
+                    if len(finished) == len(pumps):
+                        if len(pumps) == len(models):
+                            raise value
+                        launch()
+                    continue
+
+                winner = pump_id
+                now = time.monotonic()
+                self.latency_tracker.record(models[winner], now - started[winner])
+                recorded.add(winner)
+                for pump in pumps:
+                    if pump.pump_id != winner:
+                        pump.cancel()
+                        record(pump, now)
+                if kind == "done":
+                    return
+                yield value
+
+            while True:
+                pump_id, kind, value = self.__next_event(events, deadline)
+                if pump_id != winner:
+                    continue
+                if kind == "chunk":
+                    yield value
+                elif kind == "done":
+                    return
+                else:
+                    raise value
+        finally:
+            # Also stops the winner if the caller abandons the stream early.
+            now = time.monotonic()
+            for pump in pumps:
+                pump.cancel()
+                record(pump, now)
 
 
     def stream_generate(self, prompt: str = ""):
@@ -154,8 +842,7 @@ class StoryMaker:
         if not hasattr(self, 'client'):
             self.__create_client()
 
-        message = {"role": "user", "content": prompt if prompt else self.basic_prompt}
-        self.__preserve_convo.append(message)
+        self._add_prompt(prompt)
 
         # Delegate to __stream_chat() which handles the streaming loop
         yield from self.__stream_chat()
@@ -179,8 +866,7 @@ class StoryMaker:
             self.__create_client()
         
         # Initialize the prompt.
-        message = {"role": "user", "content": prompt if prompt else self.basic_prompt}
-        self.__preserve_convo.append(message)
+        self._add_prompt(prompt)
         
         # chat with the model.
         model_response = self.__chat()
@@ -188,6 +874,139 @@ class StoryMaker:
         return model_response
 
 
+    def generate_many(self, prompts: list, max_concurrency: int = 4, system_prompt: str = "", in_order: bool = True):
+        """
+        Generates one independent story per prompt, running requests concurrently.
+
+        Every prompt gets its own fresh conversation, but all of them share the
+        pooled HTTP client and therefore its connections. At most
+        max_concurrency requests are in flight at once. A failing item is
+        reported in its BatchResult and does not abort the rest of the batch.
+
+        Args:
+            prompts (list[str]): The story prompts. Empty strings use basic_prompt.
+            max_concurrency (int): Maximum number of requests in flight at once.
+            system_prompt (str): The system prompt for every story. If empty,
+                the default storytelling prompt is used.
+            in_order (bool): If True, results are yielded in input order. If
+                False, they are yielded as soon as each one completes.
+
+        Yields:
+            BatchResult: One result per prompt.
+        """
+        jobs = [(system_prompt, prompt) for prompt in prompts]
+        yield from self._generate_batch(jobs, max_concurrency, in_order)
+
+
+    def _generate_batch(self, jobs: list, max_concurrency: int, in_order: bool):
+        """
+        Runs (system_prompt, prompt) jobs concurrently over the pooled client.
+
+        Shared by generate_many() and StoryHelper.generate_many_stories(). Each
+        job runs in its own conversation from _worker(), which copies this
+        instance's settings and policies, so the whole batch is cached, timed
+        and paced like this instance.
+
+        Args:
+            jobs (list[tuple[str, str]]): (system_prompt, prompt) pairs.
+            max_concurrency (int): Maximum number of requests in flight at once.
+            in_order (bool): Yield in input order rather than completion order.
+
+        Yields:
+            BatchResult: One result per job.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        def run(index, system_prompt, prompt):
+            try:
+                with self._worker(system_prompt) as worker:
+                    story = worker.generate(prompt)
+                    return BatchResult(index, prompt, story, None, worker.get_last_call())
+            except Exception as error:
+                return BatchResult(index, prompt, None, error)
+
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        try:
+            futures = [
+                executor.submit(run, index, system_prompt, prompt)
+                for index, (system_prompt, prompt) in enumerate(jobs)
+            ]
+            for future in (futures if in_order else as_completed(futures)):
+                yield future.result()
+        finally:
+            # If the caller stops iterating early, drop the queued requests.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+    def _spawn_worker(self, system_prompt: str = "") -> "StoryMaker":
+        """
+        Returns a fresh StoryMaker conversation with this instance's settings.
+
+        The worker borrows the shared client from ClientPool and copies the
+        API key, URL, temperature, token limit and everything in
+        _policy_state(), including the main model.
+        The caller must close() it.
+
+        Args:
+            system_prompt (str): The worker's system prompt.
+        """
+        worker = StoryMaker(system_prompt, self.api_key)
+        worker.url = self.url
+        worker.temp = self.temp
+        worker.max_tokens = self.max_tokens
+        worker._apply_policy_state(self._policy_state())
+        return worker
+
+
+    @contextmanager
+    def _worker(self, system_prompt: str = ""):
+        """
+        Provides a conversation to generate in on this instance's behalf.
+
+        StoryMaker spawns a worker (see _spawn_worker()) and closes it
+        afterwards. StoryHelper leases one from its MakerPool instead, when it
+        has one, so batches respect the pool's bound.
+
+        Args:
+            system_prompt (str): The conversation's system prompt.
+
+        Yields:
+            StoryMaker: A conversation nobody else is using.
+        """
+        worker = self._spawn_worker(system_prompt)
+        try:
+            yield worker
+        finally:
+            worker.close()
+
+
+    def _policy_state(self) -> dict:
+        """
+        Returns this instance's policies, as set by its set_*() methods, and its main model.
+
+        Returns:
+            dict: Maps each name in policy_attributes to its current value.
+        """
+        return {name: getattr(self, name) for name in self.policy_attributes}
+
+
+    def _apply_policy_state(self, state: dict | None):
+        """
+        Replaces this instance's policies with those from another's _policy_state().
+
+        Args:
+            state (dict | None): The policies to use. None drops every
+                per-instance policy, so the class-level defaults apply again.
+        """
+        for name in self.policy_attributes:
+            self.__dict__.pop(name, None)
+        for name, value in (state or {}).items():
+            setattr(self, name, value)
+
+
     def update(self, **kwargs):
         """
         Sends a follow-up request to update the previously generated story.
@@ -205,14 +1024,7 @@ class StoryMaker:
         Raises:
             Exception: If generate() has not been called first.
         """
-        if len(self.__preserve_convo) == 1:
-            raise ValueError("Error: You need to run `generate()` first to get a basic story. Then run `update()` again to make updates to it.")
-
-        # Make the message
-        message = {"role":"user", "content": "Update the story you have created with the following parameters:\n"}
-        for key, value in kwargs.items():
-            message["content"] += f"{key}: {value}\n"
-        self.__preserve_convo.append(message)
+        self._add_update(**kwargs)
         
         # chat with the model.
         model_response = self.__chat()
@@ -241,6 +1053,8 @@ class StoryMaker:
         for message in self.__preserve_convo:
             result += f"{divider}\n"
             result += f"role: {message['role']}\n"
+            if "model" in message:
+                result += f"model: {message['model']}\n"
             result += f"content: {message['content']}\n"
         result += divider
         return result
@@ -267,23 +1081,162 @@ class StoryMaker:
         self.max_tokens = new_max_tokens
 
 
+    def set_metrics(self, registry):
+        """
+        Enables or disables latency and throughput metrics for model calls.
+
+        Every model call made by generate(), stream_generate() and update() is
+        then timed (connect time, time-to-first-token, chunk gaps, total time,
+        throughput and token usage) and recorded in the registry. Assign
+        StoryMaker.metrics instead to share one registry across every instance.
+
+        Args:
+            registry (MetricsRegistry | None): Where to record calls, or None
+                to turn metrics off.
+        """
+        self.metrics = registry
+
+
+    def set_rate_limiter(self, scheduler):
+        """
+        Paces this instance's model calls with a client-side rate limiter.
+
+        Share one RateLimitScheduler between instances (or assign it to
+        StoryMaker.rate_limiter) so every generation in the process draws on
+        the same per-model budgets.
+
+        Args:
+            scheduler (RateLimitScheduler | None): The scheduler, or None to disable.
+        """
+        self.rate_limiter = scheduler
+
+
+    def set_stall_watchdog(self, chunk_timeout: float | None = 20.0, deadline: float | None = 300.0):
+        """
+        Enables or disables the streaming stall watchdog.
+
+        When a stream goes chunk_timeout seconds without producing anything, it
+        is cancelled and the request is re-issued to the next fallback model
+        with the partial story and a "continue" instruction, so the caller keeps
+        receiving one seamless story. Non-streaming generate() and update()
+        calls are streamed internally so they are protected too.
+
+        Args:
+            chunk_timeout (float | None): Maximum seconds between chunks, or
+                None for no per-chunk limit.
+            deadline (float | None): Maximum seconds for the whole response,
+                including failovers, or None for no deadline. Passing None for
+                both turns the watchdog off.
+        """
+        self.stall_timeout = chunk_timeout
+        self.stream_deadline = deadline
+
+
+    def set_hedging(self, delay: float | None = 1.0, adaptive: bool = False):
+        """
+        Enables or disables hedged requests across the fallback models.
+
+        With hedging on, a request that has not produced its first token after
+        delay seconds is also sent to the next fallback model; whichever stream
+        answers first wins and the others are cancelled. The model that
+        answered is recorded in the conversation history.
+
+        Args:
+            delay (float | None): Seconds to wait before hedging, or None to
+                turn hedging off.
+            adaptive (bool): If True, use each model's observed p95
+                time-to-first-token as the delay once enough samples exist,
+                falling back to delay until then.
+        """
+        self.hedge_delay = delay
+        self.hedge_adaptive = adaptive
+
+
+    def set_history_policy(self, policy):
+        """
+        Sets how much of the conversation is re-sent with each request.
+
+        The full history is always kept and returned by get_convo_history();
+        the policy only trims what is sent, so long update() sessions stop
+        growing the prompt with every turn. See HistoryPolicy.py for the
+        available policies.
+
+        Args:
+            policy (HistoryPolicy | None): The policy to use, or None to send
+                the whole conversation.
+        """
+        self.history_policy = policy
+
+
+    def get_last_call(self):
+        """
+        Returns the measurements of this conversation's most recent model call.
+
+        Kept whether or not metrics are enabled. Token counts are the
+        provider's; streamed calls only report them with metrics enabled
+        (see set_metrics()).
+
+        Returns:
+            CallMetrics | None: The call, or None before the first call and
+                when the last response came from the response cache.
+        """
+        return self.__last_call
+
+
+    def get_turn_stats(self) -> list:
+        """
+        Returns the estimated prompt tokens of every request in this conversation.
+
+        Returns:
+            list[TurnStats]: One entry per request, in order, with the full
+                conversation size, the tokens actually sent and the tokens saved.
+        """
+        return list(self.__turn_stats)
+
+
+    def set_response_cache(self, cache):
+        """
+        Enables or disables the response cache for this instance.
+
+        Identical requests (same model, messages, temperature and max_tokens)
+        are then answered from the cache, by both generate() and
+        stream_generate(). Assign StoryMaker.response_cache instead to share one
+        cache across every instance.
+
+        Args:
+            cache (ResponseCache | None): The cache to use, or None to disable caching.
+        """
+        self.response_cache = cache
+
+
+    def get_cache_stats(self):
+        """
+        Returns the response cache hit and miss counters.
+
+        Returns:
+            dict | None: The counters from ResponseCache.get_stats(), or None
+                if caching is disabled.
+        """
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get_stats()
+
+
     def close(self):
-        """Explicitly closes the underlying HTTP client and releases its connections.
+        """Returns the HTTP client to ClientPool so other instances can reuse its connections.
         Clears preserved conversation with model to clear unused space.
 
         Does nothing if the client was never created.
         """
-        if hasattr(self, 'client'):
-            self.client.close()
-        self.__preserve_convo.clear()
+        self._release_client()
+        self._clear_history()
     
 
     def __del__(self):
-        """Safety net to close the HTTP client when the object is garbage collected.
+        """Safety net to release the HTTP client when the object is garbage collected.
         Clears preserved conversation with model to clear unused space."""
-        if hasattr(self, 'client'):
-            self.client.close()
-        self.__preserve_convo.clear()
+        self._release_client()
+        self._clear_history()
 
 
     def __enter__(self):
@@ -292,14 +1245,13 @@ class StoryMaker:
 
 
     def __exit__(self, _exc_type, _exc_val, _exc_tb):
-        """Closes the HTTP client when exiting a context manager block. 
+        """Releases the HTTP client when exiting a context manager block. 
         Clears preserved conversation with model to clear unused space.
 
         Does nothing if the client was never created.
         """
-        if hasattr(self, 'client'):
-            self.client.close()
-        self.__preserve_convo.clear()
+        self._release_client()
+        self._clear_history()
 
 
     @classmethod
@@ -0,0 +1,251 @@
+from collections import namedtuple, deque, Counter
+import json
+import threading
+import time
+import warnings
+
+# Everything measured for one StoryMaker model call. Times are in seconds.
+# connect_time is the time until the response headers arrived, ttft the time
+# until the first content chunk. prompt_tokens and completion_tokens are the
+# provider's usage figures, or None if it did not report them. model is the
+# model that actually answered; requested_model the one asked for first.
+CallMetrics = namedtuple('CallMetrics', [
+    'requested_model', 'model', 'streamed',
+    'connect_time', 'ttft', 'total_time',
+    'chunks', 'chars', 'chunks_per_sec', 'chars_per_sec',
+    'mean_chunk_gap', 'max_chunk_gap',
+    'prompt_tokens', 'completion_tokens',
+    'error',
+])
+
+
+class CallTimer:
+    """
+    Collects timings for a single model call.
+
+    StoryMaker creates one per model call (see StoryMaker.get_last_call()).
+    opened() and usage() may be called from a StreamPump thread; the other
+    methods are called by the thread consuming the stream.
+    """
+
+    def __init__(self, requested_model: str, streamed: bool):
+        self.requested_model = requested_model
+        self.streamed = streamed
+        self.__start = time.perf_counter()
+        self.__opened = None
+        self.__first_chunk = None
+        self.__last_chunk = None
+        self.__chunks = 0
+        self.__chars = 0
+        self.__gaps = []
+        self.__usage = None
+
+
+    def opened(self):
+        """Marks the arrival of the response headers. Only the first call counts."""
+        if self.__opened is None:
+            self.__opened = time.perf_counter()
+
+
+    def usage(self, usage):
+        """Records the provider's token usage object, if any."""
+        if usage is not None:
+            self.__usage = usage
+
+
+    def chunk(self, text: str):
+        """Records one content chunk as it is handed to the caller."""
+        now = time.perf_counter()
+        if self.__first_chunk is None:
+            self.__first_chunk = now
+        else:
+            self.__gaps.append(now - self.__last_chunk)
+        self.__last_chunk = now
+        self.__chunks += 1
+        self.__chars += len(text)
+
+
+    def result(self, model: str | None, error: BaseException | None = None) -> CallMetrics:
+        """
+        Finishes the call and returns its metrics.
+
+        Args:
+            model (str | None): The model that answered.
+            error (BaseException | None): The exception that ended the call, if any.
+
+        Returns:
+            CallMetrics: The measurements.
+        """
+        end = time.perf_counter()
+        total = end - self.__start
+        # Throughput is measured over the streaming phase; a response that
+        # arrived in one piece is measured over the whole call instead.
+        if self.__chunks > 1:
+            streaming_time = end - self.__first_chunk
+        else:
+            streaming_time = total
+        return CallMetrics(
+            requested_model=self.requested_model,
+            model=model,
+            streamed=self.streamed,
+            connect_time=self.__opened - self.__start if self.__opened is not None else None,
+            ttft=self.__first_chunk - self.__start if self.__first_chunk is not None else None,
+            total_time=total,
+            chunks=self.__chunks,
+            chars=self.__chars,
+            chunks_per_sec=self.__chunks / streaming_time if streaming_time > 0 else None,
+            chars_per_sec=self.__chars / streaming_time if streaming_time > 0 else None,
+            mean_chunk_gap=sum(self.__gaps) / len(self.__gaps) if self.__gaps else None,
+            max_chunk_gap=max(self.__gaps) if self.__gaps else None,
+            prompt_tokens=getattr(self.__usage, "prompt_tokens", None),
+            completion_tokens=getattr(self.__usage, "completion_tokens", None),
+            error=repr(error) if error is not None else None,
+        )
+
+
+    def gaps(self) -> list:
+        """Returns every gap between consecutive chunks, in seconds."""
+        return list(self.__gaps)
+
+
+class MetricsRegistry:
+    """
+    An in-process registry of model call metrics.
+
+    Keeps a bounded window of recent values for each measurement and summarizes
+    them as histograms (count, mean and percentiles). Callbacks registered with
+    add_callback() receive every CallMetrics as it is recorded, and an optional
+    JSONL file receives one line per call.
+
+    Thread-safe, so one registry can be shared by every StoryMaker in the
+    process (see StoryMaker.set_metrics()).
+    """
+
+    # The measurements summarized by summary(). chunk_gap holds every
+    # individual gap between chunks, not just the per-call mean.
+    histogram_names = [
+        'connect_time', 'ttft', 'total_time', 'chunk_gap',
+        'chunks_per_sec', 'chars_per_sec', 'prompt_tokens', 'completion_tokens',
+    ]
+
+    def __init__(self, window: int = 1000, jsonl_path: str | None = None):
+        """
+        Args:
+            window (int): How many recent values are kept per histogram.
+            jsonl_path (str | None): If given, every call is appended to this
+                file as one JSON object per line.
+        """
+        self.__lock = threading.Lock()
+        self.__histograms = {name: deque(maxlen=window) for name in self.histogram_names}
+        self.__models = Counter()
+        self.__errors = 0
+        self.__calls = 0
+        self.__callbacks = []
+        self.__jsonl_path = jsonl_path
+
+
+    def record(self, call: CallMetrics, gaps: list = ()):
+        """
+        Adds one call to the registry, then notifies callbacks and the JSONL sink.
+
+        Never raises on behalf of a callback or the sink: a failing one is
+        reported with a warning, so metrics cannot change a call's outcome.
+
+        Args:
+            call (CallMetrics): The call's measurements.
+            gaps (list[float]): Every gap between the call's chunks.
+        """
+        with self.__lock:
+            self.__calls += 1
+            if call.error is not None:
+                self.__errors += 1
+            if call.model is not None:
+                self.__models[call.model] += 1
+            for name in self.histogram_names:
+                if name == 'chunk_gap':
+                    self.__histograms[name].extend(gaps)
+                else:
+                    value = getattr(call, name)
+                    if value is not None:
+                        self.__histograms[name].append(value)
+            callbacks = list(self.__callbacks)
+            if self.__jsonl_path is not None:
+                try:
+                    with open(self.__jsonl_path, "a", encoding="utf-8") as file:
+                        file.write(json.dumps({"time": time.time(), **call._asdict()}) + "\n")
+                except OSError as error:
+                    warnings.warn(f"Could not write call metrics to {self.__jsonl_path}: {error!r}")
+
+        for callback in callbacks:
+            try:
+                callback(call)
+            except Exception as error:
+                warnings.warn(f"Metrics callback {callback!r} failed: {error!r}")
+
+
+    def add_callback(self, callback):
+        """
+        Registers a function called with every recorded CallMetrics.
+
+        Callbacks run on the thread that finished the call, so they should be quick.
+        An exception raised by a callback is turned into a warning.
+
+        Args:
+            callback (callable): Takes one CallMetrics argument.
+        """
+        with self.__lock:
+            self.__callbacks.append(callback)
+
+
+    def remove_callback(self, callback):
+        """Unregisters a callback added with add_callback()."""
+        with self.__lock:
+            self.__callbacks.remove(callback)
+
+
+    def summary(self) -> dict:
+        """
+        Summarizes the recorded calls.
+
+        Returns:
+            dict: "calls", "errors" and "models" (calls per answering model),
+                plus one entry per histogram name with count, mean, p50, p95,
+                p99 and max. Histograms without values are None.
+        """
+        with self.__lock:
+            result = {
+                "calls": self.__calls,
+                "errors": self.__errors,
+                "models": dict(self.__models),
+            }
+            for name, values in self.__histograms.items():
+                result[name] = self.__summarize(sorted(values))
+        return result
+
+
+    @staticmethod
+    def __summarize(values: list) -> dict | None:
+        if not values:
+            return None
+
+        def percentile(fraction):
+            return values[min(int(fraction * len(values)), len(values) - 1)]
+
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": values[-1],
+        }
+
+
+    def reset(self):
+        """Clears every histogram and counter. Callbacks stay registered."""
+        with self.__lock:
+            for values in self.__histograms.values():
+                values.clear()
+            self.__models.clear()
+            self.__errors = 0
+            self.__calls = 0
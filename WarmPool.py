@@ -0,0 +1,258 @@
+from collections import deque
+import threading
+import time
+import warnings
+
+class WarmPool:
+    """
+    Keeps pre-generated stories ready for the catalog's (prompt_id, story_id) cards.
+
+    The catalog is a fixed set of combinations, so stories for them can be
+    generated before anyone asks. A background thread keeps up to per_key
+    fresh stories for every combination. take() hands one out instantly and
+    wakes the thread to generate a replacement. Stories older than ttl
+    seconds are discarded, and take() returns None when a combination has
+    nothing fresh, so the caller can fall back to live generation.
+
+    Each story is handed out once, oldest first, and recorded in the
+    helper's story archive (if it has one) only when it is handed out, so
+    stories that expire unserved never reach the archive. Unless the
+    combinations are given explicitly, they are re-read from the helper's
+    catalog every refill round, so a reloaded catalog is followed. Refills run through
+    StoryHelper.generate_many_stories(), at most max_concurrency requests at
+    a time; when the helper has a MakerPool, they lease its conversations
+    like any other generation, so they never push the process past the
+    pool's bound. The pool lives in this process and is lost on restart.
+
+    Thread-safe; one pool is meant to be shared by every session.
+    """
+
+    def __init__(self, helper, per_key: int = 2, ttl: float | None = 3600.0, max_concurrency: int = 2,
+                 check_interval: float = 60.0, retry_delay: float = 30.0, pairs: list | None = None):
+        """
+        Args:
+            helper (StoryHelper): Resolves the catalog and generates the stories.
+            per_key (int): Stories kept ready per (prompt_id, story_id).
+            ttl (float | None): Seconds a story stays fresh. None keeps stories forever.
+            max_concurrency (int): Maximum refill requests in flight at once.
+            check_interval (float): Seconds between expiry checks when nothing is taken.
+            retry_delay (float): Seconds to wait after a refill round with failures.
+            pairs (list[tuple[int, int]] | None): The combinations to keep warm.
+                None means every (prompt_id, story_id) linked in the catalog,
+                as it is at each refill round.
+
+        Raises:
+            ValueError: If per_key or max_concurrency is less than 1.
+        """
+        if per_key < 1:
+            raise ValueError("per_key must be at least 1.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.per_key = per_key
+        self.ttl = ttl
+        self.max_concurrency = max_concurrency
+        self.check_interval = check_interval
+        self.retry_delay = retry_delay
+        self.__helper = helper
+        self.__fixed_pairs = pairs is not None
+        self.__pairs = list(pairs) if pairs is not None else self.__catalog_pairs()
+
+        self.__lock = threading.Lock()
+        self.__wake = threading.Event()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        # pair -> deque of (created, story, call), oldest first. call is the
+        # CallMetrics of the model call that wrote the story.
+        self.__stories = {pair: deque() for pair in self.__pairs}
+        # pair -> deque of the times at which a slot became empty, oldest first.
+        # A refill closes the oldest one, which gives the refill lag.
+        self.__empty_since = {pair: deque([time.monotonic()] * per_key) for pair in self.__pairs}
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__expired = 0
+        self.__refills = 0
+        self.__failures = 0
+        self.__lag_total = 0.0
+        self.__lag_max = 0.0
+
+
+    def start(self):
+        """Starts the background refill thread. Does nothing if it is already running."""
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=self.__run, name="warm-pool", daemon=True)
+        self.__thread.start()
+
+
+    def stop(self):
+        """Stops the refill thread after the current refill round. Ready stories are kept."""
+        self.__stopped.set()
+        self.__wake.set()
+
+
+    def take(self, prompt_id: int, story_id: int) -> str | None:
+        """
+        Hands out a ready story for a combination and schedules its replacement.
+
+        The story is recorded in the helper's story archive as it is handed
+        out. If archiving fails, a warning is issued and the story is still
+        returned.
+
+        Args:
+            prompt_id (int): The 1-based system prompt ID.
+            story_id (int): The 1-based story ID.
+
+        Returns:
+            str | None: A fresh story, or None if none is ready (or the
+                combination is not kept warm).
+        """
+        pair = (prompt_id, story_id)
+        with self.__lock:
+            stories = self.__stories.get(pair)
+            if stories is not None:
+                self.__drop_expired(pair)
+            if not stories:
+                self.__misses += 1
+                return None
+            _, story, call = stories.popleft()
+            self.__empty_since[pair].append(time.monotonic())
+            self.__hits += 1
+        self.__wake.set()
+        try:
+            self.__helper.archive_story(story, prompt_id, story_id, call, source="warm pool")
+        except Exception as error:
+            warnings.warn(f"Could not archive the warm story: {error!r}")
+        return story
+
+
+    def __catalog_pairs(self) -> list:
+        """Returns every (prompt_id, story_id) linked in the helper's current catalog."""
+        return [
+            (prompt["prompt_id"], story_id)
+            for prompt in self.__helper.get_catalog().prompts()
+            for story_id in prompt["story_ids"]
+        ]
+
+
+    def __refresh_pairs(self):
+        """Follows the helper's catalog, if the combinations were not given explicitly."""
+        if self.__fixed_pairs:
+            return
+        try:
+            pairs = self.__catalog_pairs()
+        except Exception as error:
+            warnings.warn(f"Keeping the warm pool's combinations; reading the catalog failed: {error!r}")
+            return
+        now = time.monotonic()
+        with self.__lock:
+            for pair in set(self.__pairs) - set(pairs):
+                del self.__stories[pair]
+                del self.__empty_since[pair]
+            for pair in pairs:
+                if pair not in self.__stories:
+                    self.__stories[pair] = deque()
+                    self.__empty_since[pair] = deque([now] * self.per_key)
+            self.__pairs = pairs
+
+
+    def __drop_expired(self, pair):
+        """Discards a combination's stale stories. Caller holds the lock."""
+        if self.ttl is None:
+            return
+        stories = self.__stories[pair]
+        now = time.monotonic()
+        while stories and now - stories[0][0] > self.ttl:
+            stories.popleft()
+            self.__empty_since[pair].append(now)
+            self.__expired += 1
+
+
+    def __missing(self) -> list:
+        """Returns one (prompt_id, story_id) entry per story that needs generating."""
+        with self.__lock:
+            missing = []
+            for pair in self.__pairs:
+                self.__drop_expired(pair)
+                missing.extend([pair] * (self.per_key - len(self.__stories[pair])))
+            return missing
+
+
+    def __store(self, pair, story: str, call):
+        """Adds a freshly generated story and records how long its slot was empty."""
+        now = time.monotonic()
+        with self.__lock:
+            stories = self.__stories[pair]
+            if len(stories) >= self.per_key:
+                return
+            stories.append((now, story, call))
+            empty_since = self.__empty_since[pair]
+            if empty_since:
+                lag = now - empty_since.popleft()
+                self.__lag_total += lag
+                self.__lag_max = max(self.__lag_max, lag)
+            self.__refills += 1
+
+
+    def __run(self):
+        """Refill loop. Runs on the pool's own thread until stop() is called."""
+        while not self.__stopped.is_set():
+            # Clear before looking, so a take() during the round triggers another one.
+            self.__wake.clear()
+            self.__refresh_pairs()
+            missing = self.__missing()
+            if not missing:
+                self.__wake.wait(self.check_interval)
+                continue
+
+            failed = False
+            try:
+                # Stories are archived when take() serves them, not here.
+                results = self.__helper.generate_many_stories(missing, self.max_concurrency, in_order=False,
+                                                              archive=False)
+                for result in results:
+                    if result.error is not None:
+                        failed = True
+                        with self.__lock:
+                            self.__failures += 1
+                    else:
+                        self.__store(missing[result.index], result.story, result.call)
+                    if self.__stopped.is_set():
+                        break
+            except Exception:
+                failed = True
+                with self.__lock:
+                    self.__failures += 1
+
+            if failed:
+                # Don't hammer a failing provider; takes do not cut this short.
+                self.__stopped.wait(self.retry_delay)
+
+
+    def get_stats(self) -> dict:
+        """
+        Returns the pool's counters.
+
+        Returns:
+            dict: hits and misses of take(), hit_rate, ready (fresh stories
+                stored), pending (stories still to generate), expired, refills
+                (stories generated), failures, and mean_refill_lag /
+                max_refill_lag: seconds from a slot emptying (taken, expired or
+                at start-up) until its replacement was ready.
+        """
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            ready = sum(len(stories) for stories in self.__stories.values())
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "hit_rate": self.__hits / lookups if lookups else 0.0,
+                "ready": ready,
+                "pending": len(self.__pairs) * self.per_key - ready,
+                "expired": self.__expired,
+                "refills": self.__refills,
+                "failures": self.__failures,
+                "mean_refill_lag": self.__lag_total / self.__refills if self.__refills else 0.0,
+                "max_refill_lag": self.__lag_max,
+            }
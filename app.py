@@ -1,6 +1,16 @@
 import streamlit as st
 from StoryHelper import StoryHelper
-from PIL import Image
+from SingleFlight import SingleFlight
+from MakerPool import MakerPool
+from GenerationJobs import JobRunner
+from WarmPool import WarmPool
+from CatalogStore import SQLiteCatalog
+from SessionStoryStore import SessionStoryStore
+from StoryArchive import StoryArchive
+from StoryHelper import StoryRecord
+from pathlib import Path
+import html
+import time
 
 # ─── Page Configuration ───────────────────────────────────────────────────────
 # Must be the first Streamlit call in the script.
@@ -11,245 +21,562 @@ st.set_page_config(
 )
 
 # ─── StoryHelper Instance ─────────────────────────────────────────────────────
-# @st.cache_resource creates ONE shared instance for the entire session.
-# The same StoryHelper (and its underlying HTTP client) is reused on every
-# Streamlit rerun rather than creating a new object each time.
+# @st.cache_resource creates ONE shared instance for every session.
+# The same StoryHelper (and its loaded catalog) is reused on every Streamlit
+# rerun rather than creating a new object each time.
+# Stories are generated in conversations leased from a MakerPool, so
+# concurrent users never share a conversation; the pooled StoryMakers share
+# their HTTP connections. The single-flight layer means that when several
+# users click "Generate Story" on the same card at once, they all share one
+# model request.
+# Stream coalescing (set_stream_coalescing()) is left off: a live card is
+# redrawn by its progress panel's half-second poll, not once per chunk, so
+# merging chunks would not save any redraws.
+# Every finished story is also recorded in a persistent StoryArchive, which
+# the Archive tab searches across sessions.
+# If the catalog has been imported into SQLite (python CatalogStore.py), story
+# types are read from there on demand instead of loading the JSON up front.
+CATALOG_DB = Path("story_inputs/catalog.sqlite3")
+
 @st.cache_resource
 def get_story_helper():
-    return StoryHelper()
+    story_helper = StoryHelper()
+    if CATALOG_DB.exists():
+        story_helper.set_catalog(SQLiteCatalog(CATALOG_DB))
+    else:
+        # Edits to the story_inputs JSON files are picked up without a restart.
+        story_helper.watch_catalog()
+    story_helper.set_maker_pool(MakerPool(max_size=8))
+    story_helper.set_single_flight(SingleFlight())
+    story_helper.set_story_archive(StoryArchive())
+    return story_helper
 
 helper = get_story_helper()
 
 
-# ─── Data Loading via StoryHelper ─────────────────────────────────────────────
-# @st.cache_data stores the return values so the JSON files are only read once
-# per session, even though Streamlit reruns the script on every interaction.
+# ─── Background Generation ────────────────────────────────────────────────────
+# Stories are generated on a shared worker pool instead of inside the script
+# run, so the page stays interactive and several cards can generate at once.
+# Each session keeps its GenerationJob objects in session state and polls them.
+@st.cache_resource
+def get_job_runner():
+    return JobRunner(max_workers=8)
 
-@st.cache_data
-def load_all_prompts():
-    """Return the full list of system prompt dicts via StoryHelper."""
-    return helper.get_all_system_prompts()
+job_runner = get_job_runner()
 
 
-@st.cache_data
-def load_all_stories():
-    """Return all 10 story type dicts via StoryHelper.
+# ─── Warm Pool ────────────────────────────────────────────────────────────────
+# The catalog's prompt/story combinations are fixed, so a background thread
+# keeps a couple of stories ready for each one. A click is served instantly
+# from the pool and only falls back to live generation when it is empty.
+@st.cache_resource
+def get_warm_pool():
+    warm_pool = WarmPool(helper, per_key=2, ttl=3600)
+    warm_pool.start()
+    return warm_pool
 
-    get_all_helpers() requires explicit 0-based indices, so we pass the full
-    range of 10 stories (indices 0–9).
-    """
-    return helper.get_all_helpers(list(range(10)))
+warm_pool = get_warm_pool()
 
 
-system_prompts = load_all_prompts()
-story_types    = load_all_stories()
+# ─── Poster Delivery ──────────────────────────────────────────────────────────
+# With static file serving on (.streamlit/config.toml), posters are published
+# as content-hashed files under static/posters and loaded by the browser,
+# which caches them. Otherwise the thumbnail bytes are sent through st.image.
+STATIC_POSTERS = st.get_option("server.enableStaticServing")
 
-# Build a quick-lookup dict so fetching a story by its id is O(1).
-# story is a StoryRecord (namedtuple), so story.id uses attribute access.
-# e.g.  story_lookup[3]  →  the StoryRecord for "The Tortured Genius"
-story_lookup = {story.id: story for story in story_types}
+
+# ─── Data Loading via StoryHelper ─────────────────────────────────────────────
+# The catalog is built once by the shared helper (it is cached with it), with
+# indexes for lookups by id, by field and by prompt. Reruns reuse it as is, so
+# nothing is re-read or rebuilt, however large the catalog grows. When the
+# JSON files change, the helper swaps in a new catalog and the next rerun
+# picks it up; this run keeps the one it started with.
+# e.g.  catalog.get(3)  →  the StoryRecord for "The Tortured Genius"
+catalog        = helper.get_catalog()
+system_prompts = catalog.prompts()
+
+
+# ─── Browsing ─────────────────────────────────────────────────────────────────
+# Story cards are shown a page at a time, and can be filtered by these fields.
+STORIES_PER_PAGE = 5
+FILTER_FIELDS    = ("setting", "theme", "conflict")
 
 
 # ─── Page Header ──────────────────────────────────────────────────────────────
 st.title("📖 StoryMaker - Run wild with your ideas!")
 st.markdown(
     "Browse the available system prompts and the story types each one supports. "
-    "Click any prompt card to expand it and see its linked stories."
+    "Switch a prompt on to see its linked stories."
 )
 st.divider()
 
 
 # ─── Session State ────────────────────────────────────────────────────────────
-# generated_stories maps StoryRecord → generated text.
-# StoryRecord is a namedtuple (immutable + hashable), so it can be used as a
-# dictionary key — this is the hashability use case.
-if "generated_stories" not in st.session_state:
-    st.session_state.generated_stories = {}
+# story_store holds this session's generated stories under two kinds of key:
+# each card's result key, and the StoryRecord listed in the Created Stories
+# tab. StoryRecord is a namedtuple (immutable + hashable), so it can be used
+# as a key — this is the hashability use case. The store keeps each text once
+# whichever keys refer to it, holds only the recent ones in memory and spills
+# older ones to compressed files, so a long session stays within its budget.
+if "story_store" not in st.session_state:
+    st.session_state.story_store = SessionStoryStore(memory_budget=256 * 1024)
 
+story_store = st.session_state.story_store
 
-# ─── Tabs ─────────────────────────────────────────────────────────────────────
-tab1, tab2 = st.tabs(["Browse", "📚 Created Stories"])
 
-with tab1:
+def collect_job(key_job, key_show, key_result, key_error, story):
+    """Move a finished background job's outcome into session state and story_store.
 
-    # ─── System Prompt Cards ──────────────────────────────────────────────────
-    # One collapsible expander per entry in story_system_prompts.json.
-    for prompt in system_prompts:
+    Returns True if the card's job has finished (and was removed).
+    """
+    job = st.session_state.get(key_job)
+    if job is None or not job.is_finished():
+        return False
+
+    del st.session_state[key_job]
+    if job.status == "done":
+        result = job.text()
+        st.session_state[key_show] = True
+        # Store the text for the card and, using StoryRecord as the key, for
+        # the Created Stories tab. This works because StoryRecord is hashable
+        # (namedtuple); the text itself is stored once.
+        story_store.put(key_result, result)
+        story_store.put(story, result)
+    elif job.status == "failed":
+        st.session_state[key_error] = f"Generation failed: {job.error}"
+    return True
+
+
+# ─── Live Generation Panel ────────────────────────────────────────────────────
+# A fragment reruns on its own every half second, so only this panel refreshes
+# while the story streams in — the rest of the page is left alone and stays
+# usable. Once the job finishes, a full rerun swaps in the stable result panel
+# and adds the story to the Created Stories tab.
+@st.fragment(run_every=0.5)
+def show_job_progress(key_job, key_show, key_result, key_error, story, card_key):
+    if collect_job(key_job, key_show, key_result, key_error, story):
+        st.rerun()
+
+    job = st.session_state.get(key_job)
+    if job is None:
+        return
+
+    st.markdown("**Generating…**" if job.status == "running" else "**Waiting for a free worker…**")
+    st.markdown(job.text() or "_Waiting for the model…_")
+
+    # Cancel stops the stream in the background and frees the card right away.
+    # A fragment rerun would only redraw this nested panel, leaving the card
+    # without its Generate button, so the whole page reruns instead.
+    if st.button("Cancel", key=f"cancel_{card_key}", use_container_width=True):
+        job.cancel()
+        del st.session_state[key_job]
+        st.rerun()
+
+
+# ─── Story Card ───────────────────────────────────────────────────────────────
+# Each card is a fragment: clicking Generate or Close reruns this card only,
+# not the rest of the page. The full page only reruns when a story lands, so
+# the Created Stories tab picks it up.
+@st.fragment
+def render_story_card(pid, system_prompt, story):
+
+    story_id = story.id
+
+    # ── Session state keys ────────────────────────────────────────────────────
+    # Each prompt + story combination gets its own pair of keys so that
+    # generating one story doesn't affect the state of any other card.
+    #
+    # key_show   → bool: whether the generated story panel is visible
+    # key_result → str:  story_store key of the generated story text
+    # key_job    → GenerationJob: the generation in progress, if any
+    # key_error  → str:  why the last generation failed, if it did
+    key_show   = f"show_{pid}_{story_id}"
+    key_result = f"result_{pid}_{story_id}"
+    key_job    = f"job_{pid}_{story_id}"
+    key_error  = f"error_{pid}_{story_id}"
+
+    # Initialise session state on first render
+    if key_show not in st.session_state:
+        st.session_state[key_show] = False
+
+    # Pick up a job that finished since the last run.
+    collect_job(key_job, key_show, key_result, key_error, story)
+
+    # border=True draws a visible card outline — requires Streamlit ≥ 1.29
+    with st.container(border=True):
+
+        img_col, info_col = st.columns([1, 2], gap="large")
+
+        # ── Left column: poster image ──────────────────────────────────────────
+        with img_col:
+            if STATIC_POSTERS:
+                # The browser loads the content-hashed thumbnail from
+                # Streamlit's static route and caches it; the server
+                # only sends a URL.
+                poster_url = helper.get_helper_poster_url(story_id, story.protagonist)
+                if poster_url is not None:
+                    st.markdown(
+                        f'<img src="{poster_url}" alt="{html.escape(story.protagonist)}" style="width:100%">',
+                        unsafe_allow_html=True
+                    )
+                else:
+                    st.markdown("*Image unavailable.*")
+            else:
+                # get_helper_thumbnail() returns cached, display-sized
+                # JPEG bytes on success, so reruns decode no images, or
+                # an error string if the file is missing / unreadable.
+                img_result = helper.get_helper_thumbnail(story_id, story.protagonist)
+
+                if isinstance(img_result, bytes):
+                    st.image(img_result, use_container_width=True)
+                else:
+                    st.markdown(f"*Image unavailable — {img_result}*")
+
+        # ── Right column: story details + generate button ───────────────────────
+        # generate_clicked is declared here so it is always defined
+        # when we reach the full-width section below the columns.
+        generate_clicked = False
+
+        with info_col:
+            st.markdown(f"### {story.protagonist}")
+            st.markdown(f"*{story.description}*")
+            st.markdown("---")
 
-        pid            = prompt["prompt_id"]
-        expander_label = f"**{prompt['label']}**  ·  Prompt #{pid}"
+            fields = [
+                ("Setting",       story.setting),
+                ("Plot",          story.plot),
+                ("Conflict",      story.conflict),
+                ("Theme",         story.theme),
+                ("Point of View", story.point_of_view),
+            ]
 
-        with st.expander(expander_label, expanded=False):
+            for field_label, field_value in fields:
+                st.markdown(f"**{field_label}:** {field_value}")
 
-            # ── Prompt metadata ───────────────────────────────────────────────
+            st.markdown("---")
 
-            st.markdown("##### Best For")
-            st.info(prompt["best_for"])
+            # Show the generate button only when no story is displayed
+            # or generating. Once a story is generated, this button is
+            # hidden and the Close button (below) takes its place.
+            if key_error in st.session_state:
+                st.error(st.session_state[key_error])
+            if not st.session_state[key_show] and key_job not in st.session_state:
+                generate_clicked = st.button(
+                    "✍️ Generate Story",
+                    key=f"gen_{pid}_{story_id}",
+                    use_container_width=True
+                )
 
-            # Read-only text area keeps the full prompt readable without blowing
-            # up the page height. disabled=True prevents editing.
-            st.markdown("##### System Prompt")
+        # ── Full-width panel below both columns ────────────────────────────────
+        # Rendered inside the container but outside the columns so it
+        # spans the full card width — giving the story text more room.
+
+        if generate_clicked:
+            st.session_state.pop(key_error, None)
+            ready = warm_pool.take(pid, story_id)
+            if ready is not None:
+                # Served from the warm pool — no model call needed.
+                st.session_state[key_show] = True
+                story_store.put(key_result, ready)
+                story_store.put(story, ready)
+                st.rerun()
+
+            # Nothing pre-generated: queue a live generation on the
+            # worker pool and return at once; show_job_progress()
+            # streams it into the card from there. Default arguments
+            # bind this card's values to the lambda.
+            st.session_state[key_job] = job_runner.submit(
+                lambda system_prompt=system_prompt, story=story: helper.generate_story(
+                    system_prompt,
+                    story.protagonist,
+                    story.description,
+                    story.setting,
+                    story.plot,
+                    story.conflict,
+                    story.theme,
+                    story.point_of_view,
+                    prompt_id=pid,
+                    story_id=story.id
+                )
+            )
+            st.rerun(scope="fragment")
+
+        elif key_job in st.session_state:
+            st.divider()
+            show_job_progress(key_job, key_show, key_result, key_error, story, f"{pid}_{story_id}")
+
+        elif st.session_state[key_show]:
+            # A story was previously generated — show it in a read-only
+            # text area. The text persists across reruns in story_store.
+            st.divider()
+            st.markdown("**Generated Story**")
             st.text_area(
-                label="system_prompt",
-                value=prompt["system_prompt"],
-                height=160,
+                label="story_output",
+                value=story_store.get(key_result, ""),
+                height=400,
                 disabled=True,
                 label_visibility="collapsed"
             )
 
-            st.markdown("---")
-
-            # ── Story sub-boxes ───────────────────────────────────────────────
-            # One bordered container per story_id linked to this system prompt.
-            story_count = len(prompt["story_ids"])
-            st.markdown(f"##### Stories  `{story_count} linked`")
-
-            for story_id in prompt["story_ids"]:
+            # Close button: clears this session's result panel. The
+            # shared helper and its pooled clients stay open for
+            # everyone else.
+            if st.button(
+                "Close",
+                key=f"close_{pid}_{story_id}",
+                use_container_width=True
+            ):
+                st.session_state[key_show] = False
+                story_store.discard(key_result)
+                st.rerun(scope="fragment")
+
+
+# ─── System Prompt Section ────────────────────────────────────────────────────
+# One section per entry in story_system_prompts.json. Unlike st.expander,
+# which builds its content even while collapsed, a closed section renders only
+# its toggle: the prompt text, the posters and the story cards are built only
+# once it is opened. The section is a fragment too, so opening or closing it
+# reruns just this section. A rerun therefore costs the same however many
+# prompts and stories the catalog holds — only the open sections do any work.
+@st.fragment
+def render_prompt_section(prompt):
+
+    pid = prompt["prompt_id"]
+
+    with st.container(border=True):
+
+        is_open = st.toggle(f"**{prompt['label']}**  ·  Prompt #{pid}", key=f"open_{pid}")
+        if not is_open:
+            return
+
+        # ── Prompt metadata ────────────────────────────────────────────────────
+
+        st.markdown("##### Best For")
+        st.info(prompt["best_for"])
+
+        # Read-only text area keeps the full prompt readable without blowing
+        # up the page height. disabled=True prevents editing.
+        st.markdown("##### System Prompt")
+        st.text_area(
+            label="system_prompt",
+            value=prompt["system_prompt"],
+            height=160,
+            disabled=True,
+            label_visibility="collapsed"
+        )
+
+        st.markdown("---")
+
+        # ── Story cards ────────────────────────────────────────────────────────
+        # One bordered card per linked story, a page at a time. Only the
+        # stories (and posters) on the current page are fetched, so turning a
+        # page costs the same whatever the catalog size. The Browse filters
+        # are read from session state, so a page turn here picks up their
+        # current values.
+        filters  = {field: st.session_state.get(f"filter_{field}") for field in FILTER_FIELDS}
+        key_page = f"page_{pid}"
+        story_page = helper.get_helper_story_page(
+            st.session_state.get(key_page, 0), STORIES_PER_PAGE, prompt_id=pid, **filters
+        )
+
+        if any(filters.values()):
+            st.markdown(f"##### Stories  `{story_page.total} of {len(prompt['story_ids'])} linked`")
+        else:
+            st.markdown(f"##### Stories  `{len(prompt['story_ids'])} linked`")
+            if story_page.page == 0:
+                for story_id in catalog.missing_story_ids(pid):
+                    st.warning(f"Story ID {story_id} not found in story_types.json.")
 
-                story = story_lookup.get(story_id)
+        if not story_page.stories:
+            st.info("No linked stories match the filters.")
+
+        for story in story_page.stories:
+            render_story_card(pid, prompt["system_prompt"], story)
+
+        # ── Pager ──────────────────────────────────────────────────────────────
+        # Turning a page reruns this section only.
+        if story_page.page_count > 1:
+            prev_col, label_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                if st.button("← Previous", key=f"prev_{pid}", disabled=story_page.page == 0,
+                             use_container_width=True):
+                    st.session_state[key_page] = story_page.page - 1
+                    st.rerun(scope="fragment")
+            with label_col:
+                st.markdown(f"Page {story_page.page + 1} of {story_page.page_count}")
+            with next_col:
+                if st.button("Next →", key=f"next_{pid}",
+                             disabled=story_page.page == story_page.page_count - 1,
+                             use_container_width=True):
+                    st.session_state[key_page] = story_page.page + 1
+                    st.rerun(scope="fragment")
+
+
+# ─── Archive Results ──────────────────────────────────────────────────────────
+# A fragment, so turning a page or opening a story reruns only the results.
+# Matches are counted up to a cap: an exact count of a very common word would
+# read its whole index entry, and the pager only needs to know there is more.
+ARCHIVE_PAGE_SIZE = 10
+ARCHIVE_COUNT_CAP = 1000
+
+# The models seen in the archive change rarely, and listing them reads an index.
+@st.cache_data(ttl=60)
+def get_archive_models():
+    return helper.story_archive.models()
+
+@st.fragment
+def render_archive_results(archive, words, prompt_id, model, order):
+
+    filters = {"words": words, "prompt_id": prompt_id, "model": model}
+    page    = st.session_state.get("archive_page", 0)
+    hits    = archive.search(
+        **filters,
+        limit=ARCHIVE_PAGE_SIZE,
+        offset=page * ARCHIVE_PAGE_SIZE,
+        order=order if words.strip() else "recent"
+    )
+    total = archive.count(**filters, limit=ARCHIVE_COUNT_CAP + 1)
+    shown = f"{ARCHIVE_COUNT_CAP}+" if total > ARCHIVE_COUNT_CAP else str(total)
+    st.markdown(f"`{shown} stories`")
+
+    if not hits:
+        st.info("No archived stories match. Generate some in **Browse**!")
+
+    for hit in hits:
+        with st.container(border=True):
+            st.markdown(f"**{hit.title or 'Untitled'}**")
+            details = [time.strftime("%Y-%m-%d %H:%M", time.localtime(hit.created)), hit.source]
+            if hit.prompt_id is not None:
+                details.append(f"Prompt #{hit.prompt_id}")
+            if hit.model is not None:
+                details.append(hit.model)
+            st.caption("  ·  ".join(details))
+            st.markdown(hit.snippet)
+
+            if st.toggle("Read story", key=f"archive_open_{hit.id}"):
+                story = archive.get(hit.id)
                 if story is None:
-                    st.warning(f"Story ID {story_id} not found in story_types.json.")
+                    st.warning("This story is no longer in the archive.")
                     continue
+                if story.total_time is not None:
+                    st.caption(
+                        f"Generated in {story.total_time:.1f}s"
+                        + (f" (first words after {story.ttft:.1f}s)" if story.ttft is not None else "")
+                        + (f"  ·  ~{story.completion_tokens} tokens" if story.completion_tokens else "")
+                    )
+                st.text_area(
+                    label="archived_story",
+                    value=story.text,
+                    height=400,
+                    disabled=True,
+                    label_visibility="collapsed"
+                )
+
+    # ── Pager ─────────────────────────────────────────────────────────────────
+    prev_col, label_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("← Previous", key="archive_prev", disabled=page == 0, use_container_width=True):
+            st.session_state["archive_page"] = page - 1
+            st.rerun(scope="fragment")
+    with label_col:
+        st.markdown(f"Page {page + 1}")
+    with next_col:
+        # Past the count cap, a full page means there may be more.
+        has_more = total > (page + 1) * ARCHIVE_PAGE_SIZE or (
+            total > ARCHIVE_COUNT_CAP and len(hits) == ARCHIVE_PAGE_SIZE
+        )
+        if st.button("Next →", key="archive_next", disabled=not has_more, use_container_width=True):
+            st.session_state["archive_page"] = page + 1
+            st.rerun(scope="fragment")
+
+
+# ─── Tabs ─────────────────────────────────────────────────────────────────────
+tab1, tab2, tab3 = st.tabs(["Browse", "📚 Created Stories", "🔎 Archive"])
+
+with tab1:
 
-                # ── Session state keys ────────────────────────────────────────
-                # Each prompt + story combination gets its own pair of keys so that
-                # generating one story doesn't affect the state of any other card.
-                #
-                # key_show   → bool: whether the generated story panel is visible
-                # key_result → str:  the generated story text, persists across reruns
-                key_show   = f"show_{pid}_{story_id}"
-                key_result = f"result_{pid}_{story_id}"
-
-                # Initialise session state on first render
-                if key_show not in st.session_state:
-                    st.session_state[key_show] = False
-                if key_result not in st.session_state:
-                    st.session_state[key_result] = ""
-
-                # border=True draws a visible card outline — requires Streamlit ≥ 1.29
-                with st.container(border=True):
-
-                    img_col, info_col = st.columns([1, 2], gap="large")
-
-                    # ── Left column: poster image ──────────────────────────────
-                    with img_col:
-                        # get_helper_image() returns a PIL Image on success or an
-                        # error string if the file is missing / unreadable.
-                        img_result = helper.get_helper_image(story_id, story.protagonist)
-
-                        if isinstance(img_result, Image.Image):
-                            st.image(img_result, use_container_width=True)
-                        else:
-                            st.markdown(f"*Image unavailable — {img_result}*")
-
-                    # ── Right column: story details + generate button ───────────
-                    # generate_clicked is declared here so it is always defined
-                    # when we reach the full-width section below the columns.
-                    generate_clicked = False
-
-                    with info_col:
-                        st.markdown(f"### {story.protagonist}")
-                        st.markdown(f"*{story.description}*")
-                        st.markdown("---")
-
-                        fields = [
-                            ("Setting",       story.setting),
-                            ("Plot",          story.plot),
-                            ("Conflict",      story.conflict),
-                            ("Theme",         story.theme),
-                            ("Point of View", story.point_of_view),
-                        ]
-
-                        for field_label, field_value in fields:
-                            st.markdown(f"**{field_label}:** {field_value}")
-
-                        st.markdown("---")
-
-                        # Show the generate button only when no story is displayed.
-                        # Once a story is generated, this button is hidden and the
-                        # Close button (below) takes its place.
-                        if not st.session_state[key_show]:
-                            generate_clicked = st.button(
-                                "✍️ Generate Story",
-                                key=f"gen_{pid}_{story_id}",
-                                use_container_width=True
-                            )
-
-                    # ── Full-width panel below both columns ────────────────────
-                    # Rendered inside the container but outside the columns so it
-                    # spans the full card width — giving the story text more room.
-
-                    if generate_clicked:
-                        # st.write_stream() consumes the generate_story() generator,
-                        # renders each chunk to the page as it arrives, and returns
-                        # the complete assembled text when the stream finishes.
-                        st.divider()
-                        result = st.write_stream(
-                            helper.generate_story(
-                                prompt["system_prompt"],
-                                story.protagonist,
-                                story.description,
-                                story.setting,
-                                story.plot,
-                                story.conflict,
-                                story.theme,
-                                story.point_of_view
-                            )
-                        )
-                        # Persist the result so it survives the next rerun, then
-                        # rerun to replace the live stream with a stable text area.
-                        st.session_state[key_result] = result
-                        st.session_state[key_show]   = True
-                        # Store in generated_stories using StoryRecord as the key.
-                        # This works because StoryRecord is hashable (namedtuple).
-                        st.session_state.generated_stories[story] = result
-                        st.rerun()
-
-                    elif st.session_state[key_show]:
-                        # A story was previously generated — show it in a read-only
-                        # text area that persists across reruns via session state.
-                        st.divider()
-                        st.markdown("**Generated Story**")
-                        st.text_area(
-                            label="story_output",
-                            value=st.session_state[key_result],
-                            height=400,
-                            disabled=True,
-                            label_visibility="collapsed"
-                        )
-
-                        # Close button: clears the result panel and closes the
-                        # StoryMaker HTTP client via StoryHelper.close_instance().
-                        if st.button(
-                            "Close",
-                            key=f"close_{pid}_{story_id}",
-                            use_container_width=True
-                        ):
-                            helper.close_instance()
-                            st.session_state[key_show]   = False
-                            st.session_state[key_result] = ""
-                            st.rerun()
+    # ─── Filters ──────────────────────────────────────────────────────────────
+    # Narrow every prompt's stories by setting, theme or conflict. The options
+    # come from the catalog's indexes and the filtering happens in the catalog,
+    # so only the matching page of stories ever reaches the page.
+    # Changing a filter sends every prompt back to its first page.
+    def reset_pages():
+        for key in [key for key in st.session_state if str(key).startswith("page_")]:
+            del st.session_state[key]
+
+    filter_cols = st.columns(len(FILTER_FIELDS))
+    for filter_col, field in zip(filter_cols, FILTER_FIELDS):
+        with filter_col:
+            st.multiselect(
+                field.replace("_", " ").title(),
+                catalog.values(field),
+                key=f"filter_{field}",
+                placeholder="Any",
+                on_change=reset_pages
+            )
+
+    for prompt in system_prompts:
+        render_prompt_section(prompt)
 
 
 with tab2:
 
     # ─── Created Stories ──────────────────────────────────────────────────────
-    # Iterates over generated_stories, which is keyed by StoryRecord instances.
-    # Because StoryRecord is a namedtuple it is hashable and can serve as a
-    # dict key — each entry maps a story archetype to its generated text.
+    # Lists the StoryRecord keys in story_store. Because StoryRecord is a
+    # namedtuple it is hashable and can serve as a key — each one maps a story
+    # archetype to its generated text. Listing reads no text: a story is only
+    # fetched (and read back from disk if it was spilled) once it is opened.
     st.markdown("### Stories generated this session")
 
-    if not st.session_state.generated_stories:
+    created = story_store.keys(StoryRecord)
+    if not created:
         st.info("No stories generated yet. Head to **Browse** and hit ✍️ **Generate Story**!")
     else:
-        for record, text in st.session_state.generated_stories.items():
-            with st.expander(f"**{record.protagonist}** — {record.setting}", expanded=False):
-                st.markdown(f"*{record.description}*")
-                st.markdown("---")
-                st.text_area(
-                    label="story_output",
-                    value=text,
-                    height=400,
-                    disabled=True,
-                    label_visibility="collapsed"
-                )
+        for record in created:
+            with st.container(border=True):
+                if st.toggle(f"**{record.protagonist}** — {record.setting}", key=f"created_{hash(record)}"):
+                    st.markdown(f"*{record.description}*")
+                    st.markdown("---")
+                    st.text_area(
+                        label="story_output",
+                        value=story_store.get(record, ""),
+                        height=400,
+                        disabled=True,
+                        label_visibility="collapsed"
+                    )
+
+
+with tab3:
+
+    # ─── Story Archive ────────────────────────────────────────────────────────
+    # Every story generated in any session (and by main.py) is in the shared
+    # archive. Searching by words uses its full-text index, so a page of
+    # results comes back quickly however many stories it holds. Only the
+    # page's snippets are fetched; a story's full text is loaded once its
+    # toggle is opened.
+    archive = helper.story_archive
+    st.markdown("### Search every story ever generated")
+
+    def reset_archive_page():
+        st.session_state.pop("archive_page", None)
+
+    prompt_labels = {prompt["prompt_id"]: prompt["label"] for prompt in system_prompts}
+    words_col, prompt_col, model_col, order_col = st.columns([3, 2, 2, 1])
+    with words_col:
+        words = st.text_input("Words", placeholder="e.g. dragon betrayal", on_change=reset_archive_page)
+    with prompt_col:
+        archive_prompt = st.selectbox(
+            "Prompt", [None, *prompt_labels],
+            format_func=lambda prompt_id: "Any" if prompt_id is None else prompt_labels[prompt_id],
+            on_change=reset_archive_page
+        )
+    with model_col:
+        archive_model = st.selectbox(
+            "Model", [None, *get_archive_models()],
+            format_func=lambda model: "Any" if model is None else model,
+            on_change=reset_archive_page
+        )
+    with order_col:
+        order = st.radio("Order", ["recent", "relevance"], disabled=not words.strip(), on_change=reset_archive_page)
+
+    render_archive_results(archive, words, archive_prompt, archive_model, order)
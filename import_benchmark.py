@@ -0,0 +1,72 @@
+"""
+Import-time benchmark for StoryMaker and StoryHelper.
+
+Each statement is timed in a fresh interpreter, several times, and the median
+is reported. The last row imports openai as well, which is what importing
+StoryMaker used to cost before configuration and the openai/httpx imports
+were deferred to the first generation.
+
+Usage:
+    python import_benchmark.py --runs 7
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+STATEMENTS = [
+    "import StoryMaker",
+    "import StoryHelper",
+    "import StoryHelper; import openai",
+]
+
+# Times the statement inside the child process, so interpreter start-up is excluded.
+TIMER = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, 'openai' in sys.modules)
+"""
+
+
+def time_import(statement: str, runs: int) -> tuple:
+    """
+    Times a statement in fresh interpreters.
+
+    Args:
+        statement (str): The import statement to run.
+        runs (int): How many interpreters to start.
+
+    Returns:
+        tuple[float, bool]: The median seconds, and whether openai ended up imported.
+    """
+    samples = []
+    loaded_openai = False
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMER.format(statement=statement)],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        samples.append(float(output[0]))
+        loaded_openai = output[1] == "True"
+    return statistics.median(samples), loaded_openai
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per statement")
+    args = parser.parse_args()
+
+    print(f"{'statement':<40}{'median ms':>12}{'openai loaded':>16}")
+    for statement in STATEMENTS:
+        seconds, loaded_openai = time_import(statement, args.runs)
+        print(f"{statement:<40}{seconds * 1000:>12.1f}{str(loaded_openai):>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from StoryMaker import StoryMaker
 from StoryHelper import StoryHelper
+from StoryArchive import StoryArchive
+from HistoryPolicy import estimate_tokens
 import argparse
 import functools
 from pathlib import Path
@@ -36,8 +38,33 @@ def get_conversation_storyMaker(func):
 def generate_storyMaker(story:StoryMaker, prompt:str=""):
     return story.generate(prompt)
 
-def update_storyMaker(story:StoryMaker, **updates):
-    return story.update(**updates)
+def archive_storyMaker(archive:StoryArchive, story:StoryMaker, prompt:str, text:str):
+    # Records the story in the searchable archive, next to the flat story file,
+    # with the timings and token usage of the model call that wrote it.
+    # Token counts fall back to estimates when the provider sent none.
+    call = story.get_last_call()
+    turns = story.get_turn_stats()
+    lines = text.strip().splitlines()
+    return archive.record(
+        text,
+        prompt=prompt or StoryMaker.get_basic_prompt(),
+        title=lines[0].strip("# *")[:80] if lines else "",
+        model=call.model if call is not None else None,
+        source="cli",
+        ttft=call.ttft if call is not None and call.streamed else None,
+        total_time=call.total_time if call is not None else None,
+        prompt_tokens=call.prompt_tokens if call is not None and call.prompt_tokens is not None
+                      else (turns[-1].sent_tokens if turns else None),
+        completion_tokens=call.completion_tokens if call is not None and call.completion_tokens is not None
+                          else estimate_tokens(text),
+    )
+
+def update_storyMaker(story:StoryMaker, archive:StoryArchive|None=None, **updates):
+    text = story.update(**updates)
+    if archive is not None:
+        # The prompt of an update is the update instruction itself.
+        archive_storyMaker(archive, story, story.get_convo_history()[-2]["content"], text)
+    return text
 
 @get_conversation_storyMaker
 def close_storyMaker(story:StoryMaker):
@@ -69,6 +96,7 @@ def ask(qn:str, err:str, err_check_type:str):
 
 def main():
     story_path, history_path = ensure_files(args.files)
+    archive = StoryArchive()
 
     # Initial prints
     print(f"Welcome to StoryMaker!")
@@ -130,6 +158,7 @@ def main():
             print("---------------------")
             print("Please wait, your prompt is being created.")
             initial_story = generate_storyMaker(story_maker, prompt)    
+            archive_storyMaker(archive, story_maker, prompt, initial_story)
             print("You story is here:")
             print(initial_story)  
             print("---------------------")
@@ -160,6 +189,8 @@ def main():
                 print("You have selected to continue. Lets go forward!")
                 print("--------------------------------------------------------------------------------")
 
+    archive.close()
+
 
 if __name__ == "__main__":
     main()
@@ -819,7 +819,7 @@ poster_funcs = [
     (poster_5, "05_The_Survivor"),
     (poster_6, "06_The_Mentor"),
     (poster_7, "07_The_Outcast"),
-    (poster_8, "08_The_Villain_Turned_Ally"),
+    (poster_8, "08_The_Villain_Turned_Reluctant_Ally"),
     (poster_9, "09_The_Trickster"),
     (poster_10, "10_The_Innocent"),
 ]
@@ -0,0 +1,112 @@
+"""
+Benchmark for merging streamed chunks (ModelStreams.coalesce_chunks).
+
+Replays a simulated model stream, a delta of one or two tokens at a time at
+a steady token rate, through coalesce_chunks() with different settings. For
+each setting it reports how many updates reach the consumer (each one a
+re-render for a consumer that redraws per chunk, such as st.write_stream()),
+the reduction against passing every delta through, and how long text waits
+in the buffer: from the moment a delta arrives to the moment the update
+carrying it is yielded.
+
+No model is called, so the numbers depend only on the settings and the
+simulated stream.
+
+Usage:
+    python stream_benchmark.py --deltas 400 --rate 80
+"""
+import argparse
+import random
+import statistics
+import time
+from ModelStreams import coalesce_chunks
+
+# (label, interval, max_chars) settings to compare. The first one merges nothing.
+SETTINGS = [
+    ("every delta", None, 1),
+    ("50 ms", 0.05, 1024),
+    ("100 ms (default)", 0.1, 1024),
+    ("150 ms", 0.15, 1024),
+    ("256 chars", None, 256),
+]
+
+
+def simulated_stream(deltas: int, rate: float, arrivals: list, seed: int = 0):
+    """
+    Yields deltas of one or two short "tokens" at a steady token rate.
+
+    Args:
+        deltas (int): How many deltas to yield.
+        rate (float): Tokens per second.
+        arrivals (list): Receives (time, length) for every delta as it is yielded.
+        seed (int): Seed for the token lengths, so every setting sees the same text.
+    """
+    rng = random.Random(seed)
+    start = time.monotonic()
+    tokens = 0
+    for _ in range(deltas):
+        count = rng.choice((1, 1, 2))
+        tokens += count
+        # Sleep until this delta is due, so the rate does not drift.
+        time.sleep(max(0.0, start + tokens / rate - time.monotonic()))
+        delta = "".join(rng.choice(("the ", "a", "story", " of", "ing", ", ")) for _ in range(count))
+        arrivals.append((time.monotonic(), len(delta)))
+        yield delta
+
+
+def run(deltas: int, rate: float, interval, max_chars) -> dict:
+    """
+    Streams the simulated deltas through coalesce_chunks() once.
+
+    Returns:
+        dict: updates, first_update (seconds to the first update), and
+            mean_wait / max_wait (seconds each character waited in the buffer).
+    """
+    arrivals = []
+    start = time.monotonic()
+    updates = 0
+    first_update = None
+    waits = []
+    consumed = 0
+    for text in coalesce_chunks(simulated_stream(deltas, rate, arrivals), interval, max_chars):
+        now = time.monotonic()
+        updates += 1
+        if first_update is None:
+            first_update = now - start
+        # Every delta that arrived so far is in this update or an earlier one.
+        end = consumed + len(text)
+        position = 0
+        for arrived, length in arrivals:
+            position += length
+            if position > consumed:
+                waits.append(now - arrived)
+            if position >= end:
+                break
+        consumed = end
+    return {
+        "updates": updates,
+        "first_update": first_update,
+        "mean_wait": statistics.mean(waits),
+        "max_wait": max(waits),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deltas", type=int, default=400, help="deltas in the simulated stream")
+    parser.add_argument("--rate", type=float, default=80.0, help="tokens per second")
+    args = parser.parse_args()
+
+    print(f"{'setting':<18}{'updates':>9}{'reduction':>11}{'first ms':>10}{'mean wait ms':>14}{'max wait ms':>13}")
+    baseline = None
+    for label, interval, max_chars in SETTINGS:
+        result = run(args.deltas, args.rate, interval, max_chars)
+        if baseline is None:
+            baseline = result["updates"]
+        print(f"{label:<18}{result['updates']:>9}{baseline / result['updates']:>10.1f}x"
+              f"{result['first_update'] * 1000:>10.1f}{result['mean_wait'] * 1000:>14.1f}"
+              f"{result['max_wait'] * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+A stand-in OpenRouter endpoint for the tests.
+
+Serves chat completions, streamed or not, from a local HTTP server, and
+records every request it receives so tests can check what was sent.
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import threading
+import time
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping connections (e.g. cancelled streams) are expected.
+        pass
+
+
+class FakeOpenRouter:
+    """
+    A local chat completions endpoint.
+
+    Point StoryMaker.url (or an instance's url) at base_url. Every answer is
+    "Once upon a time ..." followed by the model's name, so tests can see
+    which model answered.
+
+    Attributes:
+        requests (list[dict]): The JSON body of every request received.
+        first_token_delay (dict): Seconds to wait before answering, per model.
+        stall (dict): Seconds a model's stream pauses after its fifth chunk.
+        chunk_delay (float): Seconds between streamed chunks.
+        fail_next (list[int]): HTTP statuses to answer the next requests with,
+            one per request, before answering normally again. A 429 carries
+            a short Retry-After.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.first_token_delay = {}
+        self.stall = {}
+        self.chunk_delay = 0.002
+        self.fail_next = []
+        self.open_streams = 0
+        self.__lock = threading.Lock()
+        self.__server = _QuietServer(("127.0.0.1", 0), self.__handler())
+        self.base_url = f"http://127.0.0.1:{self.__server.server_address[1]}"
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+
+
+    @staticmethod
+    def story(model: str) -> str:
+        """Returns the text every request to model is answered with."""
+        return "Once upon a time " + " ".join(f"w{i}" for i in range(20)) + f" [{model}]"
+
+
+    def __handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake._FakeOpenRouter__lock:
+                    fake.requests.append(body)
+                    status = fake.fail_next.pop(0) if fake.fail_next else None
+                if status is not None:
+                    payload = json.dumps({"error": {"message": "fake failure", "code": status}}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    if status == 429:
+                        self.send_header("Retry-After", "0.1")
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                model = body["model"]
+                text = fake.story(model)
+                time.sleep(fake.first_token_delay.get(model, 0))
+                usage = {"prompt_tokens": 11, "completion_tokens": 23, "total_tokens": 34}
+                if not body.get("stream"):
+                    payload = json.dumps({
+                        "id": "fake", "object": "chat.completion", "created": 0, "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": text}}],
+                        "usage": usage,
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                with fake._FakeOpenRouter__lock:
+                    fake.open_streams += 1
+                try:
+                    words = text.split(" ")
+                    for index, word in enumerate(words):
+                        if index == 5 and model in fake.stall:
+                            time.sleep(fake.stall[model])
+                        content = word if index == len(words) - 1 else word + " "
+                        self.__event({"id": "fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                                      "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]})
+                        time.sleep(fake.chunk_delay)
+                    if body.get("stream_options", {}).get("include_usage"):
+                        self.__event({"id": "fake", "object": "chat.completion.chunk", "created": 0,
+                                      "model": model, "choices": [], "usage": usage})
+                    self.__write("data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except OSError:
+                    # The client closed the stream early.
+                    pass
+                finally:
+                    with fake._FakeOpenRouter__lock:
+                        fake.open_streams -= 1
+
+            def __event(self, data: dict):
+                self.__write(f"data: {json.dumps(data)}\n\n")
+
+            def __write(self, text: str):
+                data = text.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+    def models_requested(self) -> list:
+        """Returns the model of every request received, in order."""
+        with self.__lock:
+            return [request["model"] for request in self.requests]
+
+
+    def close(self):
+        """Stops the server."""
+        self.__server.shutdown()
+        self.__server.server_close()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import unittest
+from AsyncStoryMaker import AsyncStoryMaker
+from StoryMaker import StoryMaker
+from StoryMetrics import MetricsRegistry
+from tests.fake_openrouter import FakeOpenRouter
+
+
+class AsyncStoryMakerTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+
+
+    def tearDown(self):
+        self.server.close()
+
+
+    def maker(self) -> AsyncStoryMaker:
+        maker = AsyncStoryMaker()
+        maker.url = self.server.base_url
+        return maker
+
+
+    def test_generate_stream_and_update(self):
+        async def run():
+            async with self.maker() as maker:
+                story = await maker.generate("A short story.")
+                updated = await maker.update(tone="darker")
+                history = maker.get_convo_history()
+            async with self.maker() as maker:
+                chunks = [chunk async for chunk in maker.stream_generate("A short story.")]
+            return story, updated, history, chunks
+
+        story, updated, history, chunks = asyncio.run(run())
+
+        expected = FakeOpenRouter.story(StoryMaker.main_model)
+        self.assertEqual(story, expected)
+        self.assertEqual(updated, expected)
+        self.assertEqual([message["role"] for message in history],
+                         ["system", "user", "assistant", "user", "assistant"])
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), expected)
+
+
+    def test_concurrent_generations_share_one_loop(self):
+        async def run():
+            makers = [self.maker() for _ in range(4)]
+            stories = await asyncio.gather(*(maker.generate(f"Story {i}.") for i, maker in enumerate(makers)))
+            for maker in makers:
+                await maker.close()
+            return stories
+
+        self.assertEqual(len(set(asyncio.run(run()))), 1)
+        self.assertEqual(len(self.server.requests), 4)
+
+
+    def test_shared_sync_policies_are_not_applied(self):
+        registry = MetricsRegistry()
+        StoryMaker.metrics = registry
+        try:
+            async def run():
+                async with self.maker() as maker:
+                    return [chunk async for chunk in maker.stream_generate("A short story.")]
+            asyncio.run(run())
+        finally:
+            StoryMaker.metrics = None
+
+        self.assertNotIn("stream_options", self.server.requests[0])
+        self.assertEqual(registry.summary()["calls"], 0)
+
+
+    def test_sync_only_setters_raise(self):
+        maker = AsyncStoryMaker()
+        with self.assertRaises(NotImplementedError):
+            maker.set_metrics(MetricsRegistry())
+        maker.set_metrics(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
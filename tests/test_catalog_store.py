@@ -0,0 +1,132 @@
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from CatalogStore import SQLiteCatalog, import_json_catalog
+from StoryCatalog import StoryCatalog
+from tests.test_story_catalog import FILTERS, PROMPTS, STORIES
+
+
+class SQLiteCatalogImportTest(unittest.TestCase):
+    """An imported SQLiteCatalog answers exactly like the in-memory StoryCatalog."""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        root = Path(self.folder.name)
+        stories_path, prompts_path = root / "stories.json", root / "prompts.json"
+        stories_path.write_text(json.dumps([
+            {"id": story.id, "characters": {"protagonist": story.protagonist, "description": story.description},
+             "setting": story.setting, "plot": story.plot, "conflict": story.conflict, "theme": story.theme,
+             "point_of_view": story.point_of_view}
+            for story in STORIES
+        ]))
+        prompts_path.write_text(json.dumps(PROMPTS))
+        self.db_path = str(root / "catalog.sqlite3")
+        self.paths = (str(stories_path), str(prompts_path))
+        self.imported = import_json_catalog(self.db_path, *self.paths)
+        self.catalog = SQLiteCatalog(self.db_path)
+        self.expected = StoryCatalog(STORIES, PROMPTS)
+
+
+    def tearDown(self):
+        self.catalog.close()
+        self.folder.cleanup()
+
+
+    def test_import_round_trips_every_story(self):
+        self.assertEqual(self.imported, len(STORIES))
+        self.assertEqual(len(self.catalog), len(STORIES))
+        self.assertEqual(list(self.catalog), STORIES)
+        self.assertEqual(self.catalog.prompts(), PROMPTS)
+
+
+    def test_queries_match_story_catalog(self):
+        for filters in FILTERS:
+            with self.subTest(filters=filters):
+                self.assertEqual(self.catalog.query(**filters), self.expected.query(**filters))
+                self.assertEqual(self.catalog.count(**filters), self.expected.count(**filters))
+                self.assertEqual(self.catalog.query(limit=3, offset=2, **filters),
+                                 self.expected.query(limit=3, offset=2, **filters))
+
+
+    def test_lookups_match_story_catalog(self):
+        self.assertEqual(self.catalog[7], self.expected[7])
+        self.assertIsNone(self.catalog.get(99))
+        self.assertEqual(self.catalog.get_prompt(1), PROMPTS[0])
+        self.assertEqual(self.catalog.stories_for_prompt(1), self.expected.stories_for_prompt(1))
+        self.assertEqual(self.catalog.missing_story_ids(1), [99])
+        self.assertEqual(self.catalog.values("theme"), self.expected.values("theme"))
+        with self.assertRaises(ValueError):
+            self.catalog.query(plot="A journey.")
+
+
+    def test_duplicate_ids_are_rejected_and_the_old_database_kept(self):
+        stories_path, prompts_path = self.paths
+        stories = json.loads(Path(stories_path).read_text())
+        Path(stories_path).write_text(json.dumps(stories + stories[:1]))
+
+        with self.assertRaises(ValueError):
+            import_json_catalog(self.db_path, stories_path, prompts_path)
+        reopened = SQLiteCatalog(self.db_path)
+        self.assertEqual(len(reopened), len(STORIES))
+        reopened.close()
+
+
+class SQLiteCatalogPagingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.folder.name) / "catalog.sqlite3")
+        import_json_catalog(self.db_path)
+        self.catalog = SQLiteCatalog(self.db_path)
+        self.statements = []
+        self.catalog._SQLiteCatalog__connection.set_trace_callback(self.statements.append)
+
+
+    def tearDown(self):
+        self.catalog.close()
+        self.folder.cleanup()
+
+
+    def test_next_page_starts_after_the_previous_one(self):
+        everything = self.catalog.query()
+        pages = [self.catalog.query(limit=3, offset=offset) for offset in range(0, len(everything), 3)]
+
+        self.assertEqual([story for page in pages for story in page], everything)
+        selects = [sql for sql in self.statements if sql.startswith("SELECT position")]
+        # Every page after the first one is found through the index, without OFFSET.
+        self.assertTrue(all(sql.endswith("OFFSET 0") for sql in selects))
+        self.assertTrue(all("position >" in sql for sql in selects[2:]))
+
+
+    def test_jumping_to_a_page_falls_back_to_offset(self):
+        everything = self.catalog.query()
+
+        self.assertEqual(self.catalog.query(limit=2, offset=5), everything[5:7])
+        self.assertEqual(self.catalog.query(limit=2, offset=7), everything[7:9])
+        selects = [sql for sql in self.statements if sql.startswith("SELECT position")]
+        self.assertTrue(selects[-2].endswith("OFFSET 5"))
+        self.assertIn("position >", selects[-1])
+
+
+    def test_count_is_cached_until_the_database_changes(self):
+        theme = self.catalog.values("theme")[0]
+        total = self.catalog.count(theme=theme)
+        self.assertEqual(self.catalog.count(theme=theme), total)
+        self.assertEqual(sum(sql.startswith("SELECT COUNT") for sql in self.statements), 1)
+
+        story = self.catalog.query(limit=1, theme=theme)[0]
+        with sqlite3.connect(self.db_path) as writer:
+            writer.execute(
+                "INSERT INTO stories (id, position, protagonist, description, setting, plot, conflict, "
+                "theme, point_of_view) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (1000, 1000, *story[1:]),
+            )
+
+        self.assertEqual(self.catalog.count(theme=theme), total + 1)
+        self.assertEqual(self.catalog.query(theme=theme)[-1].id, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import unittest
+from ClientPool import ClientPool
+from StoryMaker import StoryMaker
+from tests.fake_openrouter import FakeOpenRouter
+
+
+class ClientPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+
+
+    def tearDown(self):
+        ClientPool.close_all()
+        self.server.close()
+
+
+    def borrowers(self) -> int:
+        stats = [entry for entry in ClientPool.get_stats() if entry["base_url"] == self.server.base_url]
+        return sum(entry["borrowers"] for entry in stats)
+
+
+    def maker(self, api_key: str | None = None) -> StoryMaker:
+        maker = StoryMaker(api_key=api_key)
+        maker.url = self.server.base_url
+        return maker
+
+
+    def test_makers_share_one_client_per_endpoint(self):
+        first, second = self.maker(), self.maker()
+        first.generate("A short story.")
+        second.generate("Another short story.")
+
+        self.assertIs(first.client, second.client)
+        self.assertEqual(self.borrowers(), 2)
+        client = first.client
+
+        first.close()
+        second.close()
+        self.assertEqual(self.borrowers(), 0)
+
+        # A released client stays open for the next StoryMaker.
+        third = self.maker()
+        third.generate("A third story.")
+        self.assertIs(third.client, client)
+        self.assertFalse(third.client.is_closed())
+        third.close()
+
+
+    def test_different_keys_get_different_clients(self):
+        first, second = self.maker("key-one"), self.maker("key-two")
+        first.generate("A short story.")
+        second.generate("A short story.")
+
+        self.assertIsNot(first.client, second.client)
+        first.close()
+        second.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from HistoryPolicy import HistoryPolicy
+from RateLimiter import RateLimitScheduler
+from ResponseCache import ResponseCache
+from StoryMaker import StoryMaker
+from StoryMetrics import MetricsRegistry
+from tests.fake_openrouter import FakeOpenRouter
+
+PROMPTS = ["A story about a lighthouse.", "A story about a locksmith."]
+
+
+class CountingPolicy(HistoryPolicy):
+    """Sends the whole conversation and counts how often it was asked to."""
+
+    def __init__(self):
+        self.calls = 0
+
+
+    def apply(self, messages: list, summarize=None) -> list:
+        self.calls += 1
+        return messages
+
+
+class GenerateManyPoliciesTest(unittest.TestCase):
+    """Each policy set on a StoryMaker also applies to the workers of generate_many()."""
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.maker = StoryMaker()
+        self.maker.url = self.server.base_url
+
+
+    def tearDown(self):
+        self.maker.close()
+        self.server.close()
+
+
+    def generate_all(self) -> list:
+        results = list(self.maker.generate_many(PROMPTS, max_concurrency=2))
+        self.assertEqual([result.error for result in results], [None, None])
+        return results
+
+
+    def test_settings(self):
+        self.maker.change_temperature(0.25)
+        self.maker.change_max_tokens(321)
+
+        self.generate_all()
+
+        self.assertEqual({request["temperature"] for request in self.server.requests}, {0.25})
+        self.assertEqual({request["max_tokens"] for request in self.server.requests}, {321})
+
+
+    def test_main_model(self):
+        self.maker.main_model = "test/other-model"
+
+        results = self.generate_all()
+
+        self.assertEqual(self.server.models_requested(), ["test/other-model"] * len(PROMPTS))
+        self.assertEqual([result.story for result in results], [FakeOpenRouter.story("test/other-model")] * 2)
+
+
+    def test_metrics(self):
+        registry = MetricsRegistry()
+        self.maker.set_metrics(registry)
+
+        self.generate_all()
+
+        self.assertEqual(registry.summary()["calls"], len(PROMPTS))
+
+
+    def test_response_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(directory)
+            self.maker.set_response_cache(cache)
+
+            self.generate_all()
+            self.generate_all()
+
+            self.assertEqual(len(self.server.requests), len(PROMPTS))
+            self.assertEqual(cache.get_stats()["hits"], len(PROMPTS))
+
+
+    def test_history_policy(self):
+        policy = CountingPolicy()
+        self.maker.set_history_policy(policy)
+
+        self.generate_all()
+
+        self.assertEqual(policy.calls, len(PROMPTS))
+
+
+    def test_hedging(self):
+        self.server.first_token_delay[StoryMaker.main_model] = 3.0
+        self.maker.set_hedging(delay=0.2)
+
+        results = self.generate_all()
+
+        for result in results:
+            self.assertNotIn(StoryMaker.main_model, result.story)
+
+
+    def test_stall_watchdog(self):
+        self.server.stall[StoryMaker.main_model] = 3.0
+        self.maker.set_stall_watchdog(chunk_timeout=0.5, deadline=30.0)
+
+        results = self.generate_all()
+
+        for result in results:
+            self.assertTrue(result.story.startswith("Once upon a time"))
+        self.assertEqual(len(self.server.requests), 2 * len(PROMPTS))
+
+
+    def test_rate_limiter(self):
+        scheduler = RateLimitScheduler(requests_per_minute=60)
+        self.maker.set_rate_limiter(scheduler)
+
+        self.generate_all()
+
+        self.assertIn(StoryMaker.main_model, scheduler.get_stats()["available_requests"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import os
+import time
+import unittest
+from GenerationJobs import JobRunner
+from MakerPool import MakerPool
+from SingleFlight import SingleFlight
+from StoryHelper import StoryHelper
+from StoryMaker import StoryMaker
+from tests.fake_openrouter import FakeOpenRouter
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    """Polls condition until it is true or timeout seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class CancelReleasesLeaseTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        # Slow enough that the story is still streaming when it is cancelled.
+        self.server.chunk_delay = 0.1
+        self.url = StoryMaker.url
+        StoryMaker.url = self.server.base_url
+        self.pool = MakerPool(max_size=1, timeout=1.0)
+        self.flights = SingleFlight()
+        self.helper = StoryHelper()
+        self.helper.set_maker_pool(self.pool)
+        self.helper.set_single_flight(self.flights)
+        self.runner = JobRunner(max_workers=2)
+
+
+    def tearDown(self):
+        self.runner.shutdown()
+        self.helper.close_instance()
+        self.pool.close()
+        StoryMaker.url = self.url
+        self.server.close()
+
+
+    def submit(self):
+        return self.runner.submit(lambda: self.helper.generate_story("Be brief.", "A hero"))
+
+
+    def test_cancel_releases_the_lease_and_the_flight(self):
+        job = self.submit()
+        self.assertTrue(wait_until(lambda: job.text()))
+
+        job.cancel()
+
+        self.assertTrue(wait_until(job.is_finished, timeout=1.0))
+        self.assertEqual(job.status, "cancelled")
+        self.assertTrue(wait_until(lambda: self.pool.get_stats()["leased"] == 0, timeout=1.0))
+        self.assertEqual(self.flights.get_stats()["in_flight"], 0)
+        self.assertEqual(self.flights.get_stats()["abandoned"], 1)
+        self.assertTrue(wait_until(lambda: self.server.open_streams == 0, timeout=1.0))
+
+        # The single conversation in the pool is free for the next story.
+        self.server.chunk_delay = 0
+        job = self.submit()
+        self.assertTrue(wait_until(job.is_finished))
+        self.assertEqual(job.status, "done", job.error)
+
+
+    def test_joined_stream_keeps_running_for_the_other_caller(self):
+        first = self.submit()
+        self.assertTrue(wait_until(lambda: first.text()))
+        second = self.submit()
+        self.assertTrue(wait_until(lambda: second.text()))
+
+        first.cancel()
+
+        self.assertTrue(wait_until(second.is_finished, timeout=10.0))
+        self.assertEqual(second.status, "done", second.error)
+        self.assertEqual(second.text(), FakeOpenRouter.story(StoryMaker.main_model))
+        self.assertEqual(self.flights.get_stats()["abandoned"], 0)
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class CancelInterruptsReadTest(unittest.TestCase):
+    """cancel() must not wait for the next chunk of a slow or stalled stream."""
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.url = StoryMaker.url
+        StoryMaker.url = self.server.base_url
+        self.helper = StoryHelper()
+        self.runner = JobRunner(max_workers=1)
+
+
+    def tearDown(self):
+        self.runner.shutdown()
+        self.helper.close_instance()
+        StoryMaker.url = self.url
+        self.server.close()
+
+
+    def submit(self):
+        return self.runner.submit(lambda: self.helper.generate_story("Be brief.", "A hero"))
+
+
+    def assert_cancels_promptly(self, job):
+        started = time.monotonic()
+        job.cancel()
+        self.assertTrue(wait_until(job.is_finished, timeout=1.0))
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(job.status, "cancelled")
+        self.assertIsNone(job.error)
+
+
+    def test_cancel_while_the_stream_stalls(self):
+        self.server.stall[StoryMaker.main_model] = 3.0
+        job = self.submit()
+        self.assertTrue(wait_until(lambda: len(self.server.requests) == 1 and job.text()))
+        time.sleep(0.2)
+
+        self.assert_cancels_promptly(job)
+        # The server only notices the closed connection when the stall ends.
+        self.assertTrue(wait_until(lambda: self.server.open_streams == 0, timeout=5.0))
+
+
+    def test_cancel_before_the_first_token(self):
+        self.server.first_token_delay[StoryMaker.main_model] = 3.0
+        job = self.submit()
+        self.assertTrue(wait_until(lambda: job.status == "running"))
+        time.sleep(0.2)
+
+        self.assert_cancels_promptly(job)
+        self.assertEqual(job.text(), "")
+
+
+    def test_cancel_a_stalled_shared_stream(self):
+        flights = SingleFlight()
+        self.helper.set_single_flight(flights)
+        self.server.stall[StoryMaker.main_model] = 3.0
+        job = self.submit()
+        self.assertTrue(wait_until(lambda: job.text()))
+        time.sleep(0.2)
+
+        self.assert_cancels_promptly(job)
+        self.assertTrue(wait_until(lambda: flights.get_stats()["in_flight"] == 0, timeout=1.0))
+        self.assertEqual(flights.get_stats()["abandoned"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import unittest
+from ModelStreams import LatencyTracker
+from StoryMaker import StoryMaker
+from tests.fake_openrouter import FakeOpenRouter
+
+
+class RecordingTracker(LatencyTracker):
+    """Keeps every record() call so the test can inspect what was sampled."""
+
+    def __init__(self):
+        super().__init__(min_samples=1)
+        self.records = []
+
+
+    def record(self, model, seconds, censored=False):
+        self.records.append((model, seconds, censored))
+        super().record(model, seconds, censored)
+
+
+class LatencyTrackerTest(unittest.TestCase):
+
+    def test_percentile_without_censoring(self):
+        tracker = LatencyTracker(min_samples=20)
+        for seconds in range(1, 21):
+            tracker.record("m", seconds / 10)
+
+        self.assertEqual(tracker.percentile("m", 0.95), 2.0)
+        self.assertEqual(tracker.percentile("m", 0.5), 1.1)
+
+
+    def test_censored_samples_raise_the_tail(self):
+        tracker = LatencyTracker(min_samples=10)
+        for _ in range(10):
+            tracker.record("m", 0.1)
+        before = tracker.percentile("m", 0.9)
+        for _ in range(5):
+            tracker.record("m", 0.5, censored=True)
+        tracker.record("m", 0.8)
+
+        self.assertEqual(before, 0.1)
+        self.assertEqual(tracker.percentile("m", 0.9), 0.8)
+
+
+    def test_censored_tail_returns_a_lower_bound(self):
+        tracker = LatencyTracker(min_samples=2)
+        tracker.record("m", 0.1)
+        tracker.record("m", 0.7, censored=True)
+
+        self.assertEqual(tracker.percentile("m", 0.95), 0.7)
+
+
+class HedgedLatencyTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.maker = StoryMaker()
+        self.maker.url = self.server.base_url
+        self.maker.latency_tracker = RecordingTracker()
+
+
+    def tearDown(self):
+        self.maker.close()
+        self.server.close()
+
+
+    def test_cancelled_loser_is_recorded_as_censored(self):
+        fallback = StoryMaker._StoryMaker__fallback_models[0]
+        self.server.first_token_delay[StoryMaker.main_model] = 2.0
+        self.maker.set_hedging(0.2)
+
+        story = self.maker.generate("A short story.")
+
+        self.assertEqual(story, FakeOpenRouter.story(fallback))
+        records = {model: (seconds, censored) for model, seconds, censored in self.maker.latency_tracker.records}
+        self.assertEqual(set(records), {StoryMaker.main_model, fallback})
+        self.assertFalse(records[fallback][1])
+        seconds, censored = records[StoryMaker.main_model]
+        self.assertTrue(censored)
+        self.assertGreaterEqual(seconds, 0.2)
+        self.assertLess(seconds, 2.0)
+
+
+    def test_winner_alone_is_recorded_when_it_answers_in_time(self):
+        self.maker.set_hedging(5.0)
+
+        self.maker.generate("A short story.")
+
+        self.assertEqual([(model, censored) for model, _, censored in self.maker.latency_tracker.records],
+                         [(StoryMaker.main_model, False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import threading
+import unittest
+from HistoryPolicy import LastTurns, LatestStory, SummarizeOverBudget
+from StoryMaker import StoryMaker
+from tests.fake_openrouter import FakeOpenRouter
+
+
+class HistoryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.maker = StoryMaker()
+        self.maker.url = self.server.base_url
+
+
+    def tearDown(self):
+        self.maker.close()
+        self.server.close()
+
+
+    def run_session(self):
+        self.maker.generate("A short story.")
+        self.maker.update(tone="darker")
+        self.maker.update(ending="happy")
+
+
+    def test_last_turns_trims_what_is_sent(self):
+        self.maker.set_history_policy(LastTurns(turns=1))
+
+        self.run_session()
+
+        sent = self.server.requests[-1]["messages"]
+        self.assertEqual([message["role"] for message in sent], ["system", "user", "assistant", "user"])
+        self.assertIn("tone: darker", sent[1]["content"])
+        self.assertIn("ending: happy", sent[-1]["content"])
+        # The full conversation is still kept.
+        self.assertEqual(len(self.maker.get_convo_history()), 7)
+        stats = self.maker.get_turn_stats()
+        self.assertEqual(stats[0].saved_tokens, 0)
+        self.assertGreater(stats[-1].saved_tokens, 0)
+        self.assertEqual(stats[-1].full_tokens, stats[-1].sent_tokens + stats[-1].saved_tokens)
+
+
+    def test_latest_story_sends_only_the_current_draft(self):
+        self.maker.set_history_policy(LatestStory())
+
+        self.run_session()
+
+        sent = self.server.requests[-1]["messages"]
+        self.assertEqual([message["role"] for message in sent], ["system", "assistant", "user"])
+        self.assertEqual(sent[1]["content"], self.maker.get_convo_history()[-3]["content"])
+
+
+    def test_summarize_over_budget_replaces_older_turns(self):
+        self.maker.set_history_policy(SummarizeOverBudget(max_tokens=50, keep_turns=1))
+
+        self.run_session()
+
+        # The model writes the summary, so the last update needs two requests.
+        summary_request, last_request = self.server.requests[-2:]
+        self.assertIn("Summarize", summary_request["messages"][0]["content"])
+        sent = last_request["messages"]
+        self.assertEqual([message["role"] for message in sent], ["system", "system", "user", "assistant", "user"])
+        self.assertTrue(sent[1]["content"].startswith("Summary of the earlier conversation:"))
+
+
+    def test_summarize_over_budget_falls_back_to_extracts(self):
+        policy = SummarizeOverBudget(max_tokens=10, keep_turns=0)
+        messages = [
+            {"role": "system", "content": "You write stories."},
+            {"role": "user", "content": "A story about a lighthouse keeper."},
+            {"role": "assistant", "content": "Once upon a time " * 20},
+            {"role": "user", "content": "Make it shorter."},
+        ]
+
+        sent = policy.apply(messages)
+
+        self.assertEqual(len(sent), 3)
+        self.assertIn("user: A story about a lighthouse keeper.", sent[1]["content"])
+        self.assertEqual(sent[-1], messages[-1])
+
+
+    def test_summarize_over_budget_is_shared_between_threads(self):
+        policy = SummarizeOverBudget(max_tokens=10, keep_turns=0, max_cached=4)
+        errors = []
+
+        def apply_many(thread: int):
+            try:
+                for turn in range(200):
+                    messages = [
+                        {"role": "system", "content": "You write stories."},
+                        {"role": "user", "content": f"Story {thread}-{turn}. " * 10},
+                        {"role": "user", "content": "Make it shorter."},
+                    ]
+                    sent = policy.apply(messages)
+                    self.assertIn(f"Story {thread}-{turn}.", sent[1]["content"])
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=apply_many, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
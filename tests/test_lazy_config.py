@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+import StoryMaker as story_maker_module
+from StoryMaker import StoryMaker, resolve_api_key, API_KEY_NAME
+
+
+class ResolveApiKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dotenv_config = story_maker_module._dotenv_config
+        story_maker_module._dotenv_config = {API_KEY_NAME: "from-dotenv"}
+
+
+    def tearDown(self):
+        story_maker_module._dotenv_config = self.dotenv_config
+
+
+    def test_lookup_order(self):
+        with mock.patch.dict(os.environ, {API_KEY_NAME: "from-environment"}):
+            self.assertEqual(resolve_api_key("explicit"), "explicit")
+            self.assertEqual(resolve_api_key(), "from-environment")
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(resolve_api_key(), "from-dotenv")
+
+
+    def test_missing_key_fails_on_first_use_not_construction(self):
+        story_maker_module._dotenv_config = {}
+        with mock.patch.dict(os.environ, {}, clear=True):
+            maker = StoryMaker()
+            with self.assertRaises(ValueError):
+                maker.generate("A short story.")
+            maker.close()
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def test_importing_does_not_load_heavy_packages(self):
+        code = ("import sys, StoryHelper, StoryMaker; StoryHelper.StoryHelper(); "
+                "print(sorted(name for name in ('openai', 'httpx', 'dotenv', 'PIL') if name in sys.modules))")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
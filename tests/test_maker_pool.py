@@ -0,0 +1,29 @@
+import unittest
+from MakerPool import MakerPool
+from StoryMaker import StoryMaker
+from StoryMetrics import MetricsRegistry
+
+
+class MakerPoolTest(unittest.TestCase):
+
+    def test_lease_applies_and_then_clears_policies(self):
+        pool = MakerPool(max_size=1)
+        owner = StoryMaker()
+        owner.set_metrics(MetricsRegistry())
+        owner.set_hedging(delay=0.5)
+        owner.main_model = "test/other-model"
+
+        with pool.lease("", owner._policy_state()) as maker:
+            self.assertIs(maker.metrics, owner.metrics)
+            self.assertEqual(maker.hedge_delay, 0.5)
+            self.assertEqual(maker.main_model, "test/other-model")
+
+        with pool.lease("") as maker:
+            self.assertIsNone(maker.metrics)
+            self.assertIsNone(maker.hedge_delay)
+            self.assertEqual(maker.main_model, StoryMaker.main_model)
+        pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
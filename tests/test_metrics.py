@@ -0,0 +1,57 @@
+import os
+import unittest
+import warnings
+from StoryMaker import StoryMaker
+from StoryMetrics import MetricsRegistry
+from tests.fake_openrouter import FakeOpenRouter
+
+
+def failing_callback(call):
+    raise RuntimeError("dashboard is down")
+
+
+class MetricsCallbackTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.maker = StoryMaker()
+        self.maker.url = self.server.base_url
+        self.registry = MetricsRegistry()
+        self.maker.set_metrics(self.registry)
+
+
+    def tearDown(self):
+        self.maker.close()
+        self.server.close()
+
+
+    def test_raising_callback_does_not_fail_the_call(self):
+        calls = []
+        self.registry.add_callback(failing_callback)
+        self.registry.add_callback(calls.append)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            story = self.maker.generate("A short story.")
+
+        self.assertEqual(story, FakeOpenRouter.story(StoryMaker.main_model))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.registry.summary()["calls"], 1)
+        self.assertTrue(any("dashboard is down" in str(warning.message) for warning in caught))
+
+
+    def test_raising_callback_does_not_fail_a_stream(self):
+        self.registry.add_callback(failing_callback)
+        self.maker.stream_result = True
+
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter("always")
+            story = "".join(self.maker.stream_generate("A short story."))
+
+        self.assertEqual(story, FakeOpenRouter.story(StoryMaker.main_model))
+        self.assertIsNotNone(self.maker.get_last_call())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+from PIL import Image
+from PosterCache import PosterCache
+
+
+class PublishTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        root = Path(self.folder.name)
+        self.poster = root / "01_Hero.png"
+        Image.new("RGB", (800, 1200), "navy").save(self.poster)
+        self.cache = PosterCache(directory=str(root / "cache"), static_directory=str(root / "static"))
+
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+
+    def test_url_is_versioned_by_content(self):
+        url = self.cache.publish(self.poster)
+
+        path, version = url.split("?v=")
+        self.assertEqual(path, f"app/static/posters/01_Hero.{version}.jpg")
+        published = Path(self.folder.name) / "static" / f"01_Hero.{version}.jpg"
+        self.assertEqual(hashlib.sha256(published.read_bytes()).hexdigest()[:12], version)
+        self.assertEqual(self.cache.publish(self.poster), url)
+
+
+    def test_replacing_a_poster_keeps_similarly_named_ones(self):
+        root = Path(self.folder.name)
+        other = root / "01_Hero_Two.png"
+        Image.new("RGB", (800, 1200), "olive").save(other)
+        other_url = self.cache.publish(other)
+        old_url = self.cache.publish(self.poster)
+
+        Image.new("RGB", (800, 1200), "maroon").save(self.poster)
+        new_url = self.cache.publish(self.poster)
+
+        self.assertNotEqual(new_url, old_url)
+        static = sorted(path.name for path in (root / "static").iterdir())
+        self.assertEqual(static, sorted([other_url.split("?")[0].rsplit("/", 1)[1],
+                                         new_url.split("?")[0].rsplit("/", 1)[1]]))
+        thumbnails = [path.name for path in (root / "cache").iterdir()]
+        self.assertEqual(len(thumbnails), 2)
+        self.assertEqual(len([name for name in thumbnails if name.startswith("01_Hero_Two_")]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+from PIL import Image
+from PosterCache import PosterCache
+from StoryHelper import StoryHelper
+
+
+class PosterIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.posters = Path(self.folder.name) / "posters"
+        self.posters.mkdir()
+        for name in ("01_The_Reluctant_Hero.jpg", "08_The_Villain_Turned_Ally.png", "01_Spare.jpg"):
+            Image.new("RGB", (60, 90), "navy").save(self.posters / name)
+        (self.posters / "02_Notes.txt").write_text("not a poster")
+        (self.posters / "cover.jpg").write_bytes(b"")
+        self.helper = StoryHelper()
+        self.helper._StoryHelper__image_path = self.posters
+
+
+    def tearDown(self):
+        self.helper.close_instance()
+        self.folder.cleanup()
+
+
+    def test_name_match_wins_over_id_only(self):
+        path, mtime_ns = self.helper.find_poster(1, "The Reluctant-Hero")
+
+        self.assertEqual(path.name, "01_The_Reluctant_Hero.jpg")
+        self.assertEqual(mtime_ns, path.stat().st_mtime_ns)
+
+
+    def test_id_alone_finds_a_renamed_poster(self):
+        path, _ = self.helper.find_poster(8, "The Redeemed Villain")
+
+        self.assertEqual(path.name, "08_The_Villain_Turned_Ally.png")
+
+
+    def test_files_that_are_not_posters_are_ignored(self):
+        self.assertIsNone(self.helper.find_poster(2, "Notes"))
+        self.assertIsNone(self.helper.find_poster(5, "Anyone"))
+        self.assertEqual(self.helper.get_helper_image(5, "Anyone"), "File not found.")
+
+
+    def test_lookups_do_not_touch_the_disk_until_refreshed(self):
+        self.assertIsNone(self.helper.find_poster(4, "The Mentor"))
+        Image.new("RGB", (60, 90), "olive").save(self.posters / "04_The_Mentor.jpg")
+        self.assertIsNone(self.helper.find_poster(4, "The Mentor"))
+
+        self.helper.refresh_poster_index()
+
+        self.assertEqual(self.helper.find_poster(4, "The Mentor")[0].name, "04_The_Mentor.jpg")
+
+
+    def test_thumbnail_comes_from_the_indexed_file(self):
+        self.helper.set_poster_cache(PosterCache(directory=str(Path(self.folder.name) / "cache"),
+                                                 static_directory=str(Path(self.folder.name) / "static")))
+
+        thumbnail = self.helper.get_helper_thumbnail(8, "The Villain Turned Ally")
+
+        self.assertTrue(thumbnail.startswith(b"\xff\xd8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import unittest
+from RateLimiter import RateLimitScheduler
+from StoryMaker import StoryMaker
+from tests.fake_openrouter import FakeOpenRouter
+
+
+class RecordingScheduler(RateLimitScheduler):
+    """A scheduler that remembers the tokens of every acquire()."""
+
+    def __init__(self, **kwargs):
+        super().__init__(base_backoff=0.05, **kwargs)
+        self.acquired = []
+
+
+    def acquire(self, model: str, tokens: int = 0) -> float:
+        self.acquired.append(tokens)
+        return super().acquire(model, tokens)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.maker = StoryMaker()
+        self.maker.url = self.server.base_url
+        self.scheduler = RecordingScheduler(requests_per_minute=600, tokens_per_minute=100000)
+        self.maker.set_rate_limiter(self.scheduler)
+
+
+    def tearDown(self):
+        self.maker.close()
+        self.server.close()
+
+
+    def test_429_is_retried_and_tokens_are_charged_once(self):
+        self.server.fail_next = [429, 429]
+
+        story = self.maker.generate("A short story.")
+
+        self.assertEqual(story, FakeOpenRouter.story(StoryMaker.main_model))
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.scheduler.get_stats()["rate_limited"], 2)
+        self.assertGreater(self.scheduler.acquired[0], 0)
+        self.assertEqual(self.scheduler.acquired[1:], [0, 0])
+
+
+    def test_server_errors_are_still_retried(self):
+        self.server.fail_next = [500]
+
+        story = self.maker.generate("A short story.")
+
+        self.assertEqual(story, FakeOpenRouter.story(StoryMaker.main_model))
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.scheduler.get_stats()["rate_limited"], 0)
+
+
+    def test_server_errors_give_up_after_the_sdk_retry_count(self):
+        self.server.fail_next = [503] * 10
+
+        with self.assertRaises(Exception) as raised:
+            self.maker.generate("A short story.")
+
+        self.assertEqual(getattr(raised.exception, "status_code", None), 503)
+        # The first attempt plus the client's max_retries.
+        self.assertEqual(len(self.server.requests), 1 + self.maker.client.max_retries)
+
+
+    def test_client_errors_are_not_retried(self):
+        self.server.fail_next = [400]
+
+        with self.assertRaises(Exception):
+            self.maker.generate("A short story.")
+
+        self.assertEqual(len(self.server.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from ResponseCache import ResponseCache
+from StoryMaker import StoryMaker
+from tests.fake_openrouter import FakeOpenRouter
+
+
+class ResponseCacheKeyTest(unittest.TestCase):
+
+    def test_key_ignores_streaming_only(self):
+        request = {"base_url": "http://x", "model": "m", "messages": [{"role": "user", "content": "hi"}],
+                   "temperature": 1, "max_tokens": 10}
+
+        self.assertEqual(ResponseCache.make_key(request),
+                         ResponseCache.make_key({**request, "stream": True,
+                                                 "stream_options": {"include_usage": True}}))
+        self.assertNotEqual(ResponseCache.make_key(request), ResponseCache.make_key({**request, "temperature": 0.5}))
+        self.assertNotEqual(ResponseCache.make_key(request), ResponseCache.make_key({**request, "model": "n"}))
+
+
+    def test_least_recently_used_entry_is_evicted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(directory, max_entries=2)
+            cache.put("a", "first")
+            cache.put("b", "second")
+            cache.get("a")
+            cache.put("c", "third")
+
+            self.assertEqual(cache.get("a"), "first")
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual(ResponseCache(directory).get("c"), "third")
+
+
+class ResponseCacheReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.directory.name)
+
+
+    def tearDown(self):
+        self.server.close()
+        self.directory.cleanup()
+
+
+    def maker(self) -> StoryMaker:
+        maker = StoryMaker()
+        maker.url = self.server.base_url
+        maker.set_response_cache(self.cache)
+        return maker
+
+
+    def test_generate_is_replayed_by_stream_generate(self):
+        first = self.maker()
+        story = first.generate("A short story.")
+        first.close()
+
+        second = self.maker()
+        replayed = "".join(second.stream_generate("A short story."))
+
+        self.assertEqual(replayed, story)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(second.get_convo_history()[-1]["content"], story)
+        self.assertEqual(self.cache.get_stats()["hits"], 1)
+        second.close()
+
+
+    def test_changed_settings_miss_the_cache(self):
+        first = self.maker()
+        first.generate("A short story.")
+        first.close()
+
+        second = self.maker()
+        second.change_temperature(0.3)
+        second.generate("A short story.")
+        second.close()
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.cache.get_stats()["entries"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
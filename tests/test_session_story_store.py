@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from SessionStoryStore import SessionStoryStore
+from StoryHelper import StoryRecord
+from StoryMaker import StoryMaker
+from tests.fake_openrouter import FakeOpenRouter
+
+
+def text(number: int) -> str:
+    return f"Story {number}. " + "The tide came in. " * 60
+
+
+class SessionStoryStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.size = len(text(0).encode("utf-8"))
+        self.store = SessionStoryStore(memory_budget=2 * self.size, spill_directory=self.folder.name)
+
+
+    def tearDown(self):
+        self.store.close()
+        self.folder.cleanup()
+
+
+    def spilled_files(self) -> list:
+        return [path for path in Path(self.folder.name).rglob("*") if path.is_file()]
+
+
+    def test_stories_over_budget_spill_and_page_back_in(self):
+        for number in range(5):
+            self.store.put(("card", number), text(number))
+
+        stats = self.store.get_stats()
+        self.assertEqual(stats["memory_texts"], 2)
+        self.assertEqual(stats["disk_texts"], 3)
+        self.assertLess(stats["disk_bytes"], 3 * self.size)
+
+        self.assertEqual(self.store.get(("card", 0)), text(0))
+        stats = self.store.get_stats()
+        self.assertEqual(stats["page_ins"], 1)
+        self.assertLessEqual(stats["memory_bytes"], 2 * self.size)
+        self.assertEqual([self.store.get(("card", number)) for number in range(5)], [text(n) for n in range(5)])
+
+
+    def test_shared_text_is_stored_once_and_dropped_with_its_last_key(self):
+        record = StoryRecord(1, "Hero", "", "", "", "", "", "")
+        self.store.put(("card", 1), text(1))
+        self.store.put(record, text(1))
+        for number in range(2, 5):
+            self.store.put(("card", number), text(number))
+
+        self.assertEqual(self.store.get_stats()["texts"], 4)
+        self.assertEqual(self.store.keys(StoryRecord), [record])
+
+        self.store.discard(("card", 1))
+        self.assertEqual(self.store.get(record), text(1))
+        self.store.discard(record)
+        self.assertEqual(self.store.get_stats()["texts"], 3)
+        self.assertIsNone(self.store.get(record))
+        self.assertEqual(len(self.spilled_files()), self.store.get_stats()["disk_texts"])
+
+
+    def test_close_deletes_the_spill_folder(self):
+        for number in range(4):
+            self.store.put(number, text(number))
+        self.assertTrue(self.spilled_files())
+
+        self.store.close()
+
+        self.assertEqual(list(Path(self.folder.name).iterdir()), [])
+        self.assertEqual(len(self.store), 0)
+
+
+class SessionStoryStoreGeneratedTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.folder = tempfile.TemporaryDirectory()
+
+
+    def tearDown(self):
+        self.server.close()
+        self.folder.cleanup()
+
+
+    def test_generated_stories_survive_a_zero_budget(self):
+        store = SessionStoryStore(memory_budget=0, spill_directory=self.folder.name)
+        stories = {}
+        for model in ("test/one", "test/two", "test/three"):
+            with StoryMaker() as maker:
+                maker.url = self.server.base_url
+                maker.main_model = model
+                stories[model] = maker.generate("A short story.")
+                store.put(model, stories[model])
+
+        self.assertEqual(store.get_stats()["memory_texts"], 1)
+        self.assertEqual({model: store.get(model) for model in stories}, stories)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
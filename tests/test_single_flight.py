@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+import unittest
+from SingleFlight import SingleFlight
+from StoryHelper import StoryHelper
+from StoryMaker import StoryMaker
+from tests.fake_openrouter import FakeOpenRouter
+
+DETAILS = ("Mara", "A lighthouse keeper", "A rocky coast", "A storm hits", "Nature", "Duty", "First person")
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    """Polls condition until it is true or timeout seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.url = StoryMaker.url
+        StoryMaker.url = self.server.base_url
+        self.single_flight = SingleFlight()
+        self.helpers = [StoryHelper(), StoryHelper()]
+        for helper in self.helpers:
+            helper.set_single_flight(self.single_flight)
+
+
+    def tearDown(self):
+        for helper in self.helpers:
+            helper.close_instance()
+        StoryMaker.url = self.url
+        self.server.close()
+
+
+    def test_concurrent_identical_stories_share_one_request(self):
+        self.server.first_token_delay[StoryMaker.main_model] = 0.5
+        stories = [None, None]
+
+        def read(index):
+            stories[index] = "".join(self.helpers[index].generate_story("You write stories.", *DETAILS))
+
+        threads = [threading.Thread(target=read, args=(index,)) for index in range(2)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.1)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(stories, [FakeOpenRouter.story(StoryMaker.main_model)] * 2)
+        self.assertEqual(self.single_flight.get_stats()["joined"], 1)
+        # Each caller's conversation looks as if it had generated the story itself.
+        self.assertEqual(self.helpers[1].get_convo_history()[-1]["content"], stories[1])
+
+
+    def test_story_is_requested_again_once_the_first_has_finished(self):
+        for helper in self.helpers:
+            "".join(helper.generate_story("You write stories.", *DETAILS))
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.single_flight.get_stats()["in_flight"], 0)
+
+
+    def test_upstream_is_closed_when_every_caller_leaves(self):
+        self.server.chunk_delay = 0.1
+        stream = self.helpers[0].generate_story("You write stories.", *DETAILS)
+        next(stream)
+        stream.close()
+
+        self.assertTrue(wait_until(lambda: self.server.open_streams == 0))
+        self.assertEqual(self.single_flight.get_stats()["abandoned"], 1)
+        self.assertEqual(self.single_flight.get_stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import unittest
+from StoryMaker import StoryMaker
+from StoryMetrics import MetricsRegistry
+from tests.fake_openrouter import FakeOpenRouter
+
+
+class StallWatchdogTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.maker = StoryMaker()
+        self.maker.url = self.server.base_url
+
+
+    def tearDown(self):
+        self.maker.close()
+        self.server.close()
+
+
+    def test_generate_is_answered_by_the_main_model(self):
+        self.maker.set_stall_watchdog(chunk_timeout=5.0, deadline=30.0)
+
+        story = self.maker.generate("A short story.")
+
+        self.assertEqual(story, FakeOpenRouter.story(StoryMaker.main_model))
+        self.assertEqual(self.server.models_requested(), [StoryMaker.main_model])
+        self.assertTrue(self.server.requests[0]["stream"])
+
+
+    def test_generate_records_usage_with_metrics(self):
+        registry = MetricsRegistry()
+        calls = []
+        registry.add_callback(calls.append)
+        self.maker.set_metrics(registry)
+        self.maker.set_stall_watchdog(chunk_timeout=5.0, deadline=30.0)
+
+        self.maker.generate("A short story.")
+
+        self.assertEqual(self.server.requests[0]["stream_options"], {"include_usage": True})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0].model, StoryMaker.main_model)
+        self.assertEqual(calls[0].prompt_tokens, 11)
+
+
+    def test_stalled_stream_fails_over(self):
+        self.server.stall[StoryMaker.main_model] = 2.0
+        self.maker.set_stall_watchdog(chunk_timeout=0.5, deadline=30.0)
+
+        story = self.maker.generate("A short story.")
+
+        self.assertEqual(len(self.server.models_requested()), 2)
+        self.assertTrue(story.startswith("Once upon a time"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from StoryArchive import StoryArchive
+from StoryHelper import StoryHelper
+from StoryMaker import StoryMaker
+from WarmPool import WarmPool
+from tests.fake_openrouter import FakeOpenRouter
+
+
+class HelperArchiveTest(unittest.TestCase):
+    """Every path that generates a catalog story archives it with its model, timings and tokens."""
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.url = StoryMaker.url
+        StoryMaker.url = self.server.base_url
+        self.folder = tempfile.TemporaryDirectory()
+        self.archive = StoryArchive(str(Path(self.folder.name) / "archive.sqlite3"))
+        self.helper = StoryHelper()
+        self.helper.set_story_archive(self.archive)
+
+
+    def tearDown(self):
+        self.helper.close_instance()
+        self.archive.close()
+        self.folder.cleanup()
+        StoryMaker.url = self.url
+        self.server.close()
+
+
+    def archived(self) -> list:
+        return [self.archive.get(hit.id) for hit in self.archive.search()]
+
+
+    def assert_complete(self, story, source: str):
+        self.assertEqual(story.source, source)
+        self.assertEqual(story.model, StoryMaker.main_model)
+        self.assertEqual(story.text, FakeOpenRouter.story(StoryMaker.main_model))
+        self.assertIsNotNone(story.total_time)
+        self.assertIsNotNone(story.prompt_tokens)
+        self.assertIsNotNone(story.completion_tokens)
+
+
+    def test_generate_story(self):
+        "".join(self.helper.generate_story("Be brief.", "A hero", prompt_id=1, story_id=1))
+
+        [story] = self.archived()
+        self.assert_complete(story, "app")
+        self.assertIsNotNone(story.ttft)
+
+
+    def test_generate_many_stories(self):
+        results = list(self.helper.generate_many_stories([(1, 1), (2, 3)]))
+
+        self.assertEqual([result.error for result in results], [None, None])
+        stories = self.archived()
+        self.assertEqual(sorted((story.prompt_id, story.story_id) for story in stories), [(1, 1), (2, 3)])
+        for story in stories:
+            self.assert_complete(story, "batch")
+            # The provider's usage figures, not estimates.
+            self.assertEqual((story.prompt_tokens, story.completion_tokens), (11, 23))
+
+
+    def test_warm_pool_archives_stories_when_served(self):
+        warm_pool = WarmPool(self.helper, per_key=2, pairs=[(1, 1)])
+        warm_pool.start()
+        deadline = time.monotonic() + 5
+        while warm_pool.get_stats()["ready"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        warm_pool.stop()
+        self.assertEqual(self.archived(), [])
+
+        warm_pool.take(1, 1)
+
+        [story] = self.archived()
+        self.assert_complete(story, "warm pool")
+        self.assertEqual((story.prompt_id, story.story_id), (1, 1))
+
+
+
+class ArchiveSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.archive = StoryArchive(str(Path(self.folder.name) / "archive.sqlite3"))
+        self.ids = [
+            self.archive.record("A dragon guards the mountain pass.", title="The Pass", prompt_id=1, model="m1"),
+            self.archive.record("Two dragons fought over the sea; one dragon fell.", title="Sea", prompt_id=2, model="m2"),
+            self.archive.record("The knight's 'well-earned' rest by the sea.", title="Rest", prompt_id=1, model="m1"),
+        ]
+
+
+    def tearDown(self):
+        self.archive.close()
+        self.folder.cleanup()
+
+
+    def found(self, *args, **kwargs) -> list:
+        return [hit.id for hit in self.archive.search(*args, **kwargs)]
+
+
+    def test_words_match_title_and_text_ignoring_endings(self):
+        first, second, third = self.ids
+
+        self.assertEqual(self.found("dragon"), [second, first])
+        self.assertEqual(self.found("Dragons sea"), [second])
+        self.assertEqual(self.found("pass"), [first])
+        self.assertEqual(self.found("unicorn"), [])
+        self.assertIn("**", self.archive.search("mountain")[0].snippet)
+
+
+    def test_syntax_characters_are_searched_literally(self):
+        self.assertEqual(self.found("'well-earned'"), [self.ids[2]])
+        self.assertEqual(self.found('knight"s AND OR'), [])
+
+
+    def test_filters_combine_with_words(self):
+        first, second, third = self.ids
+
+        self.assertEqual(self.found(prompt_id=1), [third, first])
+        self.assertEqual(self.found("sea", model="m1"), [third])
+        self.assertEqual(self.found("dragon", order="relevance")[0], second)
+        self.assertEqual(self.archive.count("sea"), 2)
+        self.assertEqual(self.archive.count(limit=2), 2)
+        self.assertEqual(self.archive.models(), ["m1", "m2"])
+
+
+    def test_deleted_stories_leave_the_index(self):
+        self.assertTrue(self.archive.delete(self.ids[1]))
+
+        self.assertEqual(self.found("dragon"), [self.ids[0]])
+        self.assertIsNone(self.archive.get(self.ids[1]))
+        self.assertFalse(self.archive.delete(self.ids[1]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+import json
+import shutil
+import tempfile
+import time
+import unittest
+import warnings
+from pathlib import Path
+from StoryCatalog import StoryCatalog, CatalogChanges
+from StoryHelper import StoryHelper, StoryRecord
+
+SETTINGS = ["Fantasy", "Space", "Noir"]
+THEMES = ["Redemption", "Sacrifice", "Hope", "Loss"]
+
+
+def make_story(story_id: int, **changes) -> StoryRecord:
+    story = StoryRecord(
+        id=story_id,
+        protagonist=f"Hero {story_id}",
+        description="A hero.",
+        setting=SETTINGS[story_id % 3],
+        plot="A journey.",
+        conflict="Person vs. Self" if story_id % 2 else "Person vs. Nature",
+        theme=THEMES[story_id % 4],
+        point_of_view="First person",
+    )
+    return story._replace(**changes)
+
+
+# Ids are deliberately out of order; catalog order is list order.
+STORIES = [make_story(story_id) for story_id in [*range(40, 0, -2), *range(1, 40, 2)]]
+PROMPTS = [
+    {"prompt_id": 1, "system_prompt": "You write fantasy.", "story_ids": [3, 6, 9, 99]},
+    {"prompt_id": 2, "system_prompt": "You write anything.", "story_ids": list(range(1, 41))},
+]
+
+
+def brute_force(stories, prompts, prompt_id=None, **filters) -> list:
+    """The stories a filter should match, found by scanning every story."""
+    linked = None
+    if prompt_id is not None:
+        linked = next(prompt["story_ids"] for prompt in prompts if prompt["prompt_id"] == prompt_id)
+    matches = []
+    for story in stories:
+        if linked is not None and story.id not in linked:
+            continue
+        if all(getattr(story, field) in (wanted if isinstance(wanted, list) else [wanted])
+               for field, wanted in filters.items()):
+            matches.append(story)
+    return matches
+
+
+FILTERS = [
+    {},
+    {"setting": "Space"},
+    {"setting": ["Space", "Noir"], "theme": "Hope"},
+    {"conflict": "Person vs. Self", "theme": ["Redemption", "Loss"]},
+    {"prompt_id": 1},
+    {"prompt_id": 2, "setting": "Fantasy"},
+    {"setting": []},
+    {"theme": "No such theme"},
+]
+
+
+class StoryCatalogQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = StoryCatalog(STORIES, PROMPTS)
+
+
+    def test_query_matches_a_full_scan(self):
+        for filters in FILTERS:
+            with self.subTest(filters=filters):
+                expected = brute_force(STORIES, PROMPTS, **filters)
+                self.assertEqual(self.catalog.query(**filters), expected)
+                self.assertEqual(self.catalog.count(**filters), len(expected))
+
+
+    def test_pages_slice_the_matches(self):
+        expected = brute_force(STORIES, PROMPTS, setting="Fantasy")
+        pages = [self.catalog.query(setting="Fantasy", limit=4, offset=offset)
+                 for offset in range(0, len(expected), 4)]
+
+        self.assertEqual([story for page in pages for story in page], expected)
+        self.assertEqual(self.catalog.query(setting="Fantasy", limit=4, offset=len(expected)), [])
+
+
+    def test_lookups(self):
+        self.assertEqual(self.catalog[7], make_story(7))
+        self.assertIsNone(self.catalog.get(99))
+        self.assertNotIn(99, self.catalog)
+        self.assertEqual(list(self.catalog), STORIES)
+        self.assertEqual(self.catalog.values("setting"), sorted(SETTINGS))
+        self.assertEqual([story.id for story in self.catalog.stories_for_prompt(1)], [3, 6, 9])
+        self.assertEqual(self.catalog.missing_story_ids(1), [99])
+
+
+    def test_helper_pages_clamp_to_the_last_page(self):
+        helper = StoryHelper()
+        helper.set_catalog(self.catalog)
+        expected = brute_force(STORIES, PROMPTS, setting="Fantasy")
+
+        page = helper.get_helper_story_page(page=99, page_size=4, setting="Fantasy", theme=[])
+
+        self.assertEqual(page.total, len(expected))
+        self.assertEqual(page.page_count, -(-len(expected) // 4))
+        self.assertEqual(page.page, page.page_count - 1)
+        self.assertEqual(page.stories, expected[page.page * 4:])
+        helper.close_instance()
+
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            StoryCatalog(STORIES + [make_story(1)], PROMPTS)
+        with self.assertRaises(ValueError):
+            self.catalog.query(plot="A journey.")
+        with self.assertRaises(ValueError):
+            self.catalog.query(offset=-1)
+
+
+
+class StoryCatalogUpdateTest(unittest.TestCase):
+    """updated() must give the same answers as building the new catalog from scratch."""
+
+    def setUp(self):
+        self.old = StoryCatalog(STORIES, PROMPTS)
+        self.stories = [story for story in STORIES if story.id != 10]
+        self.stories[3] = self.stories[3]._replace(setting="Underwater", theme="Hope")
+        self.stories.append(make_story(41, setting="Western"))
+        self.prompts = [PROMPTS[0], {**PROMPTS[1], "story_ids": [41, 10, 4, 5]}]
+
+
+    def test_updated_matches_a_fresh_build(self):
+        updated = self.old.updated(self.stories, self.prompts)
+        fresh = StoryCatalog(self.stories, self.prompts)
+
+        self.assertEqual(list(updated), list(fresh))
+        for field in StoryCatalog.indexed_fields:
+            self.assertEqual(updated.values(field), fresh.values(field))
+        for filters in FILTERS + [{"setting": ["Western", "Underwater"]}, {"prompt_id": 2, "theme": "Hope"}]:
+            with self.subTest(filters=filters):
+                self.assertEqual(updated.query(**filters), fresh.query(**filters))
+        self.assertEqual(updated.missing_story_ids(2), [10])
+        self.assertEqual(updated.changes, CatalogChanges(added=[41], changed=[self.stories[3].id], removed=[10]))
+
+
+    def test_old_catalog_is_left_unchanged(self):
+        before = {str(filters): self.old.query(**filters) for filters in FILTERS}
+        self.old.updated(self.stories, self.prompts)
+
+        self.assertEqual({str(filters): self.old.query(**filters) for filters in FILTERS}, before)
+        self.assertIn(10, self.old)
+
+
+    def test_unchanged_stories_keep_their_records(self):
+        updated = self.old.updated(self.stories, self.prompts)
+
+        self.assertIs(updated[1], self.old[1])
+
+
+class ReloadCatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.root = Path(self.folder.name)
+        for name in ("story_types.json", "story_system_prompts.json"):
+            shutil.copy(Path("story_inputs") / name, self.root / name)
+        self.helper = StoryHelper()
+        self.helper._StoryHelper__story_path = self.root
+
+
+    def tearDown(self):
+        self.helper.close_instance()
+        self.folder.cleanup()
+
+
+    def rewrite_stories(self, edit):
+        path = self.root / "story_types.json"
+        stories = json.loads(path.read_text())
+        edit(stories)
+        # Make sure the modification time moves on even on coarse clocks.
+        time.sleep(0.01)
+        path.write_text(json.dumps(stories))
+
+
+    def test_reload_swaps_in_the_edited_catalog(self):
+        old = self.helper.get_catalog()
+        self.assertFalse(self.helper.reload_catalog())
+
+        self.rewrite_stories(lambda stories: stories[0].update(setting="Deep Space"))
+
+        self.assertTrue(self.helper.reload_catalog())
+        catalog = self.helper.get_catalog()
+        self.assertEqual(catalog.changes.changed, [old.query()[0].id])
+        self.assertEqual(catalog.query(setting="Deep Space"), [catalog.query()[0]])
+        self.assertEqual(old.query(setting="Deep Space"), [])
+
+
+    def test_unparseable_file_keeps_the_current_catalog(self):
+        old = self.helper.get_catalog()
+        time.sleep(0.01)
+        (self.root / "story_types.json").write_text("[{")
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertFalse(self.helper.reload_catalog())
+
+        self.assertIs(self.helper.get_catalog(), old)
+        self.assertEqual(len(caught), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import time
+import unittest
+import warnings
+from MakerPool import MakerPool
+from StoryHelper import StoryHelper
+from StoryMaker import StoryMaker, BatchResult
+from WarmPool import WarmPool
+from tests.fake_openrouter import FakeOpenRouter
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    """Polls condition until it is true or timeout seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class NumberingHelper:
+    """Stands in for StoryHelper, numbering the stories it generates."""
+
+    def __init__(self):
+        self.generated = 0
+        self.archived = []
+
+
+    def generate_many_stories(self, pairs: list, max_concurrency: int = 4, in_order: bool = True,
+                              archive: bool = True):
+        for index, _ in enumerate(pairs):
+            self.generated += 1
+            yield BatchResult(index, "", f"story {self.generated}", None)
+
+
+    def archive_story(self, story: str, prompt_id: int, story_id: int, call=None, source: str = "app"):
+        self.archived.append(story)
+
+
+class FailingArchiveHelper(NumberingHelper):
+    """A helper whose archive rejects the story, as after a catalog reload dropped its ids."""
+
+    def archive_story(self, story: str, prompt_id: int, story_id: int, call=None, source: str = "app"):
+        raise IndexError("story_id out of range")
+
+
+class StubCatalog:
+    """The part of StoryCatalog that WarmPool reads."""
+
+    def __init__(self, links: dict):
+        self.links = links
+
+
+    def prompts(self) -> list:
+        return [{"prompt_id": prompt_id, "story_ids": story_ids} for prompt_id, story_ids in self.links.items()]
+
+
+class CatalogHelper(NumberingHelper):
+    """A helper with a catalog that the test can swap, like reload_catalog() does."""
+
+    def __init__(self, links: dict):
+        super().__init__()
+        self.catalog = StubCatalog(links)
+
+
+    def get_catalog(self):
+        return self.catalog
+
+
+class WarmPoolTest(unittest.TestCase):
+
+    def test_take_serves_the_oldest_story_first_and_archives_it(self):
+        helper = NumberingHelper()
+        warm_pool = WarmPool(helper, per_key=3, pairs=[(1, 1)])
+        warm_pool.start()
+        self.assertTrue(wait_until(lambda: warm_pool.get_stats()["ready"] == 3))
+        warm_pool.stop()
+        self.assertEqual(helper.archived, [])
+
+        self.assertEqual([warm_pool.take(1, 1) for _ in range(3)], ["story 1", "story 2", "story 3"])
+        self.assertIsNone(warm_pool.take(1, 1))
+        self.assertEqual(helper.archived, ["story 1", "story 2", "story 3"])
+
+
+    def test_archive_failure_still_serves_the_story(self):
+        warm_pool = WarmPool(FailingArchiveHelper(), per_key=1, pairs=[(1, 1)])
+        warm_pool.start()
+        self.assertTrue(wait_until(lambda: warm_pool.get_stats()["ready"] == 1))
+        warm_pool.stop()
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertEqual(warm_pool.take(1, 1), "story 1")
+
+        self.assertTrue(any("story_id out of range" in str(warning.message) for warning in caught))
+        self.assertEqual(warm_pool.get_stats()["hits"], 1)
+
+
+    def test_follows_the_reloaded_catalog(self):
+        helper = CatalogHelper({1: [1, 2]})
+        warm_pool = WarmPool(helper, per_key=1, check_interval=0.05)
+        warm_pool.start()
+        self.assertTrue(wait_until(lambda: warm_pool.get_stats()["ready"] == 2))
+
+        helper.catalog = StubCatalog({1: [2], 2: [1]})
+        self.assertTrue(wait_until(lambda: warm_pool.take(2, 1) is not None))
+        warm_pool.stop()
+
+        self.assertIsNone(warm_pool.take(1, 1))
+        self.assertIsNotNone(warm_pool.take(1, 2))
+        stats = warm_pool.get_stats()
+        self.assertEqual(stats["ready"] + stats["pending"], 2)
+
+
+class WarmPoolMakerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("OPENROUTER_API", "test-key")
+        self.server = FakeOpenRouter()
+        self.url = StoryMaker.url
+        StoryMaker.url = self.server.base_url
+        self.pool = MakerPool(max_size=1)
+        self.helper = StoryHelper()
+        self.helper.set_maker_pool(self.pool)
+
+
+    def tearDown(self):
+        self.helper.close_instance()
+        self.pool.close()
+        StoryMaker.url = self.url
+        self.server.close()
+
+
+    def test_refills_lease_from_the_helpers_maker_pool(self):
+        self.helper.change_temperature(0.4)
+        warm_pool = WarmPool(self.helper, per_key=2, max_concurrency=2, pairs=[(1, 1), (1, 2)])
+        warm_pool.start()
+        self.assertTrue(wait_until(lambda: warm_pool.get_stats()["ready"] == 4))
+        warm_pool.stop()
+
+        # Four stories, two refill threads, but never more than the pool's one conversation.
+        self.assertEqual(self.pool.get_stats()["created"], 1)
+        self.assertEqual(self.pool.get_stats()["leased"], 0)
+        # The shared helper itself is left as it was.
+        self.assertEqual(self.helper.temp, 0.4)
+        self.assertEqual(len(self.helper.get_convo_history()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()